@@ -0,0 +1,280 @@
+import os
+import json
+import time
+import uuid
+import random
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode
+
+logger = logging.getLogger(__name__)
+
+ACCESS = "access"
+AUTH = "auth"
+AUDIT = "audit"
+
+# Query parameters whose values are credentials (OAuth codes and tokens)
+# and must never reach the log sinks.
+SENSITIVE_QUERY_PARAMS = frozenset((
+    "code", "state", "token", "access_token", "refresh_token", "id_token",
+    "assertion", "client_secret", "password",
+))
+REDACTED = "[REDACTED]"
+
+
+def redact_query(query_string: bytes) -> str:
+    query = query_string.decode("latin-1")
+    if not query:
+        return query
+    pairs = parse_qsl(query, keep_blank_values=True)
+    if not any(name.lower() in SENSITIVE_QUERY_PARAMS for name, _ in pairs):
+        return query
+    return urlencode([
+        (name, REDACTED if name.lower() in SENSITIVE_QUERY_PARAMS else value) for name, value in pairs
+    ])
+
+
+class RotatingFileSink:
+    # JSON-lines file rotated by size. Writes run in a worker thread so the
+    # event loop never waits on the disk.
+
+    def __init__(self, path: str, max_bytes: int = 100 * 1024 * 1024, backup_count: int = 5):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._file = None
+        self._size = 0
+
+    def _open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, "ab")
+        self._size = self._file.tell()
+
+    def _rotate(self):
+        self._file.close()
+        for i in range(self.backup_count - 1, 0, -1):
+            source = f"{self.path}.{i}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{i + 1}")
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._open()
+
+    def _write(self, data: bytes):
+        if self._file is None:
+            self._open()
+        if self._size and self._size + len(data) > self.max_bytes:
+            self._rotate()
+        self._file.write(data)
+        self._file.flush()
+        self._size += len(data)
+
+    async def write(self, data: bytes):
+        await asyncio.to_thread(self._write, data)
+
+    async def close(self):
+        if self._file is not None:
+            await asyncio.to_thread(self._file.close)
+            self._file = None
+
+
+class SocketSink:
+    # Newline-delimited JSON over TCP (e.g. a Fluent Bit or Vector input).
+    # A failed write drops the connection and the batch; the next batch
+    # reconnects.
+
+    def __init__(self, host: str, port: int, connect_timeout: float = 2.0):
+        self.host = host
+        self.port = port
+        self.connect_timeout = connect_timeout
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    async def write(self, data: bytes):
+        try:
+            if self._writer is None or self._writer.is_closing():
+                _, self._writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.host, self.port), self.connect_timeout
+                )
+            self._writer.write(data)
+            await self._writer.drain()
+        except (OSError, asyncio.TimeoutError):
+            await self.close()
+            raise
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+class AccessLogger:
+    # Request-path side is a bounded deque append: no I/O, no await, and a
+    # full buffer drops the record and counts it instead of waiting. A
+    # background task drains the buffer in batches to the sink. Access
+    # records are sampled; auth and audit records are always kept.
+
+    def __init__(self, sink=None, capacity: int = 65536, batch_size: int = 512, flush_interval: float = 1.0,
+                 sample_rate: float = 1.0, access_logs: bool = True, auth_logs: bool = True,
+                 request_id: bool = True, enabled: bool = True):
+        self.sink = sink
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.sample_rate = sample_rate
+        self.access_logs = access_logs
+        self.auth_logs = auth_logs
+        self.request_id = request_id
+        self.enabled = enabled and sink is not None
+        self._buffer: deque = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.accepted = 0
+        self.sampled_out = 0
+        self.dropped = 0
+        self.written = 0
+        self.write_errors = 0
+
+    def log(self, kind: str, record: Dict[str, Any]):
+        if not self.enabled:
+            return
+        if kind == ACCESS and self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            self.sampled_out += 1
+            return
+        if len(self._buffer) >= self.capacity:
+            self.dropped += 1
+            return
+        record["ts"] = time.time()
+        record["kind"] = kind
+        self._buffer.append(record)
+        self.accepted += 1
+        if self._wakeup is not None and len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+
+    def audit(self, action: str, actor: Optional[str], **details):
+        self.log(AUDIT, {"action": action, "actor": actor, **details})
+
+    def start(self):
+        if self.enabled and self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def _drain(self) -> List[Dict[str, Any]]:
+        batch = []
+        while self._buffer and len(batch) < self.batch_size:
+            batch.append(self._buffer.popleft())
+        return batch
+
+    async def flush(self):
+        while self._buffer:
+            batch = self._drain()
+            data = "".join(json.dumps(r, default=str, separators=(",", ":")) + "\n" for r in batch).encode()
+            try:
+                await self.sink.write(data)
+                self.written += len(batch)
+            except Exception as e:
+                self.write_errors += 1
+                self.dropped += len(batch)
+                logger.warning(f"Access log write failed, dropped {len(batch)} records: {e}")
+                return
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.enabled:
+            await self.flush()
+            await self.sink.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "buffered": len(self._buffer),
+            "capacity": self.capacity,
+            "sample_rate": self.sample_rate,
+            "accepted": self.accepted,
+            "sampled_out": self.sampled_out,
+            "dropped": self.dropped,
+            "written": self.written,
+            "write_errors": self.write_errors,
+        }
+
+
+class AccessLogMiddleware:
+    # Outermost pure ASGI middleware: assigns the request id, then records
+    # one access line per request once the response has finished. 401/403
+    # responses are additionally recorded as unsampled auth events.
+
+    def __init__(self, app, get_logger: Callable[[], AccessLogger]):
+        self.app = app
+        self.get_logger = get_logger
+
+    async def __call__(self, scope, receive, send):
+        access_logger = self.get_logger()
+        if scope["type"] != "http" or not access_logger.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        client_ip = scope["client"][0] if scope.get("client") else None
+        user_agent = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")
+            elif name == b"user-agent":
+                user_agent = value.decode("latin-1")
+        if request_id is None:
+            request_id = uuid.uuid4().hex
+        scope.setdefault("state", {})["request_id"] = request_id
+        encoded_id = request_id.encode("latin-1")
+
+        state = {"status": 500, "bytes": 0}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+                if access_logger.request_id:
+                    message = {**message, "headers": list(message.get("headers", [])) + [(b"x-request-id", encoded_id)]}
+            elif message["type"] == "http.response.body":
+                state["bytes"] += len(message.get("body", b""))
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            user = scope.get("user")
+            record = {
+                "request_id": request_id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "query": redact_query(scope.get("query_string", b"")),
+                "status": state["status"],
+                "bytes": state["bytes"],
+                "duration_ms": round(1000 * (time.perf_counter() - start), 3),
+                "user_id": getattr(user, "user_id", None),
+                "client_ip": client_ip,
+                "user_agent": user_agent,
+            }
+            if access_logger.auth_logs and state["status"] in (401, 403):
+                access_logger.log(AUTH, dict(record))
+            if access_logger.access_logs:
+                access_logger.log(ACCESS, record)
@@ -0,0 +1,217 @@
+import math
+import time
+import heapq
+import asyncio
+import logging
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, List, Optional
+
+from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = "interactive"
+NORMAL = "normal"
+BATCH = "batch"
+PRIORITIES = {INTERACTIVE: 0, NORMAL: 1, BATCH: 2}
+
+PRIORITY_HEADER = "X-Request-Priority"
+_PRIORITY_HEADER_KEY = PRIORITY_HEADER.lower().encode("latin-1")
+
+current_priority: ContextVar[str] = ContextVar("current_priority", default=NORMAL)
+
+
+class Overloaded(HTTPException):
+    def __init__(self, upstream: str, retry_after: int):
+        super().__init__(
+            status_code=503,
+            detail=f"{upstream} is overloaded, retry later",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+class AdmissionController:
+    # Bounds concurrent calls to one upstream. Callers beyond the limit wait
+    # in a priority queue (interactive before normal before batch, FIFO
+    # within a class). A caller is shed with 503 when the queue is full and
+    # it does not outrank anyone queued, or when its wait passes the target
+    # for its class; a full queue sheds the lowest-priority, newest waiter
+    # to make room for a more important one.
+
+    def __init__(self, name: str, max_concurrency: int = 64, max_queue: int = 256,
+                 queue_targets: Optional[Dict[str, float]] = None, enabled: bool = True):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_targets = {INTERACTIVE: 0.5, NORMAL: 0.5, BATCH: 2.0, **(queue_targets or {})}
+        self.enabled = enabled
+        self.active = 0
+        self._queue: List[list] = []
+        self._queued = 0
+        self._sequence = 0
+        self._service_time = 0.05
+        self.admitted = 0
+        self.queued_total = 0
+        self.shed = {"queue_full": 0, "queue_timeout": 0, "displaced": 0}
+
+    def retry_after(self) -> int:
+        # Time for the backlog to drain at the current concurrency.
+        backlog = self._queued + self.active
+        return max(1, math.ceil(backlog * self._service_time / self.max_concurrency))
+
+    def _shed(self, reason: str):
+        self.shed[reason] += 1
+        raise Overloaded(self.name, self.retry_after())
+
+    def _displace_lowest(self, rank: int) -> bool:
+        live = [entry for entry in self._queue if not entry[2].done()]
+        if not live:
+            return False
+        worst = max(live, key=lambda entry: (entry[0], entry[1]))
+        if worst[0] <= rank:
+            return False
+        worst[2].set_exception(Overloaded(self.name, self.retry_after()))
+        self._queued -= 1
+        self.shed["displaced"] += 1
+        return True
+
+    async def acquire(self, priority: str = NORMAL, timeout: Optional[float] = None):
+        if not self.enabled:
+            return
+        if self.active < self.max_concurrency and self._queued == 0:
+            self.active += 1
+            self.admitted += 1
+            return
+
+        rank = PRIORITIES.get(priority, PRIORITIES[NORMAL])
+        if self._queued >= self.max_queue and not self._displace_lowest(rank):
+            self._shed("queue_full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._sequence += 1
+        entry = [rank, self._sequence, waiter]
+        heapq.heappush(self._queue, entry)
+        self._queued += 1
+        self.queued_total += 1
+
+        target = self.queue_targets.get(priority, self.queue_targets[NORMAL])
+        if timeout is not None:
+            target = min(target, timeout)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), target)
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled() and waiter.exception() is None:
+                # Granted a slot just as the wait ran out; keep it.
+                self.admitted += 1
+                return
+            if not waiter.done():
+                waiter.cancel()
+                self._queued -= 1
+            self._shed("queue_timeout")
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled() and waiter.exception() is None:
+                self.release()
+            elif not waiter.done():
+                waiter.cancel()
+                self._queued -= 1
+            raise
+        self.admitted += 1
+
+    def release(self, elapsed: Optional[float] = None):
+        if not self.enabled:
+            return
+        if elapsed is not None:
+            self._service_time += 0.1 * (elapsed - self._service_time)
+        while self._queue:
+            _, _, waiter = heapq.heappop(self._queue)
+            if waiter.done():
+                continue
+            # The slot passes straight to the next waiter.
+            self._queued -= 1
+            waiter.set_result(None)
+            return
+        self.active -= 1
+
+    async def run(self, fn, priority: str = NORMAL, timeout: Optional[float] = None):
+        await self.acquire(priority, timeout)
+        start = time.perf_counter()
+        try:
+            return await fn()
+        finally:
+            self.release(time.perf_counter() - start)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "queued": self._queued,
+            "admitted": self.admitted,
+            "queued_total": self.queued_total,
+            "shed": dict(self.shed),
+            "service_time_ms": round(1000 * self._service_time, 3),
+        }
+
+
+class PriorityClassifier:
+    # The class comes from the route and the caller: batch paths and
+    # scripted clients are batch, browsers are interactive, the rest is
+    # normal. X-Request-Priority may lower that class, but only callers
+    # holding one of elevate_roles (a role or group) may raise it, so a
+    # batch job cannot label itself interactive to dodge shedding.
+
+    def __init__(self, batch_paths: Iterable[str] = ("/mlflow/batch",),
+                 batch_user_agents: Iterable[str] = ("mlflow-python-client", "python-requests", "python-httpx", "curl"),
+                 elevate_roles: Iterable[str] = ()):
+        self.batch_paths = tuple(batch_paths)
+        self.batch_user_agents = tuple(agent.lower() for agent in batch_user_agents)
+        self.elevate_roles = frozenset(elevate_roles)
+
+    def may_elevate(self, user) -> bool:
+        if user is None or not self.elevate_roles:
+            return False
+        return not self.elevate_roles.isdisjoint(user.roles) or not self.elevate_roles.isdisjoint(user.groups)
+
+    def classify(self, scope) -> str:
+        user_agent = ""
+        requested = None
+        for name, value in scope["headers"]:
+            if name == _PRIORITY_HEADER_KEY:
+                requested = value.decode("latin-1").strip().lower()
+            elif name == b"user-agent":
+                user_agent = value.decode("latin-1").lower()
+
+        if scope["path"].startswith(self.batch_paths):
+            derived = BATCH
+        elif any(agent in user_agent for agent in self.batch_user_agents):
+            derived = BATCH
+        elif user_agent.startswith("mozilla/"):
+            derived = INTERACTIVE
+        else:
+            derived = NORMAL
+
+        if requested not in PRIORITIES:
+            return derived
+        if PRIORITIES[requested] >= PRIORITIES[derived] or self.may_elevate(scope.get("user")):
+            return requested
+        return derived
+
+
+class PriorityMiddleware:
+    # Tags the request with its priority class for the admission queues.
+    # Sits inside AuthMiddleware so the caller is known when classifying.
+
+    def __init__(self, app, get_classifier):
+        self.app = app
+        self.get_classifier = get_classifier
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = current_priority.set(self.get_classifier().classify(scope))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_priority.reset(token)
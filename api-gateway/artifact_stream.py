@@ -0,0 +1,179 @@
+import os
+import re
+import asyncio
+import logging
+import mimetypes
+from email.utils import formatdate
+from typing import AsyncIterator, Mapping, Optional, Tuple
+
+import httpx
+from starlette.background import BackgroundTask
+from starlette.responses import Response, StreamingResponse
+
+from response_cache import etag_matches
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+
+FORWARDED_REQUEST_HEADERS = ("range", "if-range", "if-none-match", "if-modified-since")
+FORWARDED_UPLOAD_HEADERS = ("content-type", "content-length", "content-md5")
+FORWARDED_RESPONSE_HEADERS = (
+    "content-type",
+    "content-length",
+    "content-range",
+    "content-encoding",
+    "content-disposition",
+    "accept-ranges",
+    "etag",
+    "last-modified",
+    "cache-control",
+)
+
+_RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def forwarded_request_headers(headers: Mapping[str, str]) -> dict:
+    return {name: headers[name] for name in FORWARDED_REQUEST_HEADERS if name in headers}
+
+
+async def stream_upstream(client: httpx.AsyncClient, url: str, headers: dict, params=None) -> StreamingResponse:
+    # Bytes are relayed as they arrive; StreamingResponse awaits each send,
+    # so a slow client slows the upstream read instead of filling memory.
+    request = client.build_request("GET", url, headers=headers, params=params)
+    upstream = await client.send(request, stream=True)
+    response_headers = {
+        name: upstream.headers[name] for name in FORWARDED_RESPONSE_HEADERS if name in upstream.headers
+    }
+    return StreamingResponse(
+        upstream.aiter_raw(CHUNK_SIZE),
+        status_code=upstream.status_code,
+        headers=response_headers,
+        background=BackgroundTask(upstream.aclose),
+    )
+
+
+async def stream_upload(client: httpx.AsyncClient, url: str, headers: dict, body: AsyncIterator[bytes]) -> httpx.Response:
+    # httpx pulls the next chunk only once the previous one is written, and
+    # the ASGI server stops reading the client socket while chunks wait, so
+    # at most a few chunks of the upload are ever held by the gateway. With
+    # no client Content-Length the body goes upstream chunked.
+    return await client.request("PUT", url, headers=headers, content=body)
+
+
+def upload_headers(headers: Mapping[str, str]) -> dict:
+    return {name: headers[name] for name in FORWARDED_UPLOAD_HEADERS if name in headers}
+
+
+def resolve_local_artifact(root: str, experiment_id: str, run_id: str, artifact_path: str) -> Optional[str]:
+    # Default MLflow file store layout: <root>/<experiment>/<run>/artifacts/<path>
+    if not root:
+        return None
+    if root.startswith("file://"):
+        root = root[len("file://"):]
+    base = os.path.realpath(os.path.join(root, experiment_id, run_id, "artifacts"))
+    candidate = os.path.realpath(os.path.join(base, artifact_path))
+    if not candidate.startswith(base + os.sep) or not os.path.isfile(candidate):
+        return None
+    return candidate
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    # Single byte ranges only; anything else is served as the full body.
+    if not header:
+        return None
+    match = _RANGE_PATTERN.match(header.strip())
+    if match is None:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:
+        length = int(end)
+        if length == 0:
+            return (size, size)
+        return (max(0, size - length), size - 1)
+    start = int(start)
+    end = int(end) if end else size - 1
+    return (start, min(end, size - 1))
+
+
+class LocalFileRangeResponse(Response):
+    # Serves an artifact from a local artifact store with Range, If-Range and
+    # If-None-Match support. The body is sent with the ASGI zero-copy
+    # (sendfile) extension when the server offers it, otherwise in chunks
+    # read off the event loop.
+
+    def __init__(self, path: str, request_headers: Mapping[str, str], filename: Optional[str] = None):
+        self.path = path
+        self.background = None
+        stat = os.stat(path)
+        size = stat.st_size
+        etag = f'"{stat.st_mtime_ns:x}-{size:x}"'
+
+        headers = {
+            "accept-ranges": "bytes",
+            "etag": etag,
+            "last-modified": formatdate(stat.st_mtime, usegmt=True),
+        }
+        if filename:
+            headers["content-disposition"] = f'attachment; filename="{filename}"'
+        self.media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+        self.offset = 0
+        self.count = size
+        self.status_code = 200
+
+        byte_range = None
+        if_range = request_headers.get("if-range")
+        if if_range is None or if_range == etag:
+            byte_range = parse_range(request_headers.get("range"), size)
+
+        if etag_matches(request_headers.get("if-none-match"), etag):
+            self.status_code = 304
+            self.count = 0
+        elif byte_range is not None:
+            start, end = byte_range
+            if start >= size or start > end:
+                self.status_code = 416
+                self.count = 0
+                headers["content-range"] = f"bytes */{size}"
+            else:
+                self.status_code = 206
+                self.offset = start
+                self.count = end - start + 1
+                headers["content-range"] = f"bytes {start}-{end}/{size}"
+
+        if self.status_code != 304:
+            headers["content-length"] = str(self.count)
+        self.init_headers(headers)
+
+    async def __call__(self, scope, receive, send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if self.count == 0 or scope.get("method") == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        with open(self.path, "rb") as f:
+            if "http.response.zerocopy" in scope.get("extensions", {}):
+                await send({
+                    "type": "http.response.zerocopy",
+                    "file": f,
+                    "offset": self.offset,
+                    "count": self.count,
+                    "more_body": False,
+                })
+                return
+
+            fd = f.fileno()
+            offset = self.offset
+            remaining = self.count
+            while remaining > 0:
+                chunk = await asyncio.to_thread(os.pread, fd, min(CHUNK_SIZE, remaining), offset)
+                if not chunk:
+                    break
+                offset += len(chunk)
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
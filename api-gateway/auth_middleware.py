@@ -0,0 +1,100 @@
+import re
+import logging
+from typing import Awaitable, Callable, Iterable, Optional
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PUBLIC_PREFIXES = (
+    "/health",
+    "/ready",
+    "/docs",
+    "/redoc",
+    "/openapi.json",
+    "/oauth",
+)
+
+
+def compile_prefixes(prefixes: Iterable[str]) -> "re.Pattern[str]":
+    return re.compile("|".join(re.escape(p) for p in sorted(prefixes, key=len, reverse=True)))
+
+
+class AuthMiddleware:
+    # Pure ASGI replacement for the BaseHTTPMiddleware auth hook. The token
+    # is verified once here and the resulting UserInfo is stored in
+    # scope["user"], where verify_entra_token picks it up for the routes.
+    # Responses pass straight through, so streaming bodies are not buffered.
+
+    def __init__(
+        self,
+        app,
+        authenticate: Callable[[str], Awaitable[object]],
+        check_rate_limit: Optional[Callable[[str], Awaitable[object]]] = None,
+        public_prefixes: Iterable[str] = DEFAULT_PUBLIC_PREFIXES,
+    ):
+        self.app = app
+        self.authenticate = authenticate
+        self.check_rate_limit = check_rate_limit
+        self._public = compile_prefixes(public_prefixes)
+
+    def is_public(self, scope) -> bool:
+        if self._public.match(scope["path"]) is not None:
+            return True
+        # CORS preflights never carry credentials.
+        if scope["method"] == "OPTIONS":
+            for name, _ in scope["headers"]:
+                if name == b"access-control-request-method":
+                    return True
+        return False
+
+    @staticmethod
+    def bearer_token(scope) -> Optional[str]:
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                scheme, _, token = value.decode("latin-1").partition(" ")
+                if scheme == "Bearer" and token:
+                    return token
+                return None
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.is_public(scope):
+            await self.app(scope, receive, send)
+            return
+
+        token = self.bearer_token(scope)
+        if token is None:
+            response = JSONResponse(status_code=401, content={"detail": "Authorization header required"})
+            await response(scope, receive, send)
+            return
+
+        try:
+            user = await self.authenticate(token)
+        except HTTPException:
+            response = JSONResponse(status_code=401, content={"detail": "Invalid or expired token"})
+            await response(scope, receive, send)
+            return
+
+        scope["user"] = user
+
+        if self.check_rate_limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        decision = await self.check_rate_limit(user.user_id)
+        rate_headers = decision.headers()
+        if not decision.allowed:
+            response = JSONResponse(status_code=429, content={"detail": "Rate limit exceeded"}, headers=rate_headers)
+            await response(scope, receive, send)
+            return
+
+        encoded_headers = [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in rate_headers.items()]
+
+        async def send_with_rate_headers(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": list(message.get("headers", [])) + encoded_headers}
+            await send(message)
+
+        await self.app(scope, receive, send_with_rate_headers)
@@ -0,0 +1,46 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    # Collapses concurrent calls with the same key into one in-flight task.
+    # The upstream call runs as its own task so a disconnecting caller does
+    # not cancel it for the others still waiting on the result.
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._calls: Dict[Hashable, "asyncio.Future[Any]"] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        if not self.enabled:
+            return await fn()
+
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+            self.calls += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: "asyncio.Future[Any]"):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "upstream_calls": self.calls,
+            "coalesced": self.coalesced,
+            "in_flight": self.in_flight(),
+        }
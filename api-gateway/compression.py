@@ -0,0 +1,275 @@
+import zlib
+import logging
+from typing import Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zstandard is optional
+    zstandard = None
+
+DEFAULT_ENCODINGS = ("br", "zstd", "gzip")
+DEFAULT_LEVELS = {"gzip": 6, "br": 4, "zstd": 3}
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "text/",
+)
+
+
+class _GzipEncoder:
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class _BrotliEncoder:
+    def __init__(self, level: int):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class _ZstdEncoder:
+    def __init__(self, level: int):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+def available_encodings() -> List[str]:
+    encodings = ["gzip"]
+    if brotli is not None:
+        encodings.append("br")
+    if zstandard is not None:
+        encodings.append("zstd")
+    return encodings
+
+
+def parse_accept_encoding(header: Optional[str]) -> Dict[str, float]:
+    accepted = {}
+    if not header:
+        return accepted
+    for item in header.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[name] = quality
+    return accepted
+
+
+def is_compressible(content_type: Optional[str]) -> bool:
+    if not content_type:
+        return False
+    content_type = content_type.lower()
+    return any(content_type.startswith(t) for t in COMPRESSIBLE_TYPES) or content_type.endswith("+json")
+
+
+def weak_etag(etag: str) -> str:
+    # The compressed body is a different representation of the same resource.
+    return etag if etag.startswith("W/") else "W/" + etag
+
+
+class ResponseCompressor:
+    # Chooses a content coding for a response and produces encoders for it.
+    # Preference follows `encodings` among those the client accepts; codings
+    # whose library is not installed are skipped.
+
+    def __init__(self, minimum_size: int = 1024, encodings: Iterable[str] = DEFAULT_ENCODINGS,
+                 levels: Optional[Dict[str, int]] = None, enabled: bool = True):
+        installed = set(available_encodings())
+        self.encodings = [e for e in encodings if e in installed]
+        self.levels = {**DEFAULT_LEVELS, **(levels or {})}
+        self.minimum_size = minimum_size
+        self.enabled = enabled and bool(self.encodings)
+        self.compressed = 0
+        self.skipped = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def negotiate(self, accept_encoding: Optional[str]) -> Optional[str]:
+        if not self.enabled:
+            return None
+        accepted = parse_accept_encoding(accept_encoding)
+        wildcard = accepted.get("*", 0.0)
+        best, best_quality = None, 0.0
+        for encoding in self.encodings:
+            quality = accepted.get(encoding, wildcard)
+            if quality > best_quality:
+                best, best_quality = encoding, quality
+        return best
+
+    def encoder(self, encoding: str):
+        level = int(self.levels.get(encoding, DEFAULT_LEVELS[encoding]))
+        if encoding == "br":
+            return _BrotliEncoder(level)
+        if encoding == "zstd":
+            return _ZstdEncoder(level)
+        return _GzipEncoder(level)
+
+    def compress(self, encoding: str, body: bytes) -> bytes:
+        encoder = self.encoder(encoding)
+        compressed = encoder.compress(body) + encoder.finish()
+        self.record(len(body), len(compressed))
+        return compressed
+
+    def record(self, bytes_in: int, bytes_out: int):
+        self.compressed += 1
+        self.bytes_in += bytes_in
+        self.bytes_out += bytes_out
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "enabled": self.enabled,
+            "encodings": self.encodings,
+            "minimum_size": self.minimum_size,
+            "compressed": self.compressed,
+            "skipped": self.skipped,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "ratio": self.bytes_out / self.bytes_in if self.bytes_in else 0.0,
+        }
+
+
+class CompressionMiddleware:
+    # Pure ASGI compression for proxied responses. Single-body responses
+    # under the threshold go out as-is; larger ones are compressed in one
+    # pass. Streamed bodies are compressed chunk by chunk and flushed after
+    # each chunk so clients see data as it arrives. Responses that already
+    # carry a Content-Encoding (precompressed cache entries, upstream
+    # encodings) and byte-range responses pass through untouched.
+
+    def __init__(self, app, get_compressor: Callable[[], ResponseCompressor]):
+        self.app = app
+        self.get_compressor = get_compressor
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        compressor = self.get_compressor()
+        accept_encoding = None
+        has_range = False
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+            elif name == b"range":
+                has_range = True
+        encoding = None if has_range else compressor.negotiate(accept_encoding)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        state = {"start": None, "encoder": None, "passthrough": False, "bytes_in": 0, "bytes_out": 0}
+
+        async def send_compressed(message):
+            if state["passthrough"]:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                headers = {k.lower(): v for k, v in message.get("headers", [])}
+                content_length = headers.get(b"content-length")
+                if (
+                    message["status"] in (204, 206, 304)
+                    or b"content-encoding" in headers
+                    or b"content-range" in headers
+                    or b"accept-ranges" in headers
+                    or not is_compressible(headers.get(b"content-type", b"").decode("latin-1"))
+                    or (content_length is not None and int(content_length) < compressor.minimum_size)
+                ):
+                    state["passthrough"] = True
+                    compressor.skipped += 1
+                    await send(message)
+                    return
+                state["start"] = message
+                return
+
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if state["encoder"] is None:
+                start = state["start"]
+                if not more_body and len(body) < compressor.minimum_size:
+                    state["passthrough"] = True
+                    compressor.skipped += 1
+                    await send(start)
+                    await send(message)
+                    return
+                state["encoder"] = compressor.encoder(encoding)
+                await send({**start, "headers": self._compressed_headers(start.get("headers", []), encoding)})
+
+            encoder = state["encoder"]
+            if more_body:
+                chunk = encoder.compress(body) + encoder.flush() if body else b""
+            else:
+                chunk = encoder.compress(body) + encoder.finish()
+            state["bytes_in"] += len(body)
+            state["bytes_out"] += len(chunk)
+            if chunk or not more_body:
+                await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+            if not more_body:
+                compressor.record(state["bytes_in"], state["bytes_out"])
+
+        await self.app(scope, receive, send_compressed)
+
+    @staticmethod
+    def _compressed_headers(raw_headers, encoding: str):
+        headers = []
+        vary = None
+        for name, value in raw_headers:
+            lower = name.lower()
+            if lower == b"content-length":
+                continue
+            if lower == b"etag":
+                value = weak_etag(value.decode("latin-1")).encode("latin-1")
+            if lower == b"vary":
+                vary = value
+                continue
+            headers.append((name, value))
+        headers.append((b"content-encoding", encoding.encode("latin-1")))
+        headers.append((b"vary", vary + b", Accept-Encoding" if vary else b"Accept-Encoding"))
+        return headers
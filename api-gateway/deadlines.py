@@ -0,0 +1,121 @@
+import re
+import time
+import logging
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from fastapi.responses import JSONResponse
+
+from auth_middleware import compile_prefixes
+
+logger = logging.getLogger(__name__)
+
+DEADLINE_HEADER = "X-Request-Timeout"
+_DEADLINE_HEADER_KEY = DEADLINE_HEADER.lower().encode("latin-1")
+_TIMEOUT_PATTERN = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*(ms|s)?\s*$")
+
+# Absolute time.monotonic() by which the current request must be answered.
+# Tasks spawned while handling the request inherit it with the context.
+current_deadline: ContextVar[Optional[float]] = ContextVar("current_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+def parse_timeout(value: Optional[str]) -> Optional[float]:
+    # "2.5" and "2.5s" are seconds, "2500ms" is milliseconds.
+    if not value:
+        return None
+    match = _TIMEOUT_PATTERN.match(value)
+    if match is None:
+        return None
+    amount = float(match.group(1))
+    return amount / 1000.0 if match.group(2) == "ms" else amount
+
+
+def remaining(default: float) -> float:
+    # Seconds left for an upstream call; `default` when no deadline is set.
+    deadline = current_deadline.get()
+    if deadline is None:
+        return default
+    left = deadline - time.monotonic()
+    if left <= 0:
+        raise DeadlineExceeded()
+    return left
+
+
+def expired() -> bool:
+    deadline = current_deadline.get()
+    return deadline is not None and deadline <= time.monotonic()
+
+
+class DeadlinePolicy:
+    # Per-route default budgets matched by longest path prefix. A client may
+    # ask for less time (or more, up to max_timeout) with X-Request-Timeout.
+
+    def __init__(self, default_timeout: float = 30.0, max_timeout: float = 120.0,
+                 routes: Optional[Dict[str, float]] = None, enabled: bool = True):
+        self.default_timeout = default_timeout
+        self.max_timeout = max_timeout
+        self.routes = dict(routes or {})
+        self.enabled = enabled
+        self._prefixes = compile_prefixes(self.routes) if self.routes else None
+        self.exceeded = 0
+
+    def budget(self, path: str, requested: Optional[float]) -> float:
+        if requested is not None:
+            return min(requested, self.max_timeout)
+        if self._prefixes is not None:
+            match = self._prefixes.match(path)
+            if match is not None:
+                return self.routes[match.group(0)]
+        return self.default_timeout
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "default_timeout": self.default_timeout,
+            "max_timeout": self.max_timeout,
+            "exceeded": self.exceeded,
+        }
+
+
+class DeadlineMiddleware:
+    # Sets current_deadline for the request and answers 504 when upstream
+    # calls run out of time before a response has started.
+
+    def __init__(self, app, get_policy):
+        self.app = app
+        self.get_policy = get_policy
+
+    async def __call__(self, scope, receive, send):
+        policy = self.get_policy()
+        if scope["type"] != "http" or not policy.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        requested = None
+        for name, value in scope["headers"]:
+            if name == _DEADLINE_HEADER_KEY:
+                requested = parse_timeout(value.decode("latin-1"))
+                break
+        token = current_deadline.set(time.monotonic() + policy.budget(scope["path"], requested))
+
+        started = {"value": False}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                started["value"] = True
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except DeadlineExceeded:
+            policy.exceeded += 1
+            if started["value"]:
+                raise
+            response = JSONResponse(status_code=504, content={"detail": "Request deadline exceeded"})
+            await response(scope, receive, send)
+        finally:
+            current_deadline.reset(token)
@@ -0,0 +1,86 @@
+import logging
+from typing import Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+LTTB = "lttb"
+MINMAX = "minmax"
+METHODS = (LTTB, MINMAX)
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    # Largest-Triangle-Three-Buckets. Returns the indices of the kept points.
+    # The first and last points are always kept; each bucket in between
+    # keeps the point forming the largest triangle with the previously kept
+    # point and the mean of the next bucket. Buckets depend on the previous
+    # choice, so the walk is sequential, but each bucket is one vectorized
+    # area computation.
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    # Mean of every bucket up front; bucket i spans edges[i]:edges[i + 1].
+    counts = np.diff(edges)
+    sums_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+    means_x = np.append(sums_x / counts, x[n - 1])
+    means_y = np.append(sums_y / counts, y[n - 1])
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        bx, by = x[start:end], y[start:end]
+        cx, cy = means_x[i + 1], means_y[i + 1]
+        areas = np.abs((x[a] - cx) * (by - y[a]) - (x[a] - bx) * (cy - y[a]))
+        a = start + int(np.argmax(areas))
+        selected[i + 1] = a
+    return selected
+
+
+def minmax(y: np.ndarray, threshold: int) -> np.ndarray:
+    # Keeps the minimum and maximum of each of threshold // 2 equal buckets,
+    # so spikes survive; fully vectorized.
+    n = len(y)
+    buckets = threshold // 2
+    if threshold >= n or buckets < 1:
+        return np.arange(n)
+
+    edges = np.linspace(0, n, buckets + 1).astype(np.int64)
+    size = int(np.max(np.diff(edges)))
+    # Pad every bucket to the same width so min/max run over a 2-D view.
+    positions = edges[:-1, None] + np.arange(size)[None, :]
+    valid = positions < edges[1:, None]
+    positions = np.minimum(positions, n - 1)
+    values = y[positions]
+    lows = np.where(valid, values, np.inf).argmin(axis=1)
+    highs = np.where(valid, values, -np.inf).argmax(axis=1)
+    rows = np.arange(buckets)
+    kept = np.concatenate([positions[rows, lows], positions[rows, highs]])
+    return np.unique(kept)
+
+
+def downsample(x: np.ndarray, y: np.ndarray, points: int, method: str = LTTB) -> np.ndarray:
+    # x must be sorted ascending. NaN values would poison bucket means and
+    # comparisons, so they are left out of the selection.
+    finite = np.isfinite(y)
+    if not finite.all():
+        kept = np.flatnonzero(finite)
+        return kept[downsample(x[kept], y[kept], points, method)]
+    if method == MINMAX:
+        return minmax(y, points)
+    return lttb(x.astype(np.float64), y.astype(np.float64), points)
+
+
+def history_arrays(metrics) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # (step, timestamp, value) columns sorted by step, then timestamp.
+    steps = np.fromiter((m.get("step", 0) for m in metrics), dtype=np.int64, count=len(metrics))
+    timestamps = np.fromiter((m.get("timestamp", 0) for m in metrics), dtype=np.int64, count=len(metrics))
+    values = np.fromiter((float(m.get("value", np.nan)) for m in metrics), dtype=np.float64, count=len(metrics))
+    order = np.lexsort((timestamps, steps))
+    return steps[order], timestamps[order], values[order]
@@ -0,0 +1,172 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+def entity_row_count(payload: Dict[str, Any]) -> Optional[int]:
+    # Only plain entity lookups can be merged: every entity column must be
+    # a list of the same length and nothing else may vary per request.
+    entities = payload.get("entities")
+    if not isinstance(entities, dict) or not entities:
+        return None
+    if payload.get("request_context"):
+        return None
+    lengths = {len(values) if isinstance(values, list) else -1 for values in entities.values()}
+    if len(lengths) != 1:
+        return None
+    count = lengths.pop()
+    return count if count > 0 else None
+
+
+def feature_set_key(payload: Dict[str, Any]) -> Optional[Hashable]:
+    # None when a field holds something unexpected (a nested list or dict);
+    # such requests are passed through unbatched.
+    features = payload.get("features")
+    key = (
+        payload.get("feature_service"),
+        tuple(features) if isinstance(features, list) else features,
+        bool(payload.get("full_feature_names", False)),
+        tuple(sorted(payload["entities"])),
+    )
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+def merge_entities(payloads: List[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    merged: Dict[str, List[Any]] = {name: [] for name in payloads[0]["entities"]}
+    for payload in payloads:
+        for name, values in payload["entities"].items():
+            merged[name].extend(values)
+    return merged
+
+
+def split_online_features_response(response: Dict[str, Any], row_counts: List[int]) -> List[Dict[str, Any]]:
+    # get-online-features returns one column per feature (and entity key),
+    # each holding row-aligned values/statuses/event_timestamps lists.
+    results = response.get("results", [])
+    base = {k: v for k, v in response.items() if k != "results"}
+    parts = []
+    offset = 0
+    for count in row_counts:
+        columns = []
+        for column in results:
+            columns.append({
+                field: values[offset:offset + count] if isinstance(values, list) else values
+                for field, values in column.items()
+            })
+        parts.append({**base, "results": columns})
+        offset += count
+    return parts
+
+
+class _PendingBatch:
+    __slots__ = ("payloads", "futures", "row_counts", "rows", "context", "timer")
+
+    def __init__(self, context: Any):
+        self.payloads: List[Dict[str, Any]] = []
+        self.futures: List[asyncio.Future] = []
+        self.row_counts: List[int] = []
+        self.rows = 0
+        self.context = context
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class OnlineFeatureBatcher:
+    # Collects concurrent online-feature lookups for the same feature set
+    # for up to window_ms (or max_batch_size entity rows), sends them to
+    # Feast as one multi-entity request and hands each caller its rows.
+
+    def __init__(
+        self,
+        send_batch: Callable[[Dict[str, Any], Any], Awaitable[Dict[str, Any]]],
+        window_ms: float = 2.0,
+        max_batch_size: int = 256,
+        enabled: bool = True,
+    ):
+        self.send_batch = send_batch
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self.enabled = enabled
+        self._pending: Dict[Hashable, _PendingBatch] = {}
+        self._sending: Set[asyncio.Task] = set()
+        self.requests = 0
+        self.upstream_calls = 0
+
+    async def submit(self, payload: Dict[str, Any], scope: Hashable, context: Any) -> Dict[str, Any]:
+        rows = entity_row_count(payload) if self.enabled else None
+        feature_set = feature_set_key(payload) if rows is not None else None
+        if feature_set is None or rows >= self.max_batch_size:
+            self.requests += 1
+            self.upstream_calls += 1
+            return await self.send_batch(payload, context)
+
+        key = (scope, feature_set)
+        batch = self._pending.get(key)
+        if batch is not None and batch.rows + rows > self.max_batch_size:
+            self._flush(key)
+            batch = None
+        if batch is None:
+            batch = _PendingBatch(context)
+            self._pending[key] = batch
+            batch.timer = asyncio.get_running_loop().call_later(self.window, self._flush, key)
+
+        future = asyncio.get_running_loop().create_future()
+        batch.payloads.append(payload)
+        batch.futures.append(future)
+        batch.row_counts.append(rows)
+        batch.rows += rows
+        self.requests += 1
+
+        if batch.rows >= self.max_batch_size:
+            self._flush(key)
+        return await future
+
+    def _flush(self, key: Hashable):
+        batch = self._pending.pop(key, None)
+        if batch is None:
+            return
+        if batch.timer is not None:
+            batch.timer.cancel()
+        self.upstream_calls += 1
+        # Keep a reference until the send finishes; the event loop only
+        # holds tasks weakly.
+        task = asyncio.ensure_future(self._send(batch))
+        self._sending.add(task)
+        task.add_done_callback(self._sending.discard)
+
+    async def _send(self, batch: _PendingBatch):
+        payload = {k: v for k, v in batch.payloads[0].items() if k != "entities"}
+        payload["entities"] = merge_entities(batch.payloads)
+        try:
+            response = await self.send_batch(payload, batch.context)
+            parts = split_online_features_response(response, batch.row_counts)
+        except Exception as e:
+            for future in batch.futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for future, part in zip(batch.futures, parts):
+            if not future.done():
+                future.set_result(part)
+
+    async def close(self):
+        # Send whatever is still waiting for its window, then let every
+        # in-flight batch finish so no caller is left hanging.
+        for key in list(self._pending):
+            self._flush(key)
+        if self._sending:
+            await asyncio.gather(*self._sending, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "requests": self.requests,
+            "upstream_calls": self.upstream_calls,
+            "pending_batches": len(self._pending),
+            "sending_batches": len(self._sending),
+        }
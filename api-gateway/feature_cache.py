@@ -0,0 +1,210 @@
+import json
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from feast_batching import entity_row_count
+
+logger = logging.getLogger(__name__)
+
+PRESENT = "PRESENT"
+ENTITY_TIMESTAMP = "1970-01-01T00:00:00Z"
+
+
+def parse_feature_ref(ref: str) -> Tuple[str, str]:
+    feature_view, _, feature = ref.partition(":")
+    return feature_view, feature
+
+
+def output_name(ref: str, full_feature_names: bool) -> str:
+    feature_view, feature = parse_feature_ref(ref)
+    return f"{feature_view}__{feature}" if full_feature_names else feature
+
+
+class FeatureCache:
+    # Online feature values cached per (feature view, entity key) so that
+    # overlapping lookups share entries. A request is answered from cache
+    # row by row; only rows with a missing feature go upstream, in a single
+    # request. Memory is bounded by an approximate byte budget with LRU
+    # eviction, and only PRESENT values are cached.
+
+    def __init__(self, ttl_seconds: float = 3600, max_bytes: int = 256 * 1024 * 1024, enabled: bool = True):
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._entries: "OrderedDict[Hashable, Tuple[Dict[str, Any], int, float]]" = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.upstream_calls = 0
+
+    @staticmethod
+    def cacheable(payload: Dict[str, Any]) -> bool:
+        features = payload.get("features")
+        return (
+            isinstance(features, list)
+            and bool(features)
+            and all(isinstance(f, str) and ":" in f for f in features)
+            and entity_row_count(payload) is not None
+        )
+
+    def _get(self, key: Hashable) -> Optional[Dict[str, Any]]:
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        values, _, expires_at = item
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return values
+
+    def _put(self, key: Hashable, features: Dict[str, Any]):
+        expires_at = time.monotonic() + self.ttl_seconds
+        existing = self._get(key)
+        if existing is not None:
+            # Merged features keep the entry's expiry; renewing it would let
+            # the older values outlive the TTL for as long as other features
+            # of the view keep being fetched.
+            features = {**existing, **features}
+            expires_at = self._entries[key][2]
+            self._remove(key)
+        size = len(json.dumps(features, default=str)) + 64
+        self._entries[key] = (features, size, expires_at)
+        self.bytes += size
+        while self.bytes > self.max_bytes and self._entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: Hashable):
+        item = self._entries.pop(key, None)
+        if item is not None:
+            self.bytes -= item[1]
+
+    def clear(self):
+        self._entries.clear()
+        self.bytes = 0
+
+    async def get_online_features(
+        self,
+        payload: Dict[str, Any],
+        scope: Hashable,
+        fetch: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]],
+    ) -> Dict[str, Any]:
+        if not self.enabled or not self.cacheable(payload):
+            self.upstream_calls += 1
+            return await fetch(payload)
+
+        features: List[str] = payload["features"]
+        full_names = bool(payload.get("full_feature_names", False))
+        entities: Dict[str, List[Any]] = payload["entities"]
+        entity_names = list(entities)
+        row_count = len(entities[entity_names[0]])
+        row_keys = [
+            tuple((name, json.dumps(entities[name][i], default=str)) for name in sorted(entity_names))
+            for i in range(row_count)
+        ]
+        refs = [parse_feature_ref(f) for f in features]
+
+        rows: List[Optional[Dict[str, Any]]] = []
+        missing: List[int] = []
+        for i, row_key in enumerate(row_keys):
+            row: Dict[str, Any] = {}
+            for ref, (feature_view, feature) in zip(features, refs):
+                cached = self._get((scope, feature_view, row_key))
+                if cached is None or feature not in cached:
+                    row = None
+                    break
+                row[ref] = cached[feature]
+            if row is None:
+                missing.append(i)
+                self.misses += 1
+            else:
+                self.hits += 1
+            rows.append(row)
+
+        metadata: Dict[str, Any] = {}
+        if missing:
+            upstream_payload = dict(payload)
+            upstream_payload["entities"] = {name: [entities[name][i] for i in missing] for name in entity_names}
+            self.upstream_calls += 1
+            response = await fetch(upstream_payload)
+            fetched = self._parse_rows(response, features, full_names, len(missing))
+            if fetched is None:
+                if len(missing) == row_count:
+                    return response
+                # Unexpected response shape: answer the whole request upstream.
+                self.upstream_calls += 1
+                return await fetch(payload)
+            metadata = {k: v for k, v in response.get("metadata", {}).items() if k != "feature_names"}
+            for i, row in zip(missing, fetched):
+                rows[i] = row
+                self._store_row(scope, row_keys[i], row, refs, features)
+
+        return self._assemble(metadata, entities, entity_names, features, full_names, rows)
+
+    @staticmethod
+    def _parse_rows(response: Dict[str, Any], features: List[str], full_names: bool, count: int) -> Optional[List[Dict[str, Any]]]:
+        names = response.get("metadata", {}).get("feature_names", [])
+        results = response.get("results", [])
+        if len(names) != len(results):
+            return None
+        columns = dict(zip(names, results))
+        rows = [{} for _ in range(count)]
+        for ref in features:
+            column = columns.get(output_name(ref, full_names))
+            if column is None or len(column.get("values", [])) != count:
+                return None
+            statuses = column.get("statuses") or [PRESENT] * count
+            timestamps = column.get("event_timestamps") or [None] * count
+            for i in range(count):
+                rows[i][ref] = (column["values"][i], statuses[i], timestamps[i])
+        return rows
+
+    def _store_row(self, scope: Hashable, row_key: Tuple, row: Dict[str, Any], refs, features: List[str]):
+        by_view: Dict[str, Dict[str, Any]] = {}
+        for ref, (feature_view, feature) in zip(features, refs):
+            value = row[ref]
+            if value[1] == PRESENT:
+                by_view.setdefault(feature_view, {})[feature] = value
+        for feature_view, values in by_view.items():
+            self._put((scope, feature_view, row_key), values)
+
+    @staticmethod
+    def _assemble(metadata, entities, entity_names, features, full_names, rows) -> Dict[str, Any]:
+        row_count = len(rows)
+        results = [
+            {
+                "values": list(entities[name]),
+                "statuses": [PRESENT] * row_count,
+                "event_timestamps": [ENTITY_TIMESTAMP] * row_count,
+            }
+            for name in entity_names
+        ]
+        for ref in features:
+            results.append({
+                "values": [row[ref][0] for row in rows],
+                "statuses": [row[ref][1] for row in rows],
+                "event_timestamps": [row[ref][2] for row in rows],
+            })
+        return {
+            "metadata": {**metadata, "feature_names": entity_names + [output_name(ref, full_names) for ref in features]},
+            "results": results,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "upstream_calls": self.upstream_calls,
+        }
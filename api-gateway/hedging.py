@@ -0,0 +1,103 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class LatencyWindow:
+    # Recent latencies for one upstream. The percentile is recomputed every
+    # `recompute_every` samples rather than on each read.
+
+    def __init__(self, size: int = 1000, recompute_every: int = 50):
+        self.samples: Deque[float] = deque(maxlen=size)
+        self.recompute_every = recompute_every
+        self._since_recompute = 0
+        self._p95 = None
+
+    def add(self, seconds: float):
+        self.samples.append(seconds)
+        self._since_recompute += 1
+        if self._p95 is None or self._since_recompute >= self.recompute_every:
+            ordered = sorted(self.samples)
+            self._p95 = ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+            self._since_recompute = 0
+
+    def p95(self):
+        return self._p95
+
+
+class Hedger:
+    # Sends a second copy of an idempotent request when the first has not
+    # answered within the upstream's recent p95, and returns whichever
+    # finishes first; the other is cancelled. Hedges are capped at
+    # `max_hedge_ratio` of requests so a slow upstream is not sent double
+    # load, and nothing is hedged until `min_samples` latencies are known.
+
+    def __init__(self, enabled: bool = False, min_delay: float = 0.01, max_delay: float = 1.0,
+                 max_hedge_ratio: float = 0.1, min_samples: int = 20):
+        self.enabled = enabled
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.max_hedge_ratio = max_hedge_ratio
+        self.min_samples = min_samples
+        self._windows: Dict[str, LatencyWindow] = {}
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def window(self, upstream: str) -> LatencyWindow:
+        window = self._windows.get(upstream)
+        if window is None:
+            window = self._windows[upstream] = LatencyWindow()
+        return window
+
+    def record(self, upstream: str, seconds: float):
+        self.window(upstream).add(seconds)
+
+    def delay(self, upstream: str):
+        window = self.window(upstream)
+        if len(window.samples) < self.min_samples:
+            return None
+        return min(max(window.p95(), self.min_delay), self.max_delay)
+
+    async def run(self, upstream: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self.requests += 1
+        delay = self.delay(upstream) if self.enabled else None
+        if delay is None:
+            return await fn()
+
+        primary = asyncio.ensure_future(fn())
+        pending = {primary}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            if done or self.hedged >= self.max_hedge_ratio * self.requests:
+                pending = set()
+                return await primary
+
+            self.hedged += 1
+            hedge = asyncio.ensure_future(fn())
+            pending = {primary, hedge}
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winner = next((task for task in done if task.exception() is None), None)
+                if winner is not None:
+                    if winner is hedge:
+                        self.hedge_wins += 1
+                    return winner.result()
+                if not pending:
+                    # Both copies failed; surface the first error.
+                    return (primary if primary in done else hedge).result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "requests": self.requests,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "p95_seconds": {name: w.p95() for name, w in self._windows.items()},
+        }
@@ -0,0 +1,251 @@
+import json
+import asyncio
+import logging
+from typing import Any, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = frozenset(("FINISHED", "FAILED", "KILLED"))
+
+Event = Tuple[str, Dict[str, Any]]
+
+
+class RunMetricsPoll:
+    # Tracks one run. Each poll reads the run (latest value per metric) and,
+    # only for metrics whose latest step moved, fetches the steps after the
+    # last one already published. The first poll just records where every
+    # metric stands, so joining a long run does not replay its history.
+
+    def __init__(self, run_id: str, fetch_run, fetch_history):
+        self.run_id = run_id
+        self.fetch_run = fetch_run
+        self.fetch_history = fetch_history
+        self.status = None
+        self.latest: Dict[str, Dict[str, Any]] = {}
+        self.done = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"run_id": self.run_id, "status": self.status, "metrics": list(self.latest.values())}
+
+    async def __call__(self) -> List[Event]:
+        run = await self.fetch_run(self.run_id)
+        seeded = self.status is not None
+        events: List[Event] = []
+
+        for metric in run.get("data", {}).get("metrics", []):
+            key = metric["key"]
+            previous = self.latest.get(key)
+            self.latest[key] = metric
+            if not seeded:
+                continue
+            if previous is None:
+                new_steps = await self.fetch_history(self.run_id, key, None, metric["step"])
+            elif (metric["step"], metric["timestamp"]) > (previous["step"], previous["timestamp"]):
+                new_steps = await self.fetch_history(self.run_id, key, previous["step"], metric["step"])
+                new_steps = [
+                    m for m in new_steps
+                    if (m["step"], m["timestamp"]) > (previous["step"], previous["timestamp"])
+                ]
+            else:
+                continue
+            if new_steps:
+                events.append(("metrics", {"run_id": self.run_id, "key": key, "history": new_steps}))
+
+        status = run.get("info", {}).get("status")
+        if seeded and status != self.status:
+            events.append(("status", {"run_id": self.run_id, "status": status}))
+        self.status = status
+        self.done = status in TERMINAL_STATUSES
+        return events
+
+
+class ExperimentRunsPoll:
+    # Tracks the most recent runs of one experiment with a single search
+    # per poll and publishes the runs whose status or latest metrics changed.
+
+    def __init__(self, experiment_id: str, search_runs):
+        self.experiment_id = experiment_id
+        self.search_runs = search_runs
+        self.signatures: Dict[str, Any] = {}
+        self.runs: Dict[str, Dict[str, Any]] = {}
+        self.done = False
+        self._seeded = False
+
+    @staticmethod
+    def summarize(run: Dict[str, Any]) -> Dict[str, Any]:
+        info = run.get("info", {})
+        return {
+            "run_id": info.get("run_id"),
+            "run_name": info.get("run_name"),
+            "status": info.get("status"),
+            "start_time": info.get("start_time"),
+            "end_time": info.get("end_time"),
+            "metrics": run.get("data", {}).get("metrics", []),
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"experiment_id": self.experiment_id, "runs": list(self.runs.values())}
+
+    async def __call__(self) -> List[Event]:
+        events: List[Event] = []
+        for run in await self.search_runs(self.experiment_id):
+            summary = self.summarize(run)
+            signature = (
+                summary["status"],
+                summary["end_time"],
+                tuple(sorted((m["key"], m["step"], m["timestamp"]) for m in summary["metrics"])),
+            )
+            run_id = summary["run_id"]
+            if self.signatures.get(run_id) != signature:
+                self.signatures[run_id] = signature
+                self.runs[run_id] = summary
+                if self._seeded:
+                    events.append(("run", summary))
+        self._seeded = True
+        return events
+
+
+class Subscriber:
+    __slots__ = ("user", "experiment_id", "queue", "dropped")
+
+    def __init__(self, user, experiment_id: str, queue_size: int):
+        self.user = user
+        self.experiment_id = experiment_id
+        self.queue: "asyncio.Queue[Optional[Event]]" = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+    def offer(self, event: Optional[Event]):
+        # A slow reader loses its oldest events rather than holding memory
+        # or slowing the poller down for everyone else.
+        while True:
+            try:
+                self.queue.put_nowait(event)
+                return
+            except asyncio.QueueFull:
+                self.queue.get_nowait()
+                self.dropped += 1
+
+
+class SharedPoller:
+    def __init__(self, key: Hashable, poll, interval: float, on_idle: Callable[["SharedPoller"], None]):
+        self.key = key
+        self.poll = poll
+        self.interval = interval
+        self.on_idle = on_idle
+        self.subscribers: Set[Subscriber] = set()
+        self.polls = 0
+        self.errors = 0
+        self.ready = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        try:
+            while self.subscribers:
+                # The poll runs under the gateway's own identity, never a
+                # subscriber's; each reader's access is checked again
+                # before every event it receives.
+                try:
+                    events = await self.poll()
+                    self.polls += 1
+                except Exception as e:
+                    self.errors += 1
+                    logger.warning(f"Live metrics poll for {self.key} failed: {e}")
+                    events = []
+                self.ready.set()
+                for event in events:
+                    for subscriber in list(self.subscribers):
+                        subscriber.offer(event)
+                if self.poll.done:
+                    for subscriber in list(self.subscribers):
+                        subscriber.offer(("end", self.poll.snapshot()))
+                        subscriber.offer(None)
+                    break
+                await asyncio.sleep(self.interval)
+        finally:
+            self.ready.set()
+            self.on_idle(self)
+
+    def cancel(self):
+        self._task.cancel()
+
+
+class LiveMetricsHub:
+    # One shared poller per key (the caller picks it, e.g. the run),
+    # however many clients are watching; pollers stop when their last
+    # subscriber disconnects.
+
+    def __init__(self, poll_interval: float = 2.0, queue_size: int = 256, heartbeat: float = 15.0):
+        self.poll_interval = poll_interval
+        self.queue_size = queue_size
+        self.heartbeat = heartbeat
+        self._pollers: Dict[Hashable, SharedPoller] = {}
+
+    def _forget(self, poller: "SharedPoller"):
+        # A finished run's poller may already have been replaced by a new one.
+        if self._pollers.get(poller.key) is poller:
+            del self._pollers[poller.key]
+
+    def subscribe(self, key: Hashable, make_poll, user, experiment_id: str) -> Tuple[Subscriber, SharedPoller]:
+        # Pair every call with unsubscribe; event_stream does both.
+        subscriber = Subscriber(user, experiment_id, self.queue_size)
+        poller = self._pollers.get(key)
+        if poller is None:
+            poller = SharedPoller(key, make_poll(), self.poll_interval, self._forget)
+            self._pollers[key] = poller
+        poller.subscribers.add(subscriber)
+        return subscriber, poller
+
+    def unsubscribe(self, subscriber: Subscriber, poller: SharedPoller):
+        poller.subscribers.discard(subscriber)
+        if not poller.subscribers:
+            poller.cancel()
+            self._forget(poller)
+
+    async def close(self):
+        for poller in list(self._pollers.values()):
+            poller.cancel()
+        self._pollers.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pollers": len(self._pollers),
+            "subscribers": sum(len(p.subscribers) for p in self._pollers.values()),
+            "polls": sum(p.polls for p in self._pollers.values()),
+            "poll_errors": sum(p.errors for p in self._pollers.values()),
+        }
+
+
+def format_event(event: str, data: Dict[str, Any], event_id: Optional[int] = None) -> bytes:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return ("\n".join(lines) + "\n\n").encode()
+
+
+async def event_stream(hub: LiveMetricsHub, key: Hashable, make_poll, user, experiment_id: str,
+                       authorized: Callable[[Any, str], bool]):
+    # Subscribes only once the response body is being produced, so a
+    # client that goes away before then never leaves a poller behind.
+    subscriber, poller = hub.subscribe(key, make_poll, user, experiment_id)
+    sequence = 0
+    try:
+        await poller.ready.wait()
+        yield format_event("snapshot", poller.poll.snapshot(), sequence)
+        while True:
+            try:
+                item = await asyncio.wait_for(subscriber.queue.get(), hub.heartbeat)
+            except asyncio.TimeoutError:
+                yield b": keep-alive\n\n"
+                continue
+            if item is None:
+                return
+            if not authorized(subscriber.user, subscriber.experiment_id):
+                yield format_event("error", {"detail": "Access denied to experiment"})
+                return
+            sequence += 1
+            event, data = item
+            yield format_event(event, data, sequence)
+    finally:
+        hub.unsubscribe(subscriber, poller)
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Mock MLflow tracking server and Feast feature server for gateway load tests.
+Latency and payload size are configurable so the proxy path can be measured
+in isolation from real upstream cost.
+"""
+import os
+import random
+import asyncio
+import argparse
+
+import uvicorn
+from fastapi import FastAPI, Request
+
+LATENCY_MS = float(os.getenv("MOCK_LATENCY_MS", "5"))
+JITTER_MS = float(os.getenv("MOCK_LATENCY_JITTER_MS", "1"))
+PAYLOAD_ITEMS = int(os.getenv("MOCK_PAYLOAD_ITEMS", "50"))
+
+
+async def simulate_latency():
+    delay = LATENCY_MS + random.uniform(-JITTER_MS, JITTER_MS)
+    if delay > 0:
+        await asyncio.sleep(delay / 1000.0)
+
+
+def make_run(i: int) -> dict:
+    return {
+        "info": {
+            "run_id": f"run-{i}",
+            "run_uuid": f"run-{i}",
+            "experiment_id": str(i % 10),
+            "status": "FINISHED",
+            "start_time": 1700000000000 + i,
+        },
+        "data": {
+            "metrics": [{"key": f"metric_{m}", "value": random.random(), "step": 100} for m in range(10)],
+            "params": [{"key": f"param_{p}", "value": str(p * i)} for p in range(10)],
+            "tags": [{"key": "mlflow.user", "value": "loadtest"}],
+        },
+    }
+
+
+EXPERIMENTS = {
+    "experiments": [
+        {"experiment_id": str(i), "name": f"experiment-{i}", "lifecycle_stage": "active"}
+        for i in range(PAYLOAD_ITEMS)
+    ]
+}
+RUNS = {"runs": [make_run(i) for i in range(PAYLOAD_ITEMS)]}
+MODELS = {
+    "registered_models": [
+        {
+            "name": f"model-{i}",
+            "latest_versions": [{"name": f"model-{i}", "version": "3", "current_stage": "Production"}],
+        }
+        for i in range(PAYLOAD_ITEMS)
+    ]
+}
+HISTORY = {
+    "metrics": [
+        {"key": "loss", "value": 1.0 / (step + 1), "step": step, "timestamp": 1700000000000 + step}
+        for step in range(PAYLOAD_ITEMS * 20)
+    ]
+}
+
+mlflow_app = FastAPI(title="Mock MLflow")
+feast_app = FastAPI(title="Mock Feast")
+
+
+@mlflow_app.get("/health")
+async def mlflow_health():
+    return {"status": "healthy", "service": "mlflow"}
+
+
+@mlflow_app.get("/api/2.0/mlflow/experiments/list")
+@mlflow_app.get("/api/2.0/mlflow/experiments/search")
+async def mlflow_list_experiments():
+    await simulate_latency()
+    return EXPERIMENTS
+
+
+@mlflow_app.get("/api/2.0/mlflow/experiments/get")
+async def mlflow_get_experiment(experiment_id: str = "0"):
+    await simulate_latency()
+    return {"experiment": {"experiment_id": experiment_id, "name": f"experiment-{experiment_id}"}}
+
+
+@mlflow_app.api_route("/api/2.0/mlflow/runs/search", methods=["GET", "POST"])
+async def mlflow_search_runs():
+    await simulate_latency()
+    return RUNS
+
+
+@mlflow_app.get("/api/2.0/mlflow/runs/get")
+async def mlflow_get_run(run_id: str = "run-0"):
+    await simulate_latency()
+    index = int(run_id.rsplit("-", 1)[-1]) if run_id.rsplit("-", 1)[-1].isdigit() else 0
+    return {"run": make_run(index)}
+
+
+@mlflow_app.get("/api/2.0/mlflow/metrics/get-history")
+async def mlflow_metric_history():
+    await simulate_latency()
+    return HISTORY
+
+
+@mlflow_app.get("/api/2.0/mlflow/registered-models/search")
+async def mlflow_search_models():
+    await simulate_latency()
+    return MODELS
+
+
+@mlflow_app.post("/api/2.0/mlflow/experiments/create")
+@mlflow_app.post("/api/2.0/mlflow/runs/create")
+@mlflow_app.post("/api/2.0/mlflow/model-versions/create")
+async def mlflow_create(request: Request):
+    await request.body()
+    await simulate_latency()
+    return {"status": "created"}
+
+
+@feast_app.get("/health")
+async def feast_health():
+    return {"status": "healthy", "service": "feast"}
+
+
+@feast_app.post("/get-online-features")
+async def feast_online_features(request: Request):
+    payload = await request.json()
+    await simulate_latency()
+    entities = payload.get("entities", {})
+    names = list(entities)
+    rows = len(entities[names[0]]) if names else 0
+    features = payload.get("features", [])
+    results = [
+        {"values": entities[name], "statuses": ["PRESENT"] * rows, "event_timestamps": ["1970-01-01T00:00:00Z"] * rows}
+        for name in names
+    ]
+    for _ in features:
+        results.append({
+            "values": [random.random() for _ in range(rows)],
+            "statuses": ["PRESENT"] * rows,
+            "event_timestamps": ["2024-01-01T00:00:00Z"] * rows,
+        })
+    return {
+        "metadata": {"feature_names": names + [f.split(":", 1)[-1] for f in features]},
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--service", choices=["mlflow", "feast"], required=True)
+    parser.add_argument("--port", type=int, required=True)
+    args = parser.parse_args()
+
+    app = mlflow_app if args.service == "mlflow" else feast_app
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
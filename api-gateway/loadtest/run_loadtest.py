@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Gateway load test: starts the local token issuer, mock MLflow and Feast
+servers and the gateway itself, then drives each route at several
+concurrency levels and records RPS and latency percentiles as JSON.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime
+
+import httpx
+
+from token_issuer import DEFAULT_AUDIENCE, generate_signing_key, issuer_url, mint_token
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+GATEWAY_DIR = os.path.dirname(HERE)
+
+ROUTES = {
+    "health": ("GET", "/health", None),
+    "list_experiments": ("GET", "/mlflow/experiments", None),
+    "list_runs": ("GET", "/mlflow/experiments/1/runs", None),
+    "list_models": ("GET", "/mlflow/models", None),
+    "proxy_get_run": ("GET", "/mlflow/api/2.0/mlflow/runs/get?run_id=run-1", None),
+    "proxy_metric_history": ("GET", "/mlflow/api/2.0/mlflow/metrics/get-history?run_id=run-1&metric_key=loss", None),
+    "online_features": (
+        "POST",
+        "/feast/online-features",
+        {"features": ["driver_stats:conv_rate", "driver_stats:acc_rate"], "entities": {"driver_id": [1001]}},
+    ),
+}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_process(args, env=None) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable] + args,
+        cwd=GATEWAY_DIR,
+        env={**os.environ, **(env or {})},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.STDOUT,
+    )
+
+
+def wait_healthy(url: str, timeout: float = 30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not become healthy within {timeout}s")
+
+
+def percentile(sorted_values, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def drive_route(base_url: str, token: str, route: str, concurrency: int, duration: float) -> dict:
+    method, path, payload = ROUTES[route]
+    latencies = []
+    errors = 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0,
+                                 headers={"Authorization": f"Bearer {token}"}) as client:
+        deadline = time.perf_counter() + duration
+
+        async def worker():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    response = await client.request(method, path, json=payload)
+                    if response.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "mean_ms": 1000 * sum(latencies) / len(latencies) if latencies else 0.0,
+        "p50_ms": 1000 * percentile(latencies, 0.50),
+        "p95_ms": 1000 * percentile(latencies, 0.95),
+        "p99_ms": 1000 * percentile(latencies, 0.99),
+    }
+
+
+def compare_with_baseline(results: dict, baseline: dict, max_regression: float) -> list:
+    regressions = []
+    for route, levels in results["results"].items():
+        for concurrency, current in levels.items():
+            previous = baseline.get("results", {}).get(route, {}).get(concurrency)
+            if not previous:
+                continue
+            if previous["rps"] and current["rps"] < previous["rps"] * (1 - max_regression):
+                regressions.append(f"{route} c={concurrency}: rps {previous['rps']:.0f} -> {current['rps']:.0f}")
+            if previous["p95_ms"] and current["p95_ms"] > previous["p95_ms"] * (1 + max_regression):
+                regressions.append(f"{route} c={concurrency}: p95 {previous['p95_ms']:.1f}ms -> {current['p95_ms']:.1f}ms")
+    return regressions
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=GATEWAY_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--routes", default=",".join(ROUTES), help="Comma-separated route names")
+    parser.add_argument("--concurrency", default="1,10,50", help="Comma-separated concurrency levels")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per route and concurrency level")
+    parser.add_argument("--workers", type=int, default=1, help="Gateway worker processes")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="Mock upstream latency")
+    parser.add_argument("--payload-items", type=int, default=50, help="Items per mock list response")
+    parser.add_argument("--output", default=os.path.join(HERE, "results"), help="Directory for JSON results")
+    parser.add_argument("--baseline", help="Previous results file to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="Allowed relative slowdown vs baseline")
+    args = parser.parse_args()
+
+    routes = [r for r in args.routes.split(",") if r]
+    levels = [int(c) for c in args.concurrency.split(",") if c]
+    unknown = set(routes) - set(ROUTES)
+    if unknown:
+        parser.error(f"Unknown routes: {', '.join(sorted(unknown))}")
+
+    workdir = tempfile.mkdtemp(prefix="gateway-loadtest-")
+    key_path = os.path.join(workdir, "signing-key.pem")
+    private_key = generate_signing_key(key_path)
+
+    issuer_port, mlflow_port, feast_port, gateway_port = free_port(), free_port(), free_port(), free_port()
+    issuer_base = f"http://127.0.0.1:{issuer_port}"
+    mock_env = {
+        "MOCK_LATENCY_MS": str(args.latency_ms),
+        "MOCK_PAYLOAD_ITEMS": str(args.payload_items),
+    }
+    gateway_env = {
+        "API_GATEWAY_CONFIG_PATH": os.path.join(HERE, "gateway-config.yaml"),
+        "ENTRA_TENANT_ID": "loadtest",
+        "ENTRA_AUDIENCE": DEFAULT_AUDIENCE,
+        "ENTRA_ISSUER": issuer_url(issuer_base),
+        "ENTRA_JWKS_URI": f"{issuer_base}/discovery/v2.0/keys",
+        "MLFLOW_URL": f"http://127.0.0.1:{mlflow_port}",
+        "FEAST_URL": f"http://127.0.0.1:{feast_port}",
+        "FEAST_CONFIG_PATH": os.path.join(workdir, "no-feast-config.yaml"),
+        "PERMISSIONS_DB_PATH": os.path.join(workdir, "permissions.db"),
+    }
+    if args.workers > 1:
+        gateway_env["GATEWAY_WORKERS"] = str(args.workers)
+        gateway_env["GATEWAY_SHARED_CACHE_PATH"] = os.path.join(workdir, "shared-cache.db")
+
+    processes = []
+    try:
+        processes.append(start_process([os.path.join(HERE, "token_issuer.py"), "--port", str(issuer_port), "--key", key_path]))
+        processes.append(start_process([os.path.join(HERE, "mock_upstreams.py"), "--service", "mlflow", "--port", str(mlflow_port)], mock_env))
+        processes.append(start_process([os.path.join(HERE, "mock_upstreams.py"), "--service", "feast", "--port", str(feast_port)], mock_env))
+        wait_healthy(f"{issuer_base}/health")
+        wait_healthy(f"http://127.0.0.1:{mlflow_port}/health")
+        wait_healthy(f"http://127.0.0.1:{feast_port}/health")
+
+        processes.append(start_process(
+            ["-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(gateway_port),
+             "--workers", str(args.workers), "--log-level", "warning"],
+            gateway_env,
+        ))
+        gateway_url = f"http://127.0.0.1:{gateway_port}"
+        wait_healthy(f"{gateway_url}/health")
+
+        token = mint_token(private_key, issuer_url(issuer_base))
+        results = {
+            "timestamp": datetime.utcnow().isoformat(),
+            "git_commit": git_commit(),
+            "config": {
+                "workers": args.workers,
+                "duration_s": args.duration,
+                "upstream_latency_ms": args.latency_ms,
+                "payload_items": args.payload_items,
+                "cpu_count": os.cpu_count(),
+            },
+            "results": {},
+        }
+        for route in routes:
+            for concurrency in levels:
+                stats = asyncio.run(drive_route(gateway_url, token, route, concurrency, args.duration))
+                results["results"].setdefault(route, {})[str(concurrency)] = stats
+                print(
+                    f"{route:<22} c={concurrency:<4} rps={stats['rps']:>9.1f} "
+                    f"p50={stats['p50_ms']:>7.2f}ms p95={stats['p95_ms']:>7.2f}ms "
+                    f"p99={stats['p99_ms']:>7.2f}ms errors={stats['errors']}"
+                )
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    os.makedirs(args.output, exist_ok=True)
+    output_path = os.path.join(args.output, f"loadtest-{datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')}.json")
+    with open(output_path, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output_path}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(results, baseline, args.max_regression)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
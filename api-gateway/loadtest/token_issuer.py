@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for Entra ID: serves a JWKS document and mints RS256 tokens
+that the gateway accepts when ENTRA_JWKS_URI/ENTRA_ISSUER point here.
+"""
+import os
+import json
+import time
+import argparse
+import uuid
+
+import jwt
+import uvicorn
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import FastAPI
+
+KEY_ID = "loadtest-key"
+DEFAULT_AUDIENCE = "api://loadtest-gateway"
+
+
+def issuer_url(base_url: str) -> str:
+    return f"{base_url}/v2.0"
+
+
+def generate_signing_key(path: str):
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = private_key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption(),
+    )
+    with open(path, "wb") as f:
+        f.write(pem)
+    return private_key
+
+
+def load_signing_key(path: str):
+    with open(path, "rb") as f:
+        return serialization.load_pem_private_key(f.read(), password=None)
+
+
+def public_jwks(private_key) -> dict:
+    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key()))
+    jwk.update({"kid": KEY_ID, "use": "sig", "alg": "RS256"})
+    return {"keys": [jwk]}
+
+
+def mint_token(private_key, issuer: str, audience: str = DEFAULT_AUDIENCE, user_id: str = None,
+               roles=("mlflow:read", "mlflow:write"), groups=(), ttl: int = 3600) -> str:
+    user_id = user_id or str(uuid.uuid4())
+    now = int(time.time())
+    claims = {
+        "iss": issuer,
+        "aud": audience,
+        "iat": now,
+        "nbf": now,
+        "exp": now + ttl,
+        "oid": user_id,
+        "sub": user_id,
+        "email": f"{user_id}@loadtest.local",
+        "name": f"Load Test {user_id[:8]}",
+        "roles": list(roles),
+        "groups": list(groups),
+    }
+    return jwt.encode(claims, private_key, algorithm="RS256", headers={"kid": KEY_ID})
+
+
+def create_app(private_key) -> FastAPI:
+    app = FastAPI(title="Load test token issuer")
+    jwks = public_jwks(private_key)
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy", "service": "token-issuer"}
+
+    @app.get("/discovery/v2.0/keys")
+    async def keys():
+        return jwks
+
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=9400)
+    parser.add_argument("--key", default=os.getenv("LOADTEST_SIGNING_KEY", "loadtest-signing-key.pem"))
+    args = parser.parse_args()
+
+    key = load_signing_key(args.key) if os.path.exists(args.key) else generate_signing_key(args.key)
+    uvicorn.run(create_app(key), host="127.0.0.1", port=args.port, log_level="warning")
@@ -2,19 +2,63 @@ import os
 import json
 import logging
 import asyncio
-from typing import Optional, Dict, Any
+import hashlib
+import time
+from typing import Optional, Dict, Any, List
+from collections import OrderedDict
 from datetime import datetime, timedelta
+from urllib.parse import unquote
 import httpx
 import uvicorn
 from fastapi import FastAPI, HTTPException, Depends, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.responses import JSONResponse, HTMLResponse, RedirectResponse
+from fastapi.responses import JSONResponse, HTMLResponse, RedirectResponse, StreamingResponse
 from fastapi.openapi.utils import get_openapi
 from pydantic import BaseModel
 import jwt
 from jwt import PyJWKClient
 import yaml
+from permissions import PermissionStore, PRINCIPAL_USER, PRINCIPAL_GROUP, serialize_grant
+from response_cache import ResponseCache, etag_matches
+from coalescing import SingleFlight
+from rate_limit import RateLimiter
+from metrics import (
+    MetricsMiddleware,
+    observe_upstream,
+    record_upstream_status,
+    register_stats,
+    start_metrics_server,
+    multiprocess_enabled,
+    prepare_multiprocess_metrics,
+    start_multiprocess_metrics_server,
+    StatsPublisher,
+)
+from shared_cache import SharedCache, TieredCache, DEFAULT_SHARED_CACHE_PATH
+from auth_middleware import AuthMiddleware
+from feast_batching import OnlineFeatureBatcher
+from feature_cache import FeatureCache
+from warmup import Readiness
+from access_log import AccessLogger, AccessLogMiddleware, RotatingFileSink, SocketSink
+from deadlines import DEADLINE_HEADER, DeadlineExceeded, DeadlineMiddleware, DeadlinePolicy, current_deadline, expired, remaining
+from hedging import Hedger
+from upstream_pool import UpstreamPool
+from runs_search import InvalidSearchParameter, search_runs
+from live_metrics import ExperimentRunsPoll, LiveMetricsHub, RunMetricsPoll, event_stream
+from downsampling import METHODS as DOWNSAMPLING_METHODS, downsample, history_arrays
+from run_compare import ARROW_STREAM_MEDIA_TYPE, arrow_available, comparison_arrow, comparison_frame, comparison_json
+from model_registry import ModelRegistryCache
+from token_manager import TokenExchangeError, TokenManager
+from admission import AdmissionController, Overloaded, PriorityClassifier, PriorityMiddleware, current_priority
+from compression import CompressionMiddleware, ResponseCompressor, is_compressible, weak_etag
+from artifact_stream import (
+    LocalFileRangeResponse,
+    forwarded_request_headers,
+    resolve_local_artifact,
+    stream_upload,
+    stream_upstream,
+    upload_headers,
+)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -26,6 +70,8 @@ class EntraIDConfig(BaseModel):
     authority: str
     scopes: list
     audience: str
+    issuer: str
+    jwks_uri: str
 
 class UserInfo(BaseModel):
     user_id: str
@@ -40,6 +86,33 @@ class ExperimentAccess(BaseModel):
     permissions: list
     created_at: datetime
 
+class PermissionGrant(BaseModel):
+    experiment_id: str
+    principal_id: str
+    principal_type: str = PRINCIPAL_USER
+    permissions: list
+
+class PermissionLookup(BaseModel):
+    experiment_id: str
+    principal_id: str
+    principal_type: str = PRINCIPAL_USER
+
+class BatchSubRequest(BaseModel):
+    method: str = "GET"
+    path: str
+    params: Optional[Dict[str, Any]] = None
+    body: Optional[Any] = None
+
+class BatchRequest(BaseModel):
+    requests: List[BatchSubRequest]
+    max_concurrency: Optional[int] = None
+
+class CompareRequest(BaseModel):
+    run_ids: List[str]
+    metric_keys: Optional[List[str]] = None
+    param_keys: Optional[List[str]] = None
+    include_identical: bool = False
+
 app = FastAPI(title="MLOps API Gateway", version="1.0.0")
 
 app.add_middleware(
@@ -50,12 +123,40 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-security = HTTPBearer()
+security = HTTPBearer(auto_error=False)
 
 entra_config = None
 jwks_client = None
+gateway_config = {}
 user_sessions = {}
-experiment_permissions = {}
+permission_store = None
+response_cache = ResponseCache(enabled=False)
+upstream_flight = SingleFlight()
+rate_limiter = RateLimiter(enabled=False)
+batch_config = {"max_requests": 50, "max_concurrency": 10}
+run_experiments = OrderedDict()
+feature_batcher = None
+feature_cache = FeatureCache(enabled=False)
+response_compressor = ResponseCompressor(enabled=False)
+access_logger = AccessLogger(enabled=False)
+deadline_policy = DeadlinePolicy(enabled=False)
+hedger = Hedger()
+upstream_pools: Dict[str, UpstreamPool] = {}
+admission_controllers: Dict[str, AdmissionController] = {}
+priority_classifier = PriorityClassifier()
+live_metrics_hub = LiveMetricsHub()
+model_registry = ModelRegistryCache(enabled=False)
+token_manager = TokenManager()
+upstream_token_scopes: Dict[str, str] = {}
+service_token_scopes: Dict[str, str] = {}
+readiness = Readiness()
+warmup_task = None
+stats_task = None
+shared_cache = None
+token_cache = TieredCache("token")
+token_cache_ttl = 300.0
+http_client = None
+
 def custom_openapi():
     if app.openapi_schema:
         return app.openapi_schema
@@ -78,8 +179,85 @@ def custom_openapi():
 
 app.openapi = custom_openapi
 
+def load_feature_cache_ttl(default: float) -> float:
+    feast_config_path = os.getenv("FEAST_CONFIG_PATH", "/app/config/feast-config.yaml")
+    try:
+        with open(feast_config_path, 'r') as f:
+            feast_config = yaml.safe_load(f) or {}
+    except OSError:
+        return default
+    return float(feast_config.get("settings", {}).get("feature_cache_ttl", default))
+
+def build_access_logger(config: Dict[str, Any]) -> AccessLogger:
+    logging_config = config.get("logging", {})
+    pipeline_config = logging_config.get("pipeline", {})
+    audit_logging = config.get("security", {}).get("audit_logging", False)
+    access_logs = logging_config.get("access_logs", False)
+    auth_logs = logging_config.get("auth_logs", False)
+    if not (access_logs or auth_logs or audit_logging) or not pipeline_config.get("enabled", True):
+        return AccessLogger(enabled=False)
+
+    if pipeline_config.get("sink", "file") == "socket":
+        sink = SocketSink(pipeline_config.get("host", "127.0.0.1"), int(pipeline_config.get("port", 24224)))
+    else:
+        # {pid} keeps multi-worker deployments from rotating each other's files.
+        path = os.getenv("GATEWAY_ACCESS_LOG_PATH", pipeline_config.get("path", "/app/logs/gateway-access.jsonl"))
+        sink = RotatingFileSink(
+            path.format(pid=os.getpid()),
+            max_bytes=int(pipeline_config.get("max_bytes", 100 * 1024 * 1024)),
+            backup_count=int(pipeline_config.get("backup_count", 5))
+        )
+    return AccessLogger(
+        sink,
+        capacity=int(pipeline_config.get("buffer_size", 65536)),
+        batch_size=int(pipeline_config.get("batch_size", 512)),
+        flush_interval=float(pipeline_config.get("flush_interval_seconds", 1.0)),
+        sample_rate=float(pipeline_config.get("sample_rate", 1.0)),
+        access_logs=access_logs,
+        auth_logs=auth_logs,
+        request_id=logging_config.get("request_id", True)
+    )
+
+UPSTREAM_DEFAULTS = {
+    "mlflow": ("MLFLOW_URL", "http://mlflow:5000"),
+    "feast": ("FEAST_URL", "http://feast:6566"),
+}
+
+def build_upstream_pools(config: Dict[str, Any]) -> Dict[str, UpstreamPool]:
+    services_config = config.get("services", {})
+    pool_config = config.get("upstream_pool", {})
+    pools = {}
+    for service, (env_var, default_url) in UPSTREAM_DEFAULTS.items():
+        service_config = services_config.get(service, {})
+        # MLFLOW_URL / FEAST_URL may list several replicas, comma separated.
+        env_urls = os.getenv(env_var)
+        if env_urls:
+            urls = [url.strip() for url in env_urls.split(",") if url.strip()]
+        else:
+            urls = service_config.get("endpoints") or [service_config.get("url", default_url)]
+        pools[service] = UpstreamPool(
+            service,
+            urls,
+            strategy=pool_config.get("strategy", "least_outstanding"),
+            ewma_decay=float(pool_config.get("ewma_decay", 0.3)),
+            eject_after=int(pool_config.get("eject_after_failures", 5)),
+            eject_seconds=float(pool_config.get("eject_seconds", 10)),
+            max_eject_seconds=float(pool_config.get("max_eject_seconds", 300)),
+            max_ejection_ratio=float(pool_config.get("max_ejection_ratio", 0.5)),
+            recover_seconds=float(pool_config.get("recover_seconds", 60)),
+            health_path=service_config.get("health_path", "/health"),
+            probe_interval=float(pool_config.get("probe_interval_seconds", 10)),
+            probe_timeout=float(pool_config.get("probe_timeout_seconds", 2))
+        )
+        logger.info(f"{service} upstream pool: {', '.join(urls)}")
+    return pools
+
 def load_config():
-    global entra_config, jwks_client
+    global entra_config, jwks_client, gateway_config, permission_store, response_cache, upstream_flight, rate_limiter
+    global shared_cache, token_cache, token_cache_ttl, batch_config, feature_batcher
+    global feature_cache, response_compressor, access_logger, deadline_policy, hedger, upstream_pools
+    global admission_controllers, priority_classifier, live_metrics_hub, model_registry
+    global token_manager, upstream_token_scopes, service_token_scopes
     
     config_path = os.getenv("API_GATEWAY_CONFIG_PATH", "/app/config/api-gateway-config.yaml")
     
@@ -93,30 +271,257 @@ def load_config():
             client_secret=os.getenv("ENTRA_CLIENT_SECRET", config.get("entra_id", {}).get("client_secret", "")),
             authority=f"https://login.microsoftonline.com/{os.getenv('ENTRA_TENANT_ID', config.get('entra_id', {}).get('tenant_id', ''))}",
             scopes=config.get("entra_id", {}).get("scopes", ["openid", "profile", "email"]),
-            audience=config.get("entra_id", {}).get("audience", "")
+            audience=os.getenv("ENTRA_AUDIENCE", config.get("entra_id", {}).get("audience", "")),
+            issuer=os.getenv("ENTRA_ISSUER", config.get("entra_id", {}).get("issuer", "")),
+            jwks_uri=os.getenv("ENTRA_JWKS_URI", config.get("entra_id", {}).get("jwks_uri", ""))
         )
+        if not entra_config.issuer:
+            entra_config.issuer = f"https://login.microsoftonline.com/{entra_config.tenant_id}/v2.0"
+        if not entra_config.jwks_uri:
+            entra_config.jwks_uri = f"https://login.microsoftonline.com/{entra_config.tenant_id}/discovery/v2.0/keys"
         
-        jwks_uri = f"https://login.microsoftonline.com/{entra_config.tenant_id}/discovery/v2.0/keys"
-        jwks_client = PyJWKClient(jwks_uri)
+        jwks_client = PyJWKClient(entra_config.jwks_uri)
+
+        gateway_config = config or {}
+
+        token_config = gateway_config.get("token_manager", {})
+        token_manager = TokenManager(
+            token_url=f"{entra_config.authority}/oauth2/v2.0/token",
+            client_id=entra_config.client_id,
+            client_secret=entra_config.client_secret,
+            refresh_margin=float(token_config.get("refresh_margin_seconds", 300)),
+            max_entries=int(token_config.get("max_entries", 10000)),
+            timeout=float(token_config.get("timeout_seconds", 10)),
+            max_connections=int(token_config.get("max_connections", 20)),
+            observe=lambda: observe_upstream("entra", "POST")
+        )
+        upstream_token_scopes = {
+            service: service_config["token_scope"]
+            for service, service_config in gateway_config.get("services", {}).items()
+            if service_config.get("token_scope")
+        }
+        # App tokens for the gateway's own background calls: the service's
+        # delegated scope when set, else the gateway's API itself.
+        default_service_scope = token_config.get("service_scope") or (
+            f"{entra_config.audience or f'api://{entra_config.client_id}'}/.default"
+        )
+        service_token_scopes = {
+            service: upstream_token_scopes.get(service, default_service_scope) for service in UPSTREAM_DEFAULTS
+        }
+        permissions_path = os.getenv(
+            "PERMISSIONS_DB_PATH",
+            gateway_config.get("permissions", {}).get("store_path", ":memory:")
+        )
+        permission_store = PermissionStore(
+            permissions_path,
+            refresh_interval=float(gateway_config.get("permissions", {}).get("refresh_interval", 1.0))
+        )
+
+        shared_config = gateway_config.get("shared_cache", {})
+        shared_path = os.getenv("GATEWAY_SHARED_CACHE_PATH")
+        if shared_path is None and shared_config.get("enabled", False):
+            shared_path = shared_config.get("path", DEFAULT_SHARED_CACHE_PATH)
+        if shared_path:
+            shared_cache = SharedCache(shared_path)
+            logger.info(f"Sharing the token cache through {shared_path}")
+        token_cache_ttl = float(shared_config.get("token_ttl_seconds", 300))
+        token_cache = TieredCache("token", shared=shared_cache)
+
+        cache_config = gateway_config.get("response_cache", {})
+        response_cache = ResponseCache(
+            ttl_seconds=float(cache_config.get("ttl_seconds", 5)),
+            max_entries=int(cache_config.get("max_entries", 10000)),
+            enabled=cache_config.get("enabled", True)
+        )
+
+        upstream_flight = SingleFlight(
+            enabled=gateway_config.get("request_coalescing", {}).get("enabled", True)
+        )
+
+        batch_config = {
+            "max_requests": int(gateway_config.get("batch", {}).get("max_requests", 50)),
+            "max_concurrency": int(gateway_config.get("batch", {}).get("max_concurrency", 10))
+        }
+
+        batching_config = gateway_config.get("feast_batching", {})
+        feature_batcher = OnlineFeatureBatcher(
+            send_online_features,
+            window_ms=float(batching_config.get("window_ms", 2)),
+            max_batch_size=int(batching_config.get("max_batch_size", 256)),
+            enabled=batching_config.get("enabled", True)
+        )
+
+        feature_cache_config = gateway_config.get("feature_cache", {})
+        feature_cache = FeatureCache(
+            ttl_seconds=load_feature_cache_ttl(float(feature_cache_config.get("ttl_seconds", 3600))),
+            max_bytes=int(feature_cache_config.get("max_bytes", 256 * 1024 * 1024)),
+            enabled=feature_cache_config.get("enabled", True)
+        )
+
+        compression_config = gateway_config.get("compression", {})
+        response_compressor = ResponseCompressor(
+            minimum_size=int(compression_config.get("minimum_size", 1024)),
+            encodings=compression_config.get("encodings", ["br", "zstd", "gzip"]),
+            levels=compression_config.get("levels"),
+            enabled=compression_config.get("enabled", True)
+        )
+
+        rate_config = gateway_config.get("rate_limiting", {})
+        workers = int(os.getenv("GATEWAY_WORKERS", 1))
+        rate_limiter = RateLimiter(
+            requests_per_minute=float(rate_config.get("requests_per_minute", 1000)),
+            burst_size=float(rate_config.get("burst_size", 100)),
+            per_user_limit=float(rate_config.get("per_user_limit", 100)),
+            per_user_burst=rate_config.get("per_user_burst"),
+            enabled=rate_config.get("enabled", True),
+            redis_url=os.getenv("RATE_LIMIT_REDIS_URL", rate_config.get("redis_url")),
+            workers=workers,
+            shared=shared_cache if workers > 1 else None
+        )
         
+        access_logger = build_access_logger(gateway_config)
+        upstream_pools = build_upstream_pools(gateway_config)
+
+        admission_config = gateway_config.get("admission_control", {})
+        upstream_limits = admission_config.get("upstreams", {})
+        queue_targets = {
+            priority: float(ms) / 1000.0 for priority, ms in admission_config.get("queue_target_ms", {}).items()
+        }
+        admission_controllers = {
+            service: AdmissionController(
+                service,
+                max_concurrency=int(upstream_limits.get(service, {}).get("max_concurrency", 64)),
+                max_queue=int(upstream_limits.get(service, {}).get("max_queue", 256)),
+                queue_targets=queue_targets,
+                enabled=admission_config.get("enabled", True)
+            )
+            for service in UPSTREAM_DEFAULTS
+        }
+        live_config = gateway_config.get("live_metrics", {})
+        live_metrics_hub = LiveMetricsHub(
+            poll_interval=float(live_config.get("poll_interval_seconds", 2)),
+            queue_size=int(live_config.get("queue_size", 256)),
+            heartbeat=float(live_config.get("heartbeat_seconds", 15))
+        )
+
+        registry_config = gateway_config.get("model_registry_cache", {})
+        model_registry = ModelRegistryCache(
+            refresh_interval=float(registry_config.get("refresh_interval_seconds", 15)),
+            max_staleness=float(registry_config.get("max_staleness_seconds", 60)),
+            enabled=registry_config.get("enabled", True)
+        )
+
+        priority_classifier = PriorityClassifier(
+            batch_paths=admission_config.get("batch_paths", ["/mlflow/batch"]),
+            batch_user_agents=admission_config.get(
+                "batch_user_agents", ["mlflow-python-client", "python-requests", "python-httpx", "curl"]
+            ),
+            elevate_roles=admission_config.get("elevate_priority_roles", [])
+        )
+
+        deadline_config = gateway_config.get("deadlines", {})
+        deadline_policy = DeadlinePolicy(
+            default_timeout=float(deadline_config.get("default_timeout_seconds", UPSTREAM_TIMEOUT)),
+            max_timeout=float(deadline_config.get("max_timeout_seconds", 120)),
+            routes={prefix: float(t) for prefix, t in deadline_config.get("routes", {}).items()},
+            enabled=deadline_config.get("enabled", True)
+        )
+
+        hedging_config = gateway_config.get("hedging", {})
+        hedger = Hedger(
+            enabled=hedging_config.get("enabled", False),
+            min_delay=float(hedging_config.get("min_delay_ms", 10)) / 1000.0,
+            max_delay=float(hedging_config.get("max_delay_ms", 1000)) / 1000.0,
+            max_hedge_ratio=float(hedging_config.get("max_hedge_ratio", 0.1)),
+            min_samples=int(hedging_config.get("min_samples", 20))
+        )
+
         logger.info("Entra ID configuration loaded successfully")
         
     except Exception as e:
         logger.error(f"Failed to load configuration: {e}")
         raise
 
-async def verify_entra_token(credentials: HTTPAuthorizationCredentials = Depends(security)) -> UserInfo:
+def store_session(user_info: UserInfo, token: str):
+    user_sessions[user_info.user_id] = {
+        "user_info": user_info,
+        "token": token,
+        "expires_at": datetime.utcnow() + timedelta(hours=1)
+    }
+
+def get_session_token(user_id: str) -> str:
+    # Raw tokens stay in the worker that received them. Other workers only
+    # share the verified UserInfo, keyed by token hash, and record the
+    # session themselves when the token reaches them.
+    session = user_sessions.get(user_id)
+    if session is not None:
+        return session["token"]
+    raise HTTPException(status_code=401, detail="Session expired")
+
+def remember_sign_in(tokens: Dict[str, Any]):
+    # The ID token comes straight from the token endpoint over TLS, so its
+    # claims identify the user without a signature check.
+    id_token = tokens.get("id_token")
+    refresh_token = tokens.get("refresh_token")
+    if not id_token or not refresh_token:
+        return
+    try:
+        claims = jwt.decode(id_token, options={"verify_signature": False})
+    except jwt.InvalidTokenError:
+        return
+    user_id = claims.get("oid", claims.get("sub"))
+    if user_id:
+        token_manager.remember_refresh_token(user_id, refresh_token)
+
+async def service_headers(service: str = "mlflow") -> Dict[str, str]:
+    # The gateway's own identity, for background work that outlives any one
+    # caller. No X-User-ID, so send_upstream does not try to delegate it.
+    token = await token_manager.app_token(service_token_scopes[service])
+    return {"Authorization": f"Bearer {token}", "X-User-Name": "mlops-gateway"}
+
+async def delegated_headers(service: str, headers: Dict[str, str]) -> Dict[str, str]:
+    # Upstreams with a token_scope get an on-behalf-of token for that scope
+    # instead of the caller's own token.
+    token_scope = upstream_token_scopes.get(service)
+    user_id = headers.get("X-User-ID")
+    if token_scope is None or user_id is None:
+        return headers
+    authorization = headers.get("Authorization", "")
+    assertion = authorization[len("Bearer "):] if authorization.startswith("Bearer ") else None
     try:
-        token = credentials.credentials
+        token = await token_manager.on_behalf_of(user_id, assertion, token_scope)
+    except TokenExchangeError as e:
+        logger.error(f"On-behalf-of token for {service} failed: {e}")
+        if e.status_code is None:
+            raise HTTPException(status_code=502, detail="Identity provider unavailable")
+        raise HTTPException(status_code=401, detail="Could not obtain a token for the upstream service")
+    return {**headers, "Authorization": f"Bearer {token}"}
+
+async def authenticate_token(token: str) -> UserInfo:
+    try:
+        token_key = hashlib.sha256(token.encode()).hexdigest()
+
+        cached = token_cache.get(token_key)
+        if cached is not None:
+            user_info = UserInfo(**cached)
+            session = user_sessions.get(user_info.user_id)
+            if session is None or session["token"] != token:
+                user_sessions[user_info.user_id] = {
+                    "user_info": user_info,
+                    "token": token,
+                    "expires_at": datetime.utcnow() + timedelta(hours=1)
+                }
+            return user_info
         
-        signing_key = jwks_client.get_signing_key_from_jwt(token)
+        with observe_upstream("entra", "JWKS"):
+            signing_key = jwks_client.get_signing_key_from_jwt(token)
         
         payload = jwt.decode(
             token,
             signing_key.key,
             algorithms=["RS256"],
             audience=entra_config.audience,
-            issuer=f"https://login.microsoftonline.com/{entra_config.tenant_id}/v2.0"
+            issuer=entra_config.issuer
         )
         
         user_info = UserInfo(
@@ -126,12 +531,12 @@ async def verify_entra_token(credentials: HTTPAuthorizationCredentials = Depends
             groups=payload.get("groups", []),
             roles=payload.get("roles", [])
         )
-        
-        user_sessions[user_info.user_id] = {
-            "user_info": user_info,
-            "token": token,
-            "expires_at": datetime.utcnow() + timedelta(hours=1)
-        }
+
+        ttl = token_cache_ttl
+        if "exp" in payload:
+            ttl = min(ttl, payload["exp"] - datetime.utcnow().timestamp())
+        token_cache.set(token_key, user_info.dict(), ttl)
+        store_session(user_info, token)
         
         return user_info
         
@@ -143,11 +548,21 @@ async def verify_entra_token(credentials: HTTPAuthorizationCredentials = Depends
         logger.error(f"Token verification failed: {e}")
         raise HTTPException(status_code=401, detail="Token verification failed")
 
-async def check_experiment_permission(experiment_id: str, user: UserInfo, required_permission: str = "read") -> bool:
-    user_key = f"{user.user_id}:{experiment_id}"
-    
-    if user_key in experiment_permissions:
-        permissions = experiment_permissions[user_key]["permissions"]
+async def verify_entra_token(
+    request: Request,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security)
+) -> UserInfo:
+    user = request.scope.get("user")
+    if user is not None:
+        return user
+    if credentials is None:
+        raise HTTPException(status_code=401, detail="Authorization header required")
+    return await authenticate_token(credentials.credentials)
+
+def has_experiment_permission(experiment_id: str, user: UserInfo, required_permission: str = "read") -> bool:
+    permission_store.refresh_if_changed()
+    permissions = permission_store.effective_permissions(experiment_id, user.user_id, user.groups)
+    if permissions is not None:
         return required_permission in permissions or "admin" in permissions
     
     if "mlflow:admin" in user.roles:
@@ -161,114 +576,733 @@ async def check_experiment_permission(experiment_id: str, user: UserInfo, requir
     
     return False
 
-async def forward_to_mlflow(request: Request, user: UserInfo, path: str):
-    mlflow_url = os.getenv("MLFLOW_URL", "http://mlflow:5000")
-    
-    headers = {
-        "Authorization": f"Bearer {user_sessions[user.user_id]['token']}",
+async def check_experiment_permission(experiment_id: str, user: UserInfo, required_permission: str = "read") -> bool:
+    return has_experiment_permission(experiment_id, user, required_permission)
+
+def filter_experiments(experiments: list, user: UserInfo) -> list:
+    permission_store.refresh_if_changed()
+    if "mlflow:admin" in user.roles or "mlflow:read" in user.roles or "mlflow:write" in user.roles:
+        denied = permission_store.denied_experiments(user.user_id, user.groups, "read")
+        if not denied:
+            return experiments
+        return [e for e in experiments if str(e.get("experiment_id")) not in denied]
+
+    visible = permission_store.visible_experiments(user.user_id, user.groups, "read")
+    return [e for e in experiments if str(e.get("experiment_id")) in visible]
+
+HOP_BY_HOP_HEADERS = frozenset((
+    "connection",
+    "keep-alive",
+    "transfer-encoding",
+    "content-length",
+    "content-encoding",
+    "upgrade",
+))
+
+UPSTREAM_TIMEOUT = 30.0
+COALESCED_METHODS = frozenset(("GET", "HEAD"))
+
+def get_http_client() -> httpx.AsyncClient:
+    global http_client
+    if http_client is None or http_client.is_closed:
+        http_client = httpx.AsyncClient(
+            timeout=UPSTREAM_TIMEOUT,
+            limits=httpx.Limits(max_connections=200, max_keepalive_connections=50)
+        )
+    return http_client
+
+def upstream_headers(user: UserInfo) -> Dict[str, str]:
+    return {
+        "Authorization": f"Bearer {get_session_token(user.user_id)}",
         "X-User-ID": user.user_id,
         "X-User-Email": user.email,
         "X-User-Name": user.name,
         "X-User-Groups": ",".join(user.groups),
         "X-User-Roles": ",".join(user.roles)
     }
-    
-    async with httpx.AsyncClient() as client:
+
+def proxy_response(response: httpx.Response) -> JSONResponse:
+    headers = {k: v for k, v in response.headers.items() if k.lower() not in HOP_BY_HOP_HEADERS}
+    return JSONResponse(
+        content=response.json() if response.headers.get("content-type", "").startswith("application/json") else {"data": response.text},
+        status_code=response.status_code,
+        headers=headers
+    )
+
+async def send_upstream(
+    service: str,
+    method: str,
+    path: str,
+    headers: Dict[str, str],
+    body: bytes = b"",
+    params=None,
+    scope: Optional[str] = None
+) -> httpx.Response:
+    pool = upstream_pools[service]
+    idempotent = method in COALESCED_METHODS and not body
+    headers = await delegated_headers(service, headers)
+
+    async def attempt(exclude=()):
+        # The upstream gets whatever is left of the caller's deadline, and is
+        # told about it so it can give up at the same time.
+        timeout = remaining(UPSTREAM_TIMEOUT)
+        attempt_headers = headers
+        if current_deadline.get() is not None:
+            attempt_headers = {**headers, DEADLINE_HEADER: f"{int(timeout * 1000)}ms"}
+        endpoint = pool.pick(exclude)
+        start = time.perf_counter()
         try:
-            response = await client.request(
-                method=request.method,
-                url=f"{mlflow_url}/{path}",
-                headers=headers,
-                content=await request.body(),
-                params=request.query_params,
-                timeout=30.0
-            )
-            
-            return JSONResponse(
-                content=response.json() if response.headers.get("content-type", "").startswith("application/json") else {"data": response.text},
-                status_code=response.status_code,
-                headers=dict(response.headers)
-            )
-            
-        except httpx.RequestError as e:
-            logger.error(f"MLflow request failed: {e}")
-            raise HTTPException(status_code=502, detail="MLflow service unavailable")
+            with observe_upstream(service, method), pool.track(endpoint) as record_status:
+                response = await get_http_client().request(
+                    method=method,
+                    url=f"{endpoint.url}/{path}",
+                    headers=attempt_headers,
+                    content=body,
+                    params=params,
+                    timeout=timeout
+                )
+                record_status(response.status_code)
+        except httpx.TimeoutException:
+            if expired():
+                raise DeadlineExceeded()
+            raise
+        except httpx.ConnectError:
+            # Nothing reached the replica, so even writes are safe to retry
+            # once on another one.
+            if exclude or len(pool.endpoints) == 1:
+                raise
+            return await attempt((endpoint,))
+        hedger.record(service, time.perf_counter() - start)
+        record_upstream_status(service, response.status_code)
+        return response
 
-async def forward_to_feast(request: Request, user: UserInfo, path: str):
-    feast_url = os.getenv("FEAST_URL", "http://feast:6566")
+    async def call():
+        if idempotent:
+            return await hedger.run(service, attempt)
+        return await attempt()
+
+    async def send():
+        # Admission sits inside single-flight, so coalesced callers share
+        # one slot, and outside hedging, so a hedge does not take another.
+        return await admission_controllers[service].run(
+            call, current_priority.get(), remaining(UPSTREAM_TIMEOUT)
+        )
 
+    if not idempotent or scope is None:
+        return await send()
+
+    if params is None:
+        query = ()
+    elif hasattr(params, "multi_items"):
+        query = tuple(sorted(params.multi_items()))
+    else:
+        query = tuple(sorted((str(k), str(v)) for k, v in params.items()))
+    return await upstream_flight.do((service, method, path, query, scope), send)
+
+async def upstream_request(request: Request, user: UserInfo, service: str, path: str) -> httpx.Response:
+    return await send_upstream(
+        service,
+        request.method,
+        path,
+        upstream_headers(user),
+        body=await request.body(),
+        params=request.query_params,
+        scope=permission_scope(user)
+    )
+
+async def forward_to_mlflow(request: Request, user: UserInfo, path: str):
+    try:
+        response = await upstream_request(request, user, "mlflow", path)
+    except httpx.RequestError as e:
+        logger.error(f"MLflow request failed: {e}")
+        raise HTTPException(status_code=502, detail="MLflow service unavailable")
+
+    return proxy_response(response)
+
+def permission_scope(user: UserInfo) -> str:
+    parts = [",".join(sorted(user.roles)), ",".join(sorted(user.groups))]
+    if permission_store.has_user_grants(user.user_id):
+        parts.append(user.user_id)
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()
+
+def cached_response(request: Request, entry, cache_status: str) -> Response:
     headers = {
-        "Authorization": f"Bearer {user_sessions[user.user_id]['token']}",
-        "X-User-ID": user.user_id,
-        "X-User-Email": user.email,
-        "X-User-Name": user.name,
-        "X-User-Groups": ",".join(user.groups),
-        "X-User-Roles": ",".join(user.roles)
+        "ETag": entry.etag,
+        "Cache-Control": f"private, max-age={int(response_cache.ttl_seconds)}",
+        "X-Cache": cache_status
     }
+    encoding = None
+    if len(entry.body) >= response_compressor.minimum_size and is_compressible(entry.media_type):
+        encoding = response_compressor.negotiate(request.headers.get("accept-encoding"))
+        headers["Vary"] = "Accept-Encoding"
+    if encoding is not None:
+        headers["ETag"] = weak_etag(entry.etag)
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        response_cache.not_modified += 1
+        return Response(status_code=304, headers=headers)
+    if encoding is None:
+        return Response(content=entry.body, status_code=entry.status_code, media_type=entry.media_type, headers=headers)
+
+    # Each coding is produced once per entry and reused until it expires;
+    # the Content-Encoding header makes the middleware leave it alone.
+    body = entry.encoded.get(encoding)
+    if body is None:
+        body = entry.encoded[encoding] = response_compressor.compress(encoding, entry.body)
+    headers["Content-Encoding"] = encoding
+    return Response(content=body, status_code=entry.status_code, media_type=entry.media_type, headers=headers)
+
+async def cached_forward_to_mlflow(request: Request, user: UserInfo, path: str, tag: str, transform=None):
+    key = response_cache.make_key(permission_scope(user), path, request.query_params.multi_items())
+    entry = response_cache.get(key)
+    if entry is not None:
+        return cached_response(request, entry, "HIT")
+
+    response = await forward_to_mlflow(request, user, path)
+    if response.status_code != 200:
+        return response
+
+    body = response.body
+    if transform is not None:
+        body = json.dumps(transform(json.loads(body))).encode()
+    entry = response_cache.set(key, body, tags=[tag])
+    return cached_response(request, entry, "MISS")
+
+async def cached_json(request: Request, user: UserInfo, path: str, tag: str, produce):
+    key = response_cache.make_key(permission_scope(user), path, request.query_params.multi_items())
+    entry = response_cache.get(key)
+    if entry is not None:
+        return cached_response(request, entry, "HIT")
+
+    entry = response_cache.set(key, json.dumps(await produce()).encode(), tags=[tag])
+    return cached_response(request, entry, "MISS")
+
+def invalidate_mlflow_cache(method: str, path: str):
+    if method in ("GET", "HEAD", "OPTIONS"):
+        return
+    if "registered-models" in path or "model-versions" in path:
+        response_cache.invalidate("models")
+        model_registry.mark_stale()
+    if "experiments/" in path:
+        response_cache.invalidate("experiments")
+    if "runs/" in path:
+        response_cache.invalidate_prefix("runs:")
+    if "log-metric" in path or "log-batch" in path:
+        response_cache.invalidate_prefix("history:")
+
+FEAST_WRITE_PATHS = ("push", "write-to-online-store", "materialize")
+
+async def send_online_features(payload: Dict[str, Any], headers: Dict[str, str]) -> Dict[str, Any]:
+    response = await send_upstream(
+        "feast",
+        "POST",
+        "get-online-features",
+        headers,
+        body=json.dumps(payload).encode()
+    )
+    response.raise_for_status()
+    return response.json()
+
+async def forward_to_feast(request: Request, user: UserInfo, path: str):
+    try:
+        response = await upstream_request(request, user, "feast", path)
+    except httpx.RequestError as e:
+        logger.error(f"Feast request failed: {e}")
+        raise HTTPException(status_code=502, detail="Feast service unavailable")
+
+    return proxy_response(response)
+
+RUNS_SEARCH_PATHS = ("api/2.0/mlflow/runs/search", "ajax-api/2.0/mlflow/runs/search")
+
+def readable_experiments(user: UserInfo, requested: List[str]) -> List[str]:
+    # Narrows a runs search to the experiments the user may read. Role
+    # holders keep what they asked for minus explicit denials; users who
+    # only have grants get their grants, or the overlap with the request.
+    permission_store.refresh_if_changed()
+    if "mlflow:admin" in user.roles:
+        return requested
+    if "mlflow:read" in user.roles or "mlflow:write" in user.roles:
+        denied = permission_store.denied_experiments(user.user_id, user.groups, "read")
+        return [e for e in requested if e not in denied]
+    visible = permission_store.visible_experiments(user.user_id, user.groups, "read")
+    if not requested:
+        return sorted(visible)
+    return [e for e in requested if e in visible]
 
-    async with httpx.AsyncClient() as client:
+async def fetch_runs_page(headers: Dict[str, str], experiment_ids: List[str], query: Dict[str, Any], max_results: int,
+                          page_token: Optional[str]) -> Dict[str, Any]:
+    body = {k: v for k, v in query.items() if v is not None}
+    body.update(experiment_ids=experiment_ids, max_results=max_results)
+    if page_token:
+        body["page_token"] = page_token
+    headers = {**headers, "Content-Type": "application/json"}
+    response = await send_upstream("mlflow", "POST", "api/2.0/mlflow/runs/search", headers, body=json.dumps(body).encode())
+    if response.status_code != 200:
         try:
-            response = await client.request(
-                method=request.method,
-                url=f"{feast_url}/{path}",
-                headers=headers,
-                content=await request.body(),
-                params=request.query_params,
-                timeout=30.0
-            )
+            detail = response.json()
+        except ValueError:
+            detail = response.text
+        raise HTTPException(status_code=response.status_code, detail=detail)
+    return response.json()
+
+async def search_runs_for_user(user: UserInfo, params: Dict[str, Any]) -> Dict[str, Any]:
+    requested = [str(e) for e in params.get("experiment_ids") or []]
+    if not requested and any(r in user.roles for r in ("mlflow:admin", "mlflow:read", "mlflow:write")):
+        raise HTTPException(status_code=400, detail="experiment_ids is required")
+
+    experiment_ids = readable_experiments(user, requested)
+    order_by = params.get("order_by")
+    if isinstance(order_by, str):
+        order_by = [order_by]
+    query = {"filter": params.get("filter"), "order_by": order_by, "run_view_type": params.get("run_view_type")}
+    try:
+        search_config = gateway_config.get("runs_search", {})
+        return await search_runs(
+            lambda ids, q, n, token: fetch_runs_page(upstream_headers(user), ids, q, n, token),
+            experiment_ids,
+            query,
+            chunk_size=int(search_config.get("chunk_size", 500)),
+            max_results=params.get("max_results"),
+            page_token=params.get("page_token")
+        )
+    except InvalidSearchParameter as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except httpx.RequestError as e:
+        logger.error(f"MLflow runs search failed: {e}")
+        raise HTTPException(status_code=502, detail="MLflow service unavailable")
+
+LIVE_HISTORY_MAX_RESULTS = 1000
+
+# Live pollers are shared and outlive the request that started them, so
+# they call MLflow as the gateway, not as any subscriber, and the starting
+# request's deadline must not apply to their upstream calls.
+
+async def live_fetch_run(run_id: str) -> Dict[str, Any]:
+    current_deadline.set(None)
+    response = await send_upstream(
+        "mlflow", "GET", "api/2.0/mlflow/runs/get", await service_headers(), params={"run_id": run_id}
+    )
+    response.raise_for_status()
+    return response.json().get("run", {})
+
+async def live_fetch_history(run_id: str, key: str, start_step: Optional[int], end_step: int):
+    current_deadline.set(None)
+    headers = await service_headers()
+    params = {"run_ids": run_id, "metric_key": key, "end_step": end_step, "max_results": LIVE_HISTORY_MAX_RESULTS}
+    if start_step is not None:
+        params["start_step"] = start_step
+    response = await send_upstream(
+        "mlflow", "GET", "ajax-api/2.0/mlflow/metrics/get-history-bulk-interval", headers, params=params
+    )
+    metrics = response.json().get("metrics", []) if response.status_code == 200 else None
+    # The interval query samples once the range holds more than max_results
+    # steps, which would drop new points; only trust it below that. MLflow
+    # before 2.10 has no interval query at all. Otherwise read the full
+    # history, page by page, and trim it to the range.
+    if metrics is None or len({m["step"] for m in metrics}) >= LIVE_HISTORY_MAX_RESULTS:
+        if response.status_code not in (200, 404):
+            response.raise_for_status()
+        metrics = await fetch_metric_history(headers, run_id, key)
+    return [
+        m for m in metrics
+        if (start_step is None or m["step"] >= start_step) and m["step"] <= end_step
+    ]
+
+async def live_search_runs(experiment_id: str) -> List[Dict[str, Any]]:
+    current_deadline.set(None)
+    max_runs = int(gateway_config.get("live_metrics", {}).get("experiment_max_runs", 100))
+    page = await fetch_runs_page(
+        await service_headers(), [experiment_id], {"order_by": ["attributes.start_time DESC"]}, max_runs, None
+    )
+    return page.get("runs", [])
+
+def live_metrics_response(key, make_poll, user: UserInfo, experiment_id: str) -> StreamingResponse:
+    return StreamingResponse(
+        event_stream(
+            live_metrics_hub,
+            key,
+            make_poll,
+            user,
+            experiment_id,
+            lambda u, experiment_id: has_experiment_permission(experiment_id, u, "read")
+        ),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+METRIC_HISTORY_PAGE_SIZE = 25000
+
+async def fetch_metric_history(headers: Dict[str, str], run_id: str, metric_key: str,
+                               scope: Optional[str] = None) -> List[Dict[str, Any]]:
+    metrics: List[Dict[str, Any]] = []
+    page_token = None
+    while True:
+        params = {"run_id": run_id, "metric_key": metric_key, "max_results": METRIC_HISTORY_PAGE_SIZE}
+        if page_token:
+            params["page_token"] = page_token
+        response = await send_upstream(
+            "mlflow", "GET", "api/2.0/mlflow/metrics/get-history", headers, params=params, scope=scope
+        )
+        if response.status_code != 200:
+            raise HTTPException(status_code=response.status_code, detail=response.text)
+        page = response.json()
+        metrics.extend(page.get("metrics", []))
+        page_token = page.get("next_page_token")
+        if not page_token:
+            return metrics
+
+def downsample_history(metrics: List[Dict[str, Any]], metric_key: str, points: int, method: str, x_axis: str):
+    steps, timestamps, values = history_arrays(metrics)
+    x = timestamps if x_axis == "timestamp" else steps
+    kept = downsample(x, values, points, method)
+    return [
+        {"key": metric_key, "value": float(v), "step": int(s), "timestamp": int(t)}
+        for s, t, v in zip(steps[kept], timestamps[kept], values[kept])
+    ]
+
+async def run_status(user: UserInfo, run_id: str) -> Optional[str]:
+    response = await send_upstream(
+        "mlflow", "GET", "api/2.0/mlflow/runs/get", upstream_headers(user),
+        params={"run_id": run_id}, scope=permission_scope(user)
+    )
+    if response.status_code != 200:
+        return None
+    return response.json().get("run", {}).get("info", {}).get("status")
+
+REGISTRY_PAGE_SIZE = 1000
+
+async def fetch_all_registered_models(headers: Optional[Dict[str, str]] = None) -> List[Dict[str, Any]]:
+    # Without headers this is the background refresh, made as the gateway
+    # and free of whichever request happened to trigger it.
+    if headers is None:
+        current_deadline.set(None)
+        headers = await service_headers()
+    models: List[Dict[str, Any]] = []
+    page_token = None
+    while True:
+        params = {"max_results": REGISTRY_PAGE_SIZE}
+        if page_token:
+            params["page_token"] = page_token
+        response = await send_upstream("mlflow", "GET", "api/2.0/mlflow/registered-models/search", headers, params=params)
+        response.raise_for_status()
+        page = response.json()
+        models.extend(page.get("registered_models", []))
+        page_token = page.get("next_page_token")
+        if not page_token:
+            return models
+
+async def registry_scope(user: UserInfo) -> str:
+    # Makes sure the caller's permission scope knows which models MLflow
+    # shows it, learned from one search with the caller's own credentials
+    # and kept as long as the snapshot. Lookups in a scope whose search
+    # failed miss and fall back to MLflow.
+    model_registry.start(fetch_all_registered_models)
+    scope = permission_scope(user)
+    if model_registry.enabled and model_registry.visible_names(scope) is None:
+        async def learn():
+            models = await fetch_all_registered_models(upstream_headers(user))
+            model_registry.set_visible(scope, (model["name"] for model in models))
+
+        try:
+            await upstream_flight.do(("registry-visible", scope), learn)
+        except (httpx.HTTPError, HTTPException) as e:
+            logger.warning(f"Could not learn visible models for scope {scope}: {e}")
+    return scope
+
+async def refresh_registered_model(user: UserInfo, name: str):
+    response = await send_upstream(
+        "mlflow", "GET", "api/2.0/mlflow/registered-models/get", await service_headers(), params={"name": name}
+    )
+    if response.status_code == 200:
+        model_registry.update_model(response.json()["registered_model"])
+        model_registry.add_visible(permission_scope(user), name)
+    elif response.status_code == 404:
+        model_registry.remove_model(name)
+    else:
+        model_registry.mark_stale()
+
+BATCH_PATH_PREFIXES = ("api/2.0/mlflow/", "ajax-api/2.0/mlflow/")
+RUN_EXPERIMENT_CACHE_SIZE = 100000
+
+async def resolve_run_experiment(user: UserInfo, run_id: str) -> Optional[str]:
+    experiment_id = run_experiments.get(run_id)
+    if experiment_id is not None:
+        return experiment_id
+
+    response = await send_upstream(
+        "mlflow",
+        "GET",
+        "api/2.0/mlflow/runs/get",
+        upstream_headers(user),
+        params={"run_id": run_id},
+        scope=permission_scope(user)
+    )
+    if response.status_code != 200:
+        return None
+
+    experiment_id = str(response.json().get("run", {}).get("info", {}).get("experiment_id", "")) or None
+    remember_run_experiment(run_id, experiment_id)
+    return experiment_id
+
+def remember_run_experiment(run_id: str, experiment_id: Optional[str]):
+    if experiment_id is not None:
+        run_experiments[run_id] = experiment_id
+        if len(run_experiments) > RUN_EXPERIMENT_CACHE_SIZE:
+            run_experiments.popitem(last=False)
+
+async def fetch_comparable_run(user: UserInfo, run_id: str, semaphore: asyncio.Semaphore):
+    async with semaphore:
+        response = await send_upstream(
+            "mlflow", "GET", "api/2.0/mlflow/runs/get", upstream_headers(user),
+            params={"run_id": run_id}, scope=permission_scope(user)
+        )
+    if response.status_code != 200:
+        return "missing", None
+    run = response.json().get("run", {})
+    experiment_id = str(run.get("info", {}).get("experiment_id", "")) or None
+    remember_run_experiment(run_id, experiment_id)
+    if experiment_id is None or not has_experiment_permission(experiment_id, user, "read"):
+        return "denied", None
+    return "ok", run
+
+def batch_field(sub_request: BatchSubRequest, name: str):
+    if sub_request.params and name in sub_request.params:
+        return sub_request.params[name]
+    if isinstance(sub_request.body, dict) and name in sub_request.body:
+        return sub_request.body[name]
+    return None
+
+async def authorize_batch_request(sub_request: BatchSubRequest, user: UserInfo) -> bool:
+    required_permission = "read" if sub_request.method in ("GET", "HEAD") else "write"
+
+    experiment_ids = []
+    experiment_id = batch_field(sub_request, "experiment_id")
+    if experiment_id is not None:
+        experiment_ids.append(str(experiment_id))
+    named_ids = batch_field(sub_request, "experiment_ids")
+    if named_ids is not None and not isinstance(named_ids, list):
+        raise HTTPException(status_code=400, detail="experiment_ids must be a list")
+    for experiment_id in named_ids or []:
+        experiment_ids.append(str(experiment_id))
+
+    # MLflow acts on the run alone and ignores any experiment named next to
+    # it, so the run's own experiment is always checked as well.
+    run_id = batch_field(sub_request, "run_id") or batch_field(sub_request, "run_uuid")
+    if run_id is not None:
+        experiment_id = await resolve_run_experiment(user, str(run_id))
+        if experiment_id is None:
+            return False
+        experiment_ids.append(experiment_id)
+
+    if not experiment_ids:
+        # No experiment in scope: the caller's roles decide.
+        return has_experiment_permission("", user, required_permission)
 
-            return JSONResponse(
-                content=response.json() if response.headers.get("content-type", "").startswith("application/json") else {"data": response.text},
-                status_code=response.status_code,
-                headers=dict(response.headers)
+    for experiment_id in experiment_ids:
+        if not await check_experiment_permission(experiment_id, user, required_permission):
+            return False
+    return True
+
+async def execute_batch_request(sub_request: BatchSubRequest, user: UserInfo, semaphore: asyncio.Semaphore) -> Dict[str, Any]:
+    path = sub_request.path.lstrip("/")
+    if not path.startswith(BATCH_PATH_PREFIXES) or ".." in path:
+        return {"status_code": 400, "error": "Unsupported batch path"}
+
+    async with semaphore:
+        if path in RUNS_SEARCH_PATHS:
+            try:
+                return {"status_code": 200, "body": await search_runs_for_user(user, sub_request.body or {})}
+            except HTTPException as e:
+                return {"status_code": e.status_code, "error": e.detail}
+            except DeadlineExceeded:
+                return {"status_code": 504, "error": "Request deadline exceeded"}
+
+        try:
+            if not await authorize_batch_request(sub_request, user):
+                return {"status_code": 403, "error": "Access denied to experiment"}
+
+            body = json.dumps(sub_request.body).encode() if sub_request.body is not None else b""
+            headers = upstream_headers(user)
+            if body:
+                headers["Content-Type"] = "application/json"
+            response = await send_upstream(
+                "mlflow",
+                sub_request.method,
+                path,
+                headers,
+                body=body,
+                params=sub_request.params,
+                scope=permission_scope(user)
             )
         except httpx.RequestError as e:
-            logger.error(f"Feast request failed: {e}")
-            raise HTTPException(status_code=502, detail="Feast service unavailable")
+            logger.error(f"MLflow batch sub-request failed: {e}")
+            return {"status_code": 502, "error": "MLflow service unavailable"}
+        except Overloaded as e:
+            return {"status_code": 503, "error": e.detail, "retry_after": int(e.headers["Retry-After"])}
+        except HTTPException as e:
+            return {"status_code": e.status_code, "error": e.detail}
+        except DeadlineExceeded:
+            return {"status_code": 504, "error": "Request deadline exceeded"}
+
+    invalidate_mlflow_cache(sub_request.method, path)
+    if response.headers.get("content-type", "").startswith("application/json"):
+        return {"status_code": response.status_code, "body": response.json()}
+    return {"status_code": response.status_code, "body": {"data": response.text}}
+
+def local_artifact_root() -> str:
+    return os.getenv("MLFLOW_ARTIFACT_ROOT", gateway_config.get("artifacts", {}).get("local_root", ""))
+
+async def stream_mlflow_artifact(request: Request, user: UserInfo, path: str, params=None):
+    pool = upstream_pools["mlflow"]
+    endpoint = pool.pick()
+    headers = upstream_headers(user)
+    headers.update(forwarded_request_headers(request.headers))
+    headers = await delegated_headers("mlflow", headers)
+    try:
+        # Only time to first byte counts towards the endpoint's load and latency.
+        with observe_upstream("mlflow", "GET"), pool.track(endpoint) as record_status:
+            response = await stream_upstream(get_http_client(), f"{endpoint.url}/{path}", headers, params)
+            record_status(response.status_code)
+    except httpx.RequestError as e:
+        logger.error(f"MLflow artifact request failed: {e}")
+        raise HTTPException(status_code=502, detail="MLflow service unavailable")
+    record_upstream_status("mlflow", response.status_code)
+    return response
+
+async def upload_mlflow_artifact(request: Request, user: UserInfo, artifact_path: str):
+    pool = upstream_pools["mlflow"]
+    endpoint = pool.pick()
+    headers = upstream_headers(user)
+    headers.update(upload_headers(request.headers))
+    headers = await delegated_headers("mlflow", headers)
+    try:
+        with observe_upstream("mlflow", "PUT"), pool.track(endpoint) as record_status:
+            response = await stream_upload(
+                get_http_client(),
+                f"{endpoint.url}/api/2.0/mlflow-artifacts/artifacts/{artifact_path}",
+                headers,
+                request.stream()
+            )
+            record_status(response.status_code)
+    except httpx.RequestError as e:
+        logger.error(f"MLflow artifact upload failed: {e}")
+        raise HTTPException(status_code=502, detail="MLflow service unavailable")
+    record_upstream_status("mlflow", response.status_code)
+    return proxy_response(response)
+
+async def authorize_run_access(run_id: str, user: UserInfo, required_permission: str = "read") -> str:
+    experiment_id = await resolve_run_experiment(user, run_id)
+    if experiment_id is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    if not await check_experiment_permission(experiment_id, user, required_permission):
+        raise HTTPException(status_code=403, detail="Access denied to experiment")
+    return experiment_id
+
+register_stats("response_cache", lambda: response_cache.stats())
+register_stats("request_coalescing", lambda: upstream_flight.stats())
+register_stats("rate_limiting", lambda: rate_limiter.stats())
+register_stats("token_cache", lambda: token_cache.stats())
+register_stats("feature_cache", lambda: feature_cache.stats())
+register_stats("compression", lambda: response_compressor.stats())
+register_stats("access_log", lambda: access_logger.stats())
+register_stats("hedging", lambda: hedger.stats())
+register_stats("live_metrics", lambda: live_metrics_hub.stats())
+register_stats("model_registry", lambda: model_registry.stats())
+register_stats("token_manager", lambda: token_manager.stats())
+register_stats("admission_control", lambda: {
+    name: controller.stats() for name, controller in admission_controllers.items()
+})
+
+async def warm_jwks():
+    await asyncio.to_thread(jwks_client.get_signing_keys)
+
+async def warm_upstream(service: str, connections: int):
+    client = get_http_client()
+    pool = upstream_pools[service]
+    await asyncio.gather(*(
+        client.get(f"{endpoint.url}{pool.health_path}", timeout=5.0)
+        for endpoint in pool.endpoints
+        for _ in range(connections)
+    ))
+
+async def warm_openapi():
+    app.openapi()
+
+async def warm_permissions():
+    permission_store.refresh_if_changed()
+    logger.info(f"Permission store ready with {permission_store.experiment_count()} indexed experiments")
+
+def warmup_steps(connections: int):
+    return [
+        ("jwks", warm_jwks, True),
+        ("mlflow", lambda: warm_upstream("mlflow", connections), False),
+        ("feast", lambda: warm_upstream("feast", connections), False),
+        ("openapi", warm_openapi, True),
+        ("permissions", warm_permissions, True),
+    ]
 
 @app.on_event("startup")
 async def startup_event():
+    global warmup_task, stats_task
     load_config()
+    get_http_client()
+    access_logger.start()
+    for pool in upstream_pools.values():
+        pool.start_probes(get_http_client)
 
-@app.middleware("http")
-async def auth_middleware(request: Request, call_next):
-    public_paths = (
-        "/health",
-        "/docs",
-        "/redoc",
-        "/openapi.json",
-        "/oauth",
-    )
-    if any(request.url.path.startswith(p) for p in public_paths):
-        return await call_next(request)
-    
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        return JSONResponse(
-            status_code=401,
-            content={"detail": "Authorization header required"}
-        )
-    
-    try:
-        credentials = HTTPAuthorizationCredentials(
-            scheme="Bearer",
-            credentials=auth_header.split(" ")[1]
-        )
-        user = await verify_entra_token(credentials)
-        request.state.user = user
-    except HTTPException:
-        return JSONResponse(
-            status_code=401,
-            content={"detail": "Invalid or expired token"}
+    warmup_config = gateway_config.get("warmup", {})
+    if warmup_config.get("enabled", True):
+        warmup_task = asyncio.create_task(readiness.run(
+            warmup_steps(int(warmup_config.get("connections_per_upstream", 4))),
+            timeout=float(warmup_config.get("timeout_seconds", 30))
+        ))
+    else:
+        readiness.ready = True
+
+    metrics_config = gateway_config.get("monitoring", {}).get("metrics", {})
+    if multiprocess_enabled():
+        stats_task = asyncio.create_task(
+            StatsPublisher().run(float(metrics_config.get("stats_interval_seconds", 5)))
         )
-    
-    response = await call_next(request)
-    return response
+    elif metrics_config.get("enabled", False):
+        start_metrics_server(int(os.getenv("METRICS_PORT", metrics_config.get("port", 9090))))
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if warmup_task is not None and not warmup_task.done():
+        warmup_task.cancel()
+    if stats_task is not None:
+        stats_task.cancel()
+    if feature_batcher is not None:
+        await feature_batcher.close()
+    if http_client is not None:
+        await http_client.aclose()
+    await rate_limiter.close()
+    await access_logger.close()
+    await live_metrics_hub.close()
+    await model_registry.close()
+    await token_manager.close()
+    for pool in upstream_pools.values():
+        await pool.close()
+
+app.add_middleware(CompressionMiddleware, get_compressor=lambda: response_compressor)
+app.add_middleware(PriorityMiddleware, get_classifier=lambda: priority_classifier)
+app.add_middleware(
+    AuthMiddleware,
+    authenticate=authenticate_token,
+    check_rate_limit=lambda user_id: rate_limiter.check(user_id)
+)
+app.add_middleware(DeadlineMiddleware, get_policy=lambda: deadline_policy)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(AccessLogMiddleware, get_logger=lambda: access_logger)
 
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "timestamp": datetime.utcnow().isoformat()}
 
+@app.get("/ready")
+async def readiness_check():
+    return JSONResponse(content=readiness.report(), status_code=200 if readiness.ready else 503)
+
 @app.get("/oauth/authorize")
 async def oauth_authorize():
     auth_url = f"{entra_config.authority}/oauth2/v2.0/authorize"
@@ -285,24 +1319,13 @@ async def oauth_authorize():
 
 @app.post("/oauth/token")
 async def exchange_token(code: str, redirect_uri: str):
-    token_url = f"{entra_config.authority}/oauth2/v2.0/token"
-    
-    data = {
-        "client_id": entra_config.client_id,
-        "client_secret": entra_config.client_secret,
-        "code": code,
-        "redirect_uri": redirect_uri,
-        "grant_type": "authorization_code"
-    }
-    
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(token_url, data=data)
-            response.raise_for_status()
-            return response.json()
-        except httpx.HTTPError as e:
-            logger.error(f"Token exchange failed: {e}")
-            raise HTTPException(status_code=400, detail="Token exchange failed")
+    try:
+        tokens = await token_manager.exchange_code(code, redirect_uri)
+    except TokenExchangeError as e:
+        logger.error(f"Token exchange failed: {e}")
+        raise HTTPException(status_code=400, detail="Token exchange failed")
+    remember_sign_in(tokens)
+    return tokens
 
 @app.get("/oauth/callback")
 async def oauth_callback(request: Request, code: Optional[str] = None, state: Optional[str] = None):
@@ -310,46 +1333,153 @@ async def oauth_callback(request: Request, code: Optional[str] = None, state: Op
         raise HTTPException(status_code=400, detail="Missing authorization code")
 
     redirect_uri = os.getenv("OAUTH_REDIRECT_URI", "http://localhost:8081/oauth/callback")
-    token_url = f"{entra_config.authority}/oauth2/v2.0/token"
 
-    data = {
-        "client_id": entra_config.client_id,
-        "client_secret": entra_config.client_secret,
-        "code": code,
-        "redirect_uri": redirect_uri,
-        "grant_type": "authorization_code"
-    }
-
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(token_url, data=data)
-            response.raise_for_status()
-            _ = response.json()
-            mlflow_home = os.getenv("MLFLOW_PUBLIC_URL", "http://localhost:5000")
-            return RedirectResponse(url=mlflow_home, status_code=302)
-        except httpx.HTTPError as e:
-            logger.error(f"Callback token exchange failed: {e}")
-            html = """
-            <html>
-              <head><title>Authorization Received</title></head>
-              <body style="font-family: -apple-system, Segoe UI, Roboto, sans-serif;">
-                <h2>⚠️ Authorization received but token exchange failed</h2>
-                <p>Please ensure the client secret value is correct and try again.</p>
-              </body>
-            </html>
-            """
-            return HTMLResponse(content=html, status_code=200)
+    try:
+        tokens = await token_manager.exchange_code(code, redirect_uri)
+    except TokenExchangeError as e:
+        logger.error(f"Callback token exchange failed: {e}")
+        html = """
+        <html>
+          <head><title>Authorization Received</title></head>
+          <body style="font-family: -apple-system, Segoe UI, Roboto, sans-serif;">
+            <h2>⚠️ Authorization received but token exchange failed</h2>
+            <p>Please ensure the client secret value is correct and try again.</p>
+          </body>
+        </html>
+        """
+        return HTMLResponse(content=html, status_code=200)
+    remember_sign_in(tokens)
+    mlflow_home = os.getenv("MLFLOW_PUBLIC_URL", "http://localhost:5000")
+    return RedirectResponse(url=mlflow_home, status_code=302)
 
 @app.get("/mlflow/experiments")
-async def list_experiments(user: UserInfo = Depends(verify_entra_token)):
-    return await forward_to_mlflow(request, user, "api/2.0/mlflow/experiments/list")
+async def list_experiments(request: Request, user: UserInfo = Depends(verify_entra_token)):
+    def filter_content(content):
+        if isinstance(content, dict) and "experiments" in content:
+            content["experiments"] = filter_experiments(content["experiments"], user)
+        return content
+
+    return await cached_forward_to_mlflow(
+        request, user, "api/2.0/mlflow/experiments/list", "experiments", transform=filter_content
+    )
 
 @app.post("/mlflow/experiments")
 async def create_experiment(request: Request, user: UserInfo = Depends(verify_entra_token)):
-    return await forward_to_mlflow(request, user, "api/2.0/mlflow/experiments/create")
+    response = await forward_to_mlflow(request, user, "api/2.0/mlflow/experiments/create")
+    response_cache.invalidate("experiments")
+    return response
+
+@app.post("/mlflow/compare")
+async def compare_runs(
+    compare: CompareRequest,
+    request: Request,
+    format: str = "json",
+    user: UserInfo = Depends(verify_entra_token)
+):
+    run_ids = list(dict.fromkeys(compare.run_ids))
+    max_runs = int(gateway_config.get("compare", {}).get("max_runs", 500))
+    if not run_ids:
+        raise HTTPException(status_code=400, detail="run_ids is required")
+    if len(run_ids) > max_runs:
+        raise HTTPException(status_code=400, detail=f"At most {max_runs} runs can be compared")
+
+    want_arrow = format == "arrow" or ARROW_STREAM_MEDIA_TYPE in request.headers.get("accept", "")
+    if want_arrow and not arrow_available():
+        raise HTTPException(status_code=406, detail="Arrow output is not available")
+
+    semaphore = asyncio.Semaphore(batch_config["max_concurrency"])
+    try:
+        results = await asyncio.gather(*(fetch_comparable_run(user, run_id, semaphore) for run_id in run_ids))
+    except httpx.RequestError as e:
+        logger.error(f"MLflow compare failed: {e}")
+        raise HTTPException(status_code=502, detail="MLflow service unavailable")
+
+    runs = [run for outcome, run in results if outcome == "ok"]
+    missing = [run_id for run_id, (outcome, _) in zip(run_ids, results) if outcome == "missing"]
+    denied = [run_id for run_id, (outcome, _) in zip(run_ids, results) if outcome == "denied"]
+
+    frame = await asyncio.to_thread(comparison_frame, runs, compare.metric_keys, compare.param_keys)
+    if want_arrow:
+        body = await asyncio.to_thread(comparison_arrow, frame, compare.include_identical)
+        return Response(
+            content=body,
+            media_type=ARROW_STREAM_MEDIA_TYPE,
+            headers={"X-Missing-Runs": ",".join(missing), "X-Denied-Runs": ",".join(denied)}
+        )
+
+    content = await asyncio.to_thread(comparison_json, frame, compare.include_identical)
+    content.update(missing=missing, denied=denied)
+    return JSONResponse(content=content)
+
+@app.get("/mlflow/metrics/downsampled-history")
+async def get_downsampled_history(
+    run_id: str,
+    metric_key: str,
+    request: Request,
+    points: int = 1000,
+    method: str = "lttb",
+    x_axis: str = "step",
+    user: UserInfo = Depends(verify_entra_token)
+):
+    if method not in DOWNSAMPLING_METHODS:
+        raise HTTPException(status_code=400, detail=f"method must be one of {', '.join(DOWNSAMPLING_METHODS)}")
+    if x_axis not in ("step", "timestamp"):
+        raise HTTPException(status_code=400, detail="x_axis must be step or timestamp")
+    history_config = gateway_config.get("metric_history", {})
+    points = max(3, min(points, int(history_config.get("max_points", 10000))))
+    await authorize_run_access(run_id, user)
+
+    # Permission is checked above, so the result is shared by every reader
+    # of the run rather than keyed by permission scope.
+    key = response_cache.make_key("history", f"{run_id}/{metric_key}", [
+        ("points", str(points)), ("method", method), ("x_axis", x_axis)
+    ])
+    entry = response_cache.get(key)
+    if entry is not None:
+        return cached_response(request, entry, "HIT")
+
+    status, metrics = await asyncio.gather(
+        run_status(user, run_id),
+        fetch_metric_history(upstream_headers(user), run_id, metric_key, permission_scope(user))
+    )
+    sampled = await asyncio.to_thread(downsample_history, metrics, metric_key, points, method, x_axis)
+    body = json.dumps({
+        "metrics": sampled,
+        "total_points": len(metrics),
+        "method": method
+    }).encode()
+    # A finished run's history no longer changes.
+    if status in ("FINISHED", "FAILED", "KILLED"):
+        ttl = history_config.get("finished_ttl_seconds", 3600)
+    else:
+        ttl = history_config.get("ttl_seconds", 10)
+    entry = response_cache.set(key, body, tags=[f"history:{run_id}"], ttl_seconds=float(ttl))
+    return cached_response(request, entry, "MISS")
+
+@app.get("/mlflow/experiments/{experiment_id}/stream")
+async def stream_experiment_runs(experiment_id: str, user: UserInfo = Depends(verify_entra_token)):
+    if not await check_experiment_permission(experiment_id, user, "read"):
+        raise HTTPException(status_code=403, detail="Access denied to experiment")
+
+    return live_metrics_response(
+        ("experiment", experiment_id),
+        lambda: ExperimentRunsPoll(experiment_id, live_search_runs),
+        user,
+        experiment_id
+    )
+
+@app.get("/mlflow/runs/{run_id}/stream")
+async def stream_run_metrics(run_id: str, user: UserInfo = Depends(verify_entra_token)):
+    experiment_id = await authorize_run_access(run_id, user)
+    return live_metrics_response(
+        ("run", run_id),
+        lambda: RunMetricsPoll(run_id, live_fetch_run, live_fetch_history),
+        user,
+        experiment_id
+    )
 
 @app.get("/mlflow/experiments/{experiment_id}")
-async def get_experiment(experiment_id: str, user: UserInfo = Depends(verify_entra_token)):
+async def get_experiment(experiment_id: str, request: Request, user: UserInfo = Depends(verify_entra_token)):
     if not await check_experiment_permission(experiment_id, user, "read"):
         raise HTTPException(status_code=403, detail="Access denied to experiment")
     
@@ -360,25 +1490,100 @@ async def create_run(experiment_id: str, request: Request, user: UserInfo = Depe
     if not await check_experiment_permission(experiment_id, user, "write"):
         raise HTTPException(status_code=403, detail="Access denied to experiment")
     
-    return await forward_to_mlflow(request, user, f"api/2.0/mlflow/runs/create")
+    response = await forward_to_mlflow(request, user, f"api/2.0/mlflow/runs/create")
+    response_cache.invalidate(f"runs:{experiment_id}")
+    return response
 
 @app.get("/mlflow/experiments/{experiment_id}/runs")
-async def list_runs(experiment_id: str, user: UserInfo = Depends(verify_entra_token)):
+async def list_runs(experiment_id: str, request: Request, user: UserInfo = Depends(verify_entra_token)):
     if not await check_experiment_permission(experiment_id, user, "read"):
         raise HTTPException(status_code=403, detail="Access denied to experiment")
     
-    return await forward_to_mlflow(request, user, f"api/2.0/mlflow/runs/search")
+    params = {
+        "experiment_ids": [experiment_id],
+        "filter": request.query_params.get("filter"),
+        "order_by": request.query_params.getlist("order_by") or None,
+        "run_view_type": request.query_params.get("run_view_type"),
+        "max_results": request.query_params.get("max_results"),
+        "page_token": request.query_params.get("page_token")
+    }
+    return await cached_json(
+        request, user, f"runs/search/{experiment_id}", f"runs:{experiment_id}",
+        lambda: search_runs_for_user(user, params)
+    )
 
 @app.post("/mlflow/models/register")
 async def register_model(request: Request, user: UserInfo = Depends(verify_entra_token)):
     if "mlflow:write" not in user.roles and "mlflow:admin" not in user.roles:
         raise HTTPException(status_code=403, detail="Insufficient permissions to register models")
     
-    return await forward_to_mlflow(request, user, "api/2.0/mlflow/model-versions/create")
+    response = await forward_to_mlflow(request, user, "api/2.0/mlflow/model-versions/create")
+    response_cache.invalidate("models")
+    name = None
+    if response.status_code == 200:
+        name = json.loads(response.body).get("model_version", {}).get("name")
+    if name:
+        # Write-through: the new version is visible to the next lookup.
+        try:
+            await refresh_registered_model(user, name)
+        except (httpx.RequestError, TokenExchangeError):
+            model_registry.mark_stale()
+    else:
+        model_registry.mark_stale()
+    return response
 
 @app.get("/mlflow/models")
-async def list_models(user: UserInfo = Depends(verify_entra_token)):
-    return await forward_to_mlflow(request, user, "api/2.0/mlflow/registered-models/search")
+async def list_models(request: Request, user: UserInfo = Depends(verify_entra_token)):
+    if not request.query_params:
+        models = model_registry.all_models(await registry_scope(user))
+        if models is not None:
+            return JSONResponse(content={"registered_models": models})
+    return await cached_forward_to_mlflow(request, user, "api/2.0/mlflow/registered-models/search", "models")
+
+@app.get("/mlflow/api/2.0/mlflow/registered-models/get")
+async def get_registered_model(name: str, request: Request, user: UserInfo = Depends(verify_entra_token)):
+    model = model_registry.get(name, await registry_scope(user))
+    if model is not None:
+        return JSONResponse(content={"registered_model": model})
+    return await forward_to_mlflow(request, user, "api/2.0/mlflow/registered-models/get")
+
+@app.api_route("/mlflow/api/2.0/mlflow/registered-models/get-latest-versions", methods=["GET", "POST"])
+async def get_latest_model_versions(request: Request, user: UserInfo = Depends(verify_entra_token)):
+    if request.method == "POST":
+        body = await request.json()
+        name, stages = body.get("name"), body.get("stages") or []
+    else:
+        name, stages = request.query_params.get("name"), request.query_params.getlist("stages")
+    if not name:
+        raise HTTPException(status_code=400, detail="name is required")
+
+    versions = model_registry.latest_versions(name, await registry_scope(user), stages)
+    if versions is not None:
+        return JSONResponse(content={"model_versions": versions})
+    return await forward_to_mlflow(request, user, "api/2.0/mlflow/registered-models/get-latest-versions")
+
+@app.get("/admin/cache/stats")
+async def get_cache_stats(current_user: UserInfo = Depends(verify_entra_token)):
+    if "mlflow:admin" not in current_user.roles:
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    return {
+        "response_cache": response_cache.stats(),
+        "request_coalescing": upstream_flight.stats(),
+        "rate_limiting": rate_limiter.stats(),
+        "token_cache": token_cache.stats(),
+        "feast_batching": feature_batcher.stats(),
+        "feature_cache": feature_cache.stats(),
+        "compression": response_compressor.stats(),
+        "access_log": access_logger.stats(),
+        "deadlines": deadline_policy.stats(),
+        "hedging": hedger.stats(),
+        "upstream_pools": {name: pool.stats() for name, pool in upstream_pools.items()},
+        "admission_control": {name: controller.stats() for name, controller in admission_controllers.items()},
+        "live_metrics": live_metrics_hub.stats(),
+        "model_registry": model_registry.stats(),
+        "token_manager": token_manager.stats()
+    }
 
 @app.get("/user/profile")
 async def get_user_profile(user: UserInfo = Depends(verify_entra_token)):
@@ -405,51 +1610,275 @@ async def set_experiment_permissions(
     if "mlflow:admin" not in current_user.roles:
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    user_key = f"{user_id}:{experiment_id}"
-    experiment_permissions[user_key] = ExperimentAccess(
+    permission_store.set(experiment_id, user_id, permissions)
+    response_cache.clear()
+    access_logger.audit(
+        "permissions.set",
+        current_user.user_id,
         experiment_id=experiment_id,
-        user_id=user_id,
-        permissions=permissions,
-        created_at=datetime.utcnow()
+        principal_id=user_id,
+        permissions=permissions
     )
     
     return {"message": "Permissions updated successfully"}
 
+@app.put("/admin/permissions")
+async def bulk_set_permissions(grants: List[PermissionGrant], current_user: UserInfo = Depends(verify_entra_token)):
+    if "mlflow:admin" not in current_user.roles:
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    for grant in grants:
+        if grant.principal_type not in (PRINCIPAL_USER, PRINCIPAL_GROUP):
+            raise HTTPException(status_code=400, detail=f"Invalid principal type: {grant.principal_type}")
+
+    updated = permission_store.set_many(
+        (g.experiment_id, g.principal_id, g.permissions, g.principal_type) for g in grants
+    )
+    response_cache.clear()
+    access_logger.audit("permissions.bulk_set", current_user.user_id, grants=[g.dict() for g in grants])
+    return {"message": "Permissions updated successfully", "updated": updated}
+
+@app.post("/admin/permissions/lookup")
+async def bulk_get_permissions(lookups: List[PermissionLookup], current_user: UserInfo = Depends(verify_entra_token)):
+    if "mlflow:admin" not in current_user.roles:
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    results = permission_store.get_many((l.experiment_id, l.principal_id, l.principal_type) for l in lookups)
+    return {
+        "permissions": [
+            {**l.dict(), "permissions": sorted(p) if p is not None else None}
+            for l, p in zip(lookups, results)
+        ]
+    }
+
+@app.get("/admin/permissions")
+async def query_permissions(
+    user_id: Optional[str] = None,
+    group: Optional[str] = None,
+    experiment_id: Optional[str] = None,
+    current_user: UserInfo = Depends(verify_entra_token)
+):
+    if "mlflow:admin" not in current_user.roles:
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    if user_id:
+        grants = permission_store.for_user(user_id)
+    elif group:
+        grants = permission_store.for_group(group)
+    elif experiment_id:
+        grants = permission_store.for_experiment(experiment_id)
+    else:
+        raise HTTPException(status_code=400, detail="One of user_id, group or experiment_id is required")
+
+    if experiment_id and (user_id or group):
+        grants = [g for g in grants if g["experiment_id"] == experiment_id]
+    return {"grants": [serialize_grant(g) for g in grants]}
+
+@app.get("/admin/users/{user_id}/experiments")
+async def get_user_visible_experiments(
+    user_id: str,
+    groups: Optional[str] = None,
+    current_user: UserInfo = Depends(verify_entra_token)
+):
+    if "mlflow:admin" not in current_user.roles:
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    group_list = [g for g in (groups or "").split(",") if g]
+    return {
+        "user_id": user_id,
+        "experiment_ids": sorted(permission_store.visible_experiments(user_id, group_list, "read"))
+    }
+
+@app.get("/user/experiments")
+async def get_visible_experiments(user: UserInfo = Depends(verify_entra_token)):
+    return {
+        "user_id": user.user_id,
+        "all_experiments": "mlflow:admin" in user.roles or "mlflow:read" in user.roles or "mlflow:write" in user.roles,
+        "experiment_ids": sorted(permission_store.visible_experiments(user.user_id, user.groups, "read")),
+        "denied_experiment_ids": sorted(permission_store.denied_experiments(user.user_id, user.groups, "read"))
+    }
+
+@app.get("/mlflow/artifacts/{run_id}/{artifact_path:path}")
+async def download_artifact(run_id: str, artifact_path: str, request: Request, user: UserInfo = Depends(verify_entra_token)):
+    experiment_id = await authorize_run_access(run_id, user)
+
+    local_path = resolve_local_artifact(local_artifact_root(), experiment_id, run_id, artifact_path)
+    if local_path is not None:
+        return LocalFileRangeResponse(local_path, request.headers, filename=os.path.basename(local_path))
+
+    return await stream_mlflow_artifact(request, user, "get-artifact", {"run_uuid": run_id, "path": artifact_path})
+
+@app.put("/mlflow/artifacts/{run_id}/{artifact_path:path}")
+async def upload_artifact(run_id: str, artifact_path: str, request: Request, user: UserInfo = Depends(verify_entra_token)):
+    experiment_id = await authorize_run_access(run_id, user, "write")
+    return await upload_mlflow_artifact(request, user, f"{experiment_id}/{run_id}/artifacts/{artifact_path}")
+
+@app.get("/mlflow/get-artifact")
+async def proxy_get_artifact(request: Request, user: UserInfo = Depends(verify_entra_token)):
+    run_id = request.query_params.get("run_uuid") or request.query_params.get("run_id")
+    if not run_id:
+        raise HTTPException(status_code=400, detail="Missing run_uuid")
+    await authorize_run_access(run_id, user)
+    return await stream_mlflow_artifact(request, user, "get-artifact", request.query_params)
+
+def artifact_experiment_id(artifact_path: str) -> str:
+    # The experiment is the first segment of the artifact path. httpx
+    # collapses dot-segments before sending, so "1/../5/..." would be
+    # checked against experiment 1 but served from 5; such paths (and
+    # their percent-encoded forms) are refused outright.
+    segments = artifact_path.split("/")
+    if any(unquote(segment) in ("", ".", "..") for segment in segments):
+        raise HTTPException(status_code=400, detail="Invalid artifact path")
+    return segments[0]
+
+@app.get("/mlflow/api/2.0/mlflow-artifacts/artifacts/{artifact_path:path}")
+async def proxy_mlflow_artifacts(artifact_path: str, request: Request, user: UserInfo = Depends(verify_entra_token)):
+    experiment_id = artifact_experiment_id(artifact_path)
+    if not await check_experiment_permission(experiment_id, user, "read"):
+        raise HTTPException(status_code=403, detail="Access denied to experiment")
+    return await stream_mlflow_artifact(
+        request, user, f"api/2.0/mlflow-artifacts/artifacts/{artifact_path}", request.query_params
+    )
+
+@app.put("/mlflow/api/2.0/mlflow-artifacts/artifacts/{artifact_path:path}")
+async def proxy_mlflow_artifact_upload(artifact_path: str, request: Request, user: UserInfo = Depends(verify_entra_token)):
+    experiment_id = artifact_experiment_id(artifact_path)
+    if not await check_experiment_permission(experiment_id, user, "write"):
+        raise HTTPException(status_code=403, detail="Access denied to experiment")
+    return await upload_mlflow_artifact(request, user, artifact_path)
+
+@app.post("/mlflow/api/2.0/mlflow-artifacts/mpu/{action}/{artifact_path:path}")
+async def proxy_mlflow_multipart_upload(
+    action: str,
+    artifact_path: str,
+    request: Request,
+    user: UserInfo = Depends(verify_entra_token)
+):
+    # MLflow hands out per-part upload URLs on create, so large files go
+    # straight to the artifact store; the gateway only authorizes the
+    # create/complete/abort calls.
+    if action not in ("create", "complete", "abort"):
+        raise HTTPException(status_code=404, detail="Unknown multipart upload action")
+    experiment_id = artifact_experiment_id(artifact_path)
+    if not await check_experiment_permission(experiment_id, user, "write"):
+        raise HTTPException(status_code=403, detail="Access denied to experiment")
+    return await forward_to_mlflow(request, user, f"api/2.0/mlflow-artifacts/mpu/{action}/{artifact_path}")
+
+@app.post("/mlflow/batch")
+async def mlflow_batch(batch: BatchRequest, user: UserInfo = Depends(verify_entra_token)):
+    if len(batch.requests) > batch_config["max_requests"]:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch exceeds the maximum of {batch_config['max_requests']} sub-requests"
+        )
+
+    for sub_request in batch.requests:
+        sub_request.method = sub_request.method.upper()
+
+    concurrency = min(batch.max_concurrency or batch_config["max_concurrency"], batch_config["max_concurrency"])
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    responses = await asyncio.gather(
+        *(execute_batch_request(sub_request, user, semaphore) for sub_request in batch.requests)
+    )
+    return {"responses": list(responses)}
+
+@app.post("/mlflow/runs/search")
+@app.post("/mlflow/api/2.0/mlflow/runs/search")
+@app.post("/mlflow/ajax-api/2.0/mlflow/runs/search")
+async def search_runs_route(request: Request, user: UserInfo = Depends(verify_entra_token)):
+    params = await request.json()
+    return JSONResponse(content=await search_runs_for_user(user, params))
+
 @app.api_route("/mlflow/{full_path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"])
 async def proxy_mlflow(full_path: str, request: Request, user: UserInfo = Depends(verify_entra_token)):
-    return await forward_to_mlflow(request, user, full_path)
+    response = await forward_to_mlflow(request, user, full_path)
+    invalidate_mlflow_cache(request.method, full_path)
+    return response
 
 @app.api_route("/mlflow", methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"])
 async def proxy_mlflow_root(request: Request, user: UserInfo = Depends(verify_entra_token)):
     return await forward_to_mlflow(request, user, "")
 
+@app.post("/feast/online-features")
+async def feast_online_features(request: Request, user: UserInfo = Depends(verify_entra_token)):
+    payload = await request.json()
+    headers = {
+        "Authorization": f"Bearer {get_session_token(user.user_id)}",
+        "X-User-ID": user.user_id,
+        "Content-Type": "application/json"
+    }
+    scope = permission_scope(user)
+    try:
+        content = await feature_cache.get_online_features(
+            payload,
+            scope,
+            lambda upstream_payload: feature_batcher.submit(upstream_payload, scope, headers)
+        )
+        return JSONResponse(content=content, status_code=200)
+    except httpx.HTTPError as e:
+        logger.error(f"Feast online-features failed: {e}")
+        raise HTTPException(status_code=502, detail="Feast service unavailable")
+
 @app.api_route("/feast/{full_path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"])
 async def proxy_feast(full_path: str, request: Request, user: UserInfo = Depends(verify_entra_token)):
-    return await forward_to_feast(request, user, full_path)
+    response = await forward_to_feast(request, user, full_path)
+    if request.method != "GET" and full_path.startswith(FEAST_WRITE_PATHS):
+        feature_cache.clear()
+    return response
 
 @app.api_route("/feast", methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"])
 async def proxy_feast_root(request: Request, user: UserInfo = Depends(verify_entra_token)):
     return await forward_to_feast(request, user, "")
 
-@app.post("/feast/online-features")
-async def feast_online_features(request: Request, user: UserInfo = Depends(verify_entra_token)):
-    feast_url = os.getenv("FEAST_URL", "http://feast:6566")
-    payload = await request.json()
-    async with httpx.AsyncClient() as client:
-        try:
-            r = await client.post(f"{feast_url}/get-online-features", json=payload, headers={
-                "Authorization": f"Bearer {user_sessions[user.user_id]['token']}"
-            })
-            r.raise_for_status()
-            return JSONResponse(content=r.json(), status_code=r.status_code)
-        except httpx.HTTPError as e:
-            logger.error(f"Feast online-features failed: {e}")
-            raise HTTPException(status_code=502, detail="Feast service unavailable")
+def read_gateway_config() -> Dict[str, Any]:
+    config_path = os.getenv("API_GATEWAY_CONFIG_PATH", "/app/config/api-gateway-config.yaml")
+    try:
+        with open(config_path, 'r') as f:
+            return yaml.safe_load(f) or {}
+    except OSError:
+        return {}
 
-if __name__ == "__main__":
+def optional_server_impl(module: str, fallback: str) -> str:
+    try:
+        __import__(module)
+        return module
+    except ImportError:
+        return fallback
+
+def run_server():
+    config = read_gateway_config()
+    server_config = config.get("server", {})
+    port = int(os.getenv("API_GATEWAY_PORT", server_config.get("port", 8080)))
+    workers = int(os.getenv("API_GATEWAY_WORKERS", server_config.get("workers", 1)))
+
+    if workers <= 1:
+        uvicorn.run("main:app", host="0.0.0.0", port=port, reload=False)
+        return
+
+    # Workers are separate processes: verified tokens and sessions are
+    # shared through a file on /dev/shm, permissions through the SQLite
+    # store, and metrics are aggregated by this parent process.
+    os.environ["GATEWAY_WORKERS"] = str(workers)
+    os.environ.setdefault("GATEWAY_SHARED_CACHE_PATH", config.get("shared_cache", {}).get("path", DEFAULT_SHARED_CACHE_PATH))
+
+    metrics_config = config.get("monitoring", {}).get("metrics", {})
+    if metrics_config.get("enabled", False):
+        prepare_multiprocess_metrics(os.getenv("GATEWAY_METRICS_DIR", "/dev/shm/mlops-gateway/metrics"))
+        start_multiprocess_metrics_server(int(os.getenv("METRICS_PORT", metrics_config.get("port", 9090))))
+
+    loop = optional_server_impl("uvloop", "asyncio")
+    http = optional_server_impl("httptools", "h11")
+    logger.info(f"Starting {workers} gateway workers (loop={loop}, http={http})")
     uvicorn.run(
         "main:app",
-        host="0.0.0.0",
-        port=int(os.getenv("API_GATEWAY_PORT", 8080)),
+        host=server_config.get("host", "0.0.0.0"),
+        port=port,
+        workers=workers,
+        loop=loop,
+        http=http,
+        timeout_keep_alive=int(server_config.get("keep_alive_timeout", 5)),
         reload=False
     )
+
+if __name__ == "__main__":
+    run_server()
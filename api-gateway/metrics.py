@@ -0,0 +1,253 @@
+import os
+import time
+import asyncio
+import shutil
+import logging
+from contextlib import contextmanager
+from typing import Callable, Dict, Any
+
+from prometheus_client import Counter, Gauge, Histogram, CollectorRegistry, start_http_server, REGISTRY
+from prometheus_client import multiprocess
+from prometheus_client.core import GaugeMetricFamily, CounterMetricFamily
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+REQUESTS = Counter(
+    "gateway_requests_total",
+    "Requests handled by the gateway",
+    ["route", "method", "status"],
+)
+REQUEST_LATENCY = Histogram(
+    "gateway_request_duration_seconds",
+    "End-to-end gateway request latency",
+    ["route", "method"],
+    buckets=LATENCY_BUCKETS,
+)
+IN_FLIGHT = Gauge(
+    "gateway_requests_in_flight",
+    "Requests currently being handled by the gateway",
+    multiprocess_mode="livesum",
+)
+UPSTREAM_LATENCY = Histogram(
+    "gateway_upstream_request_duration_seconds",
+    "Latency of calls from the gateway to upstream services",
+    ["upstream", "method"],
+    buckets=LATENCY_BUCKETS,
+)
+UPSTREAM_ERRORS = Counter(
+    "gateway_upstream_errors_total",
+    "Failed calls from the gateway to upstream services",
+    ["upstream", "kind"],
+)
+UPSTREAM_IN_FLIGHT = Gauge(
+    "gateway_upstream_requests_in_flight",
+    "Calls currently outstanding to upstream services",
+    ["upstream"],
+    multiprocess_mode="livesum",
+)
+
+_stats_providers: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+
+def register_stats(name: str, provider: Callable[[], Dict[str, Any]]):
+    _stats_providers[name] = provider
+
+
+def _provider_stats():
+    for name, provider in list(_stats_providers.items()):
+        try:
+            yield name, provider()
+        except Exception as e:
+            logger.warning(f"Stats provider {name} failed: {e}")
+
+
+class StatsCollector:
+    # Exposes the counters the caches and limiters already keep, read at
+    # scrape time so the request path does no extra bookkeeping.
+
+    def collect(self):
+        hits = CounterMetricFamily("gateway_cache_hits", "Cache hits", labels=["cache"])
+        misses = CounterMetricFamily("gateway_cache_misses", "Cache misses", labels=["cache"])
+        ratio = GaugeMetricFamily("gateway_cache_hit_ratio", "Cache hit ratio since start", labels=["cache"])
+        entries = GaugeMetricFamily("gateway_cache_entries", "Entries currently cached", labels=["cache"])
+        for name, stats in _provider_stats():
+            if "hits" in stats and "misses" in stats:
+                hits.add_metric([name], stats["hits"])
+                misses.add_metric([name], stats["misses"])
+                lookups = stats["hits"] + stats["misses"]
+                ratio.add_metric([name], stats["hits"] / lookups if lookups else 0.0)
+            if "entries" in stats:
+                entries.add_metric([name], stats["entries"])
+        yield hits
+        yield misses
+        yield ratio
+        yield entries
+
+
+class StatsPublisher:
+    # With several workers /metrics is served by the parent from the files
+    # each worker writes, so scrape-time collectors in a worker are never
+    # read. Workers run this instead: it copies the same stats into
+    # multiprocess metrics every interval. Hits and misses advance by the
+    # change since the last publish, so they sum across workers and survive
+    # worker restarts; the parent derives the hit ratio from those sums.
+
+    def __init__(self):
+        self.hits = Counter("gateway_cache_hits", "Cache hits", ["cache"], registry=None)
+        self.misses = Counter("gateway_cache_misses", "Cache misses", ["cache"], registry=None)
+        self.entries = Gauge(
+            "gateway_cache_entries", "Entries currently cached", ["cache"],
+            registry=None, multiprocess_mode="livesum"
+        )
+        self._published: Dict[Any, float] = {}
+
+    def _advance(self, counter, name: str, value: float):
+        key = (counter, name)
+        previous = self._published.get(key, 0)
+        # Stats rebuilt by a config reload start again from zero.
+        delta = value - previous if value >= previous else value
+        if delta > 0:
+            counter.labels(name).inc(delta)
+        self._published[key] = value
+
+    def publish(self):
+        for name, stats in _provider_stats():
+            if "hits" in stats and "misses" in stats:
+                self._advance(self.hits, name, stats["hits"])
+                self._advance(self.misses, name, stats["misses"])
+            if "entries" in stats:
+                self.entries.labels(name).set(stats["entries"])
+
+    async def run(self, interval: float):
+        while True:
+            self.publish()
+            await asyncio.sleep(interval)
+
+
+class HitRatioCollector:
+    # Parent-side counterpart of StatsPublisher: the hit ratio cannot be
+    # summed across workers, so it is computed from the aggregated counters.
+
+    def __init__(self, source):
+        self.source = source
+
+    def collect(self):
+        totals: Dict[str, Dict[str, float]] = {}
+        for family in self.source.collect():
+            for sample in family.samples:
+                if sample.name in ("gateway_cache_hits_total", "gateway_cache_misses_total"):
+                    totals.setdefault(sample.labels["cache"], {})[sample.name] = sample.value
+        ratio = GaugeMetricFamily("gateway_cache_hit_ratio", "Cache hit ratio since start", labels=["cache"])
+        for cache, counts in totals.items():
+            hits = counts.get("gateway_cache_hits_total", 0.0)
+            lookups = hits + counts.get("gateway_cache_misses_total", 0.0)
+            ratio.add_metric([cache], hits / lookups if lookups else 0.0)
+        yield ratio
+
+
+def multiprocess_enabled() -> bool:
+    return bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+
+REGISTRY.register(StatsCollector())
+
+
+@contextmanager
+def observe_upstream(upstream: str, method: str = "GET"):
+    UPSTREAM_IN_FLIGHT.labels(upstream).inc()
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        UPSTREAM_ERRORS.labels(upstream, type(e).__name__).inc()
+        raise
+    finally:
+        UPSTREAM_LATENCY.labels(upstream, method).observe(time.perf_counter() - start)
+        UPSTREAM_IN_FLIGHT.labels(upstream).dec()
+
+
+def record_upstream_status(upstream: str, status_code: int):
+    if status_code >= 500:
+        UPSTREAM_ERRORS.labels(upstream, f"http_{status_code}").inc()
+
+
+class MetricsMiddleware:
+    # Pure ASGI so timing covers everything behind it, including auth, and
+    # streaming bodies are not buffered. Routes are labelled by their
+    # template rather than the raw path to keep label cardinality bounded.
+
+    def __init__(self, app):
+        self.app = app
+        self._route_labels: Dict[Any, str] = {}
+
+    def _route_label(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        label = self._route_labels.get(endpoint)
+        if label is None:
+            label = endpoint.__name__
+            router = scope.get("router")
+            for route in getattr(router, "routes", ()):
+                if getattr(route, "endpoint", None) is endpoint:
+                    label = route.path
+                    break
+            self._route_labels[endpoint] = label
+        return label
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_holder = {"status": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_holder["status"] = message["status"]
+            await send(message)
+
+        IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            IN_FLIGHT.dec()
+            route = self._route_label(scope)
+            method = scope["method"]
+            REQUEST_LATENCY.labels(route, method).observe(elapsed)
+            REQUESTS.labels(route, method, str(status_holder["status"])).inc()
+
+
+def start_metrics_server(port: int, addr: str = "0.0.0.0") -> bool:
+    try:
+        start_http_server(port, addr=addr)
+    except OSError as e:
+        logger.warning(f"Metrics server not started on port {port}: {e}")
+        return False
+    logger.info(f"Prometheus metrics exposed on port {port}")
+    return True
+
+
+def prepare_multiprocess_metrics(directory: str):
+    # Must run before workers start: each worker writes its samples to
+    # files in this directory and the parent aggregates them at scrape time.
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory, exist_ok=True)
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = directory
+
+
+def start_multiprocess_metrics_server(port: int, addr: str = "0.0.0.0") -> bool:
+    registry = CollectorRegistry()
+    collector = multiprocess.MultiProcessCollector(registry)
+    registry.register(HitRatioCollector(collector))
+    try:
+        start_http_server(port, addr=addr, registry=registry)
+    except OSError as e:
+        logger.warning(f"Metrics server not started on port {port}: {e}")
+        return False
+    logger.info(f"Prometheus multiprocess metrics exposed on port {port}")
+    return True
@@ -0,0 +1,154 @@
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, Hashable, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRegistryCache:
+    # In-memory snapshot of the MLflow model registry: model name to its
+    # registered-model record, including latest versions per stage. Writes
+    # made through the gateway update it immediately; a background refresh
+    # every refresh_interval picks up writes that bypassed the gateway.
+    # Lookups only answer from the snapshot while it is younger than
+    # max_staleness, and unknown names always fall back to MLflow, so a
+    # model created elsewhere is never reported as missing.
+    #
+    # The snapshot is the gateway's view, so every lookup names a
+    # permission scope and only sees the models that scope's own MLflow
+    # search returned (set_visible), which is kept for max_staleness too.
+
+    def __init__(self, refresh_interval: float = 15.0, max_staleness: float = 60.0, enabled: bool = True,
+                 max_scopes: int = 10000):
+        self.refresh_interval = refresh_interval
+        self.max_staleness = max_staleness
+        self.enabled = enabled
+        self.max_scopes = max_scopes
+        self._models: Dict[str, Dict[str, Any]] = {}
+        self._visible: "OrderedDict[Hashable, Tuple[float, FrozenSet[str]]]" = OrderedDict()
+        self._loaded_at: Optional[float] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._loop_task: Optional[asyncio.Task] = None
+        self.fetch_all: Optional[Callable[[], Awaitable[List[Dict[str, Any]]]]] = None
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+
+    def fresh(self) -> bool:
+        return (
+            self.enabled
+            and self._loaded_at is not None
+            and time.monotonic() - self._loaded_at < self.max_staleness
+        )
+
+    def visible_names(self, scope: Hashable) -> Optional[FrozenSet[str]]:
+        item = self._visible.get(scope)
+        if item is None or time.monotonic() - item[0] >= self.max_staleness:
+            return None
+        self._visible.move_to_end(scope)
+        return item[1]
+
+    def set_visible(self, scope: Hashable, names: Iterable[str]):
+        self._visible[scope] = (time.monotonic(), frozenset(names))
+        self._visible.move_to_end(scope)
+        while len(self._visible) > self.max_scopes:
+            self._visible.popitem(last=False)
+
+    def add_visible(self, scope: Hashable, name: str):
+        item = self._visible.get(scope)
+        if item is not None:
+            self._visible[scope] = (item[0], item[1] | {name})
+
+    def get(self, name: str, scope: Hashable) -> Optional[Dict[str, Any]]:
+        visible = self.visible_names(scope) if self.fresh() else None
+        model = self._models.get(name) if visible is not None and name in visible else None
+        if model is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return model
+
+    def all_models(self, scope: Hashable) -> Optional[List[Dict[str, Any]]]:
+        visible = self.visible_names(scope) if self.fresh() else None
+        # A visible name missing from the snapshot was created or deleted
+        # since the last refresh; MLflow has the answer.
+        if visible is None or not visible.issubset(self._models):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return [model for name, model in self._models.items() if name in visible]
+
+    def latest_versions(self, name: str, scope: Hashable, stages: Iterable[str] = ()) -> Optional[List[Dict[str, Any]]]:
+        model = self.get(name, scope)
+        if model is None:
+            return None
+        versions = model.get("latest_versions", [])
+        wanted = {s.lower() for s in stages}
+        if wanted:
+            versions = [v for v in versions if str(v.get("current_stage", "None")).lower() in wanted]
+        return versions
+
+    def update_model(self, model: Dict[str, Any]):
+        self._models[model["name"]] = model
+
+    def remove_model(self, name: str):
+        self._models.pop(name, None)
+
+    def mark_stale(self):
+        # A write we cannot attribute to one model: stop answering until the
+        # next refresh, and pull that refresh forward.
+        self._loaded_at = None
+        self.request_refresh()
+
+    def request_refresh(self) -> Optional[asyncio.Task]:
+        if not self.enabled or self.fetch_all is None:
+            return None
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.ensure_future(self._refresh())
+        return self._refresh_task
+
+    async def _refresh(self):
+        started = time.monotonic()
+        try:
+            models = await self.fetch_all()
+        except Exception as e:
+            self.refresh_errors += 1
+            logger.warning(f"Model registry refresh failed: {e}")
+            return
+        self._models = {model["name"]: model for model in models}
+        self._loaded_at = started
+        self.refreshes += 1
+
+    def start(self, fetch_all: Callable[[], Awaitable[List[Dict[str, Any]]]]):
+        self.fetch_all = fetch_all
+        if self.enabled and self._loop_task is None:
+            self._loop_task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            task = self.request_refresh()
+            if task is not None:
+                await asyncio.shield(task)
+            await asyncio.sleep(self.refresh_interval)
+
+    async def close(self):
+        for task in (self._loop_task, self._refresh_task):
+            if task is not None and not task.done():
+                task.cancel()
+        self._loop_task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._models),
+            "scopes": len(self._visible),
+            "fresh": self.fresh(),
+            "age_seconds": round(time.monotonic() - self._loaded_at, 3) if self._loaded_at is not None else None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+        }
@@ -0,0 +1,207 @@
+import os
+import json
+import sqlite3
+import logging
+import time
+import threading
+from typing import Optional, Dict, Any, Iterable, List, Tuple, Set, FrozenSet
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+PRINCIPAL_USER = "user"
+PRINCIPAL_GROUP = "group"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS experiment_permissions (
+    principal_type TEXT NOT NULL,
+    principal_id TEXT NOT NULL,
+    experiment_id TEXT NOT NULL,
+    permissions TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    PRIMARY KEY (principal_type, principal_id, experiment_id)
+);
+CREATE INDEX IF NOT EXISTS idx_experiment_permissions_experiment
+    ON experiment_permissions (experiment_id);
+"""
+
+
+class PermissionStore:
+    # Experiment grants persisted in SQLite and mirrored in memory, indexed
+    # both by principal (user or group) and by experiment so every lookup on
+    # the request path is a dict access rather than a scan.
+
+    def __init__(self, path: str = ":memory:", refresh_interval: float = 1.0):
+        if path != ":memory:":
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+        self._by_principal: Dict[Tuple[str, str], Dict[str, Dict[str, Any]]] = {}
+        self._by_experiment: Dict[str, Dict[Tuple[str, str], Dict[str, Any]]] = {}
+        self.refresh_interval = refresh_interval
+        self._next_refresh_check = time.monotonic() + refresh_interval
+        self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        self._load()
+
+    def _load(self):
+        rows = self._conn.execute(
+            "SELECT principal_type, principal_id, experiment_id, permissions, created_at FROM experiment_permissions"
+        ).fetchall()
+        with self._lock:
+            self._by_principal.clear()
+            self._by_experiment.clear()
+            for principal_type, principal_id, experiment_id, permissions, created_at in rows:
+                self._index(principal_type, principal_id, experiment_id, json.loads(permissions), created_at)
+        logger.info(f"Loaded {len(rows)} experiment permission grants from {self.path}")
+
+    def refresh_if_changed(self) -> bool:
+        # Other workers write to the same database file; data_version only
+        # moves for commits made through other connections, so this reloads
+        # the indexes exactly when someone else changed a grant.
+        if self.path == ":memory:":
+            return False
+        now = time.monotonic()
+        if now < self._next_refresh_check:
+            return False
+        self._next_refresh_check = now + self.refresh_interval
+        with self._lock:
+            version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if version == self._data_version:
+                return False
+            self._data_version = version
+            self._load()
+        return True
+
+    def _index(self, principal_type: str, principal_id: str, experiment_id: str, permissions: Iterable[str], created_at: str):
+        principal = (principal_type, principal_id)
+        grant = {
+            "experiment_id": experiment_id,
+            "principal_type": principal_type,
+            "principal_id": principal_id,
+            "permissions": frozenset(permissions),
+            "created_at": created_at,
+        }
+        self._by_principal.setdefault(principal, {})[experiment_id] = grant
+        self._by_experiment.setdefault(experiment_id, {})[principal] = grant
+
+    def _unindex(self, principal_type: str, principal_id: str, experiment_id: str):
+        principal = (principal_type, principal_id)
+        grants = self._by_principal.get(principal)
+        if grants is not None:
+            grants.pop(experiment_id, None)
+            if not grants:
+                del self._by_principal[principal]
+        principals = self._by_experiment.get(experiment_id)
+        if principals is not None:
+            principals.pop(principal, None)
+            if not principals:
+                del self._by_experiment[experiment_id]
+
+    def set(self, experiment_id: str, principal_id: str, permissions: Iterable[str], principal_type: str = PRINCIPAL_USER):
+        self.set_many([(experiment_id, principal_id, permissions, principal_type)])
+
+    def set_many(self, grants: Iterable[Tuple[str, str, Iterable[str], str]]) -> int:
+        created_at = datetime.utcnow().isoformat()
+        rows = [
+            (principal_type, principal_id, experiment_id, json.dumps(sorted(set(permissions))), created_at)
+            for experiment_id, principal_id, permissions, principal_type in grants
+        ]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO experiment_permissions "
+                    "(principal_type, principal_id, experiment_id, permissions, created_at) VALUES (?, ?, ?, ?, ?)",
+                    rows,
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            for principal_type, principal_id, experiment_id, permissions, _ in rows:
+                self._index(principal_type, principal_id, experiment_id, json.loads(permissions), created_at)
+        return len(rows)
+
+    def delete(self, experiment_id: str, principal_id: str, principal_type: str = PRINCIPAL_USER) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM experiment_permissions WHERE principal_type = ? AND principal_id = ? AND experiment_id = ?",
+                (principal_type, principal_id, experiment_id),
+            )
+            self._unindex(principal_type, principal_id, experiment_id)
+        return cursor.rowcount > 0
+
+    def get(self, experiment_id: str, principal_id: str, principal_type: str = PRINCIPAL_USER) -> Optional[FrozenSet[str]]:
+        grant = self._by_principal.get((principal_type, principal_id), {}).get(experiment_id)
+        return grant["permissions"] if grant else None
+
+    def get_many(self, keys: Iterable[Tuple[str, str, str]]) -> List[Optional[FrozenSet[str]]]:
+        return [self.get(experiment_id, principal_id, principal_type) for experiment_id, principal_id, principal_type in keys]
+
+    def effective_permissions(self, experiment_id: str, user_id: str, groups: Iterable[str] = ()) -> Optional[FrozenSet[str]]:
+        # Union of the user's own grant and all of its groups' grants, or
+        # None when no explicit grant applies and roles should decide.
+        principals = self._by_experiment.get(experiment_id)
+        if not principals:
+            return None
+        found = False
+        permissions: Set[str] = set()
+        grant = principals.get((PRINCIPAL_USER, user_id))
+        if grant is not None:
+            found = True
+            permissions |= grant["permissions"]
+        for group in groups:
+            grant = principals.get((PRINCIPAL_GROUP, group))
+            if grant is not None:
+                found = True
+                permissions |= grant["permissions"]
+        return frozenset(permissions) if found else None
+
+    def experiment_count(self) -> int:
+        return len(self._by_experiment)
+
+    def has_user_grants(self, user_id: str) -> bool:
+        return (PRINCIPAL_USER, user_id) in self._by_principal
+
+    def for_user(self, user_id: str) -> List[Dict[str, Any]]:
+        return list(self._by_principal.get((PRINCIPAL_USER, user_id), {}).values())
+
+    def for_group(self, group: str) -> List[Dict[str, Any]]:
+        return list(self._by_principal.get((PRINCIPAL_GROUP, group), {}).values())
+
+    def for_experiment(self, experiment_id: str) -> List[Dict[str, Any]]:
+        return list(self._by_experiment.get(experiment_id, {}).values())
+
+    def visible_experiments(self, user_id: str, groups: Iterable[str] = (), required_permission: str = "read") -> Set[str]:
+        candidates: Set[str] = set(self._by_principal.get((PRINCIPAL_USER, user_id), {}))
+        for group in groups:
+            candidates.update(self._by_principal.get((PRINCIPAL_GROUP, group), {}))
+        visible = set()
+        for experiment_id in candidates:
+            permissions = self.effective_permissions(experiment_id, user_id, groups)
+            if permissions and (required_permission in permissions or "admin" in permissions):
+                visible.add(experiment_id)
+        return visible
+
+    def denied_experiments(self, user_id: str, groups: Iterable[str] = (), required_permission: str = "read") -> Set[str]:
+        candidates: Set[str] = set(self._by_principal.get((PRINCIPAL_USER, user_id), {}))
+        for group in groups:
+            candidates.update(self._by_principal.get((PRINCIPAL_GROUP, group), {}))
+        return candidates - self.visible_experiments(user_id, groups, required_permission)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def serialize_grant(grant: Dict[str, Any]) -> Dict[str, Any]:
+    return {**grant, "permissions": sorted(grant["permissions"])}
@@ -0,0 +1,242 @@
+import math
+import time
+import asyncio
+import logging
+import sqlite3
+from typing import Optional, Dict, Any
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # pragma: no cover - redis is only needed for the shared backend
+    aioredis = None
+
+GLOBAL_KEY = "__global__"
+
+# Refills and consumes every bucket in KEYS atomically. A token is only
+# taken when all buckets have one, so a rejected request costs nothing.
+# ARGV: now, then (rate_per_second, burst) for each key.
+_TOKEN_BUCKET_SCRIPT = """
+local now = tonumber(ARGV[1])
+local tokens = {}
+local retry_after = 0
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[i * 2])
+    local burst = tonumber(ARGV[i * 2 + 1])
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local current = tonumber(state[1]) or burst
+    local ts = tonumber(state[2]) or now
+    current = math.min(burst, current + math.max(0, now - ts) * rate)
+    tokens[i] = current
+    if current < 1 then
+        retry_after = math.max(retry_after, (1 - current) / rate)
+    end
+end
+local allowed = retry_after == 0 and 1 or 0
+local remaining = 0
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[i * 2])
+    local burst = tonumber(ARGV[i * 2 + 1])
+    local current = tokens[i]
+    if allowed == 1 then
+        current = current - 1
+    end
+    redis.call('HSET', key, 'tokens', tostring(current), 'ts', tostring(now))
+    redis.call('EXPIRE', key, math.ceil(burst / rate) + 1)
+    remaining = math.floor(current)
+end
+return {allowed, tostring(retry_after), remaining}
+"""
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated_at")
+
+    def __init__(self, tokens: float, updated_at: float):
+        self.tokens = tokens
+        self.updated_at = updated_at
+
+    def refill(self, now: float, rate: float, burst: float) -> float:
+        elapsed = now - self.updated_at
+        if elapsed > 0:
+            self.tokens = min(burst, self.tokens + elapsed * rate)
+            self.updated_at = now
+        return self.tokens
+
+
+class RateLimitDecision:
+    __slots__ = ("allowed", "retry_after", "limit", "remaining")
+
+    def __init__(self, allowed: bool, retry_after: float = 0.0, limit: int = 0, remaining: int = 0):
+        self.allowed = allowed
+        self.retry_after = retry_after
+        self.limit = limit
+        self.remaining = remaining
+
+    def headers(self) -> Dict[str, str]:
+        headers = {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(self.remaining),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(max(1, math.ceil(self.retry_after)))
+        return headers
+
+
+class RateLimiter:
+    # Global and per-user token buckets refilled lazily on access. Buckets
+    # live in a plain dict; the gateway runs a single event loop per worker
+    # so updates need no locking. With a redis_url the buckets are kept in
+    # Redis instead so limits hold across workers and replicas. With a
+    # SharedCache, per-user buckets are kept there so a user gets the same
+    # quota whichever worker their connection lands on; only the global
+    # bucket is split between the workers.
+
+    def __init__(self, requests_per_minute: float = 1000, burst_size: float = 100,
+                 per_user_limit: float = 100, per_user_burst: Optional[float] = None,
+                 enabled: bool = True, redis_url: Optional[str] = None,
+                 key_prefix: str = "gateway:ratelimit:", idle_eviction_interval: float = 60.0,
+                 workers: int = 1, shared=None):
+        self.enabled = enabled
+        self.global_rate = requests_per_minute / 60.0
+        self.global_burst = float(burst_size)
+        self.user_rate = per_user_limit / 60.0
+        self.user_burst = float(per_user_burst if per_user_burst is not None else min(burst_size, per_user_limit))
+        self.per_user_limit = int(per_user_limit)
+        self.key_prefix = key_prefix
+        self.idle_eviction_interval = idle_eviction_interval
+
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._next_eviction = time.monotonic() + idle_eviction_interval
+        self.allowed = 0
+        self.rejected = 0
+        self.evicted = 0
+
+        self._redis = None
+        self._script = None
+        if redis_url:
+            if aioredis is None:
+                logger.warning("redis package not installed; falling back to in-process rate limiting")
+            else:
+                self._redis = aioredis.from_url(redis_url)
+                self._script = self._redis.register_script(_TOKEN_BUCKET_SCRIPT)
+
+        self._shared = shared
+
+        # Without Redis each worker enforces its share of the global limit
+        # so the host as a whole stays within it.
+        self.local_share = 1.0 / max(1, workers)
+
+    async def check(self, user_id: str) -> RateLimitDecision:
+        if not self.enabled:
+            return RateLimitDecision(True, limit=self.per_user_limit, remaining=self.per_user_limit)
+
+        if self._redis is not None:
+            try:
+                decision = await self._check_shared(user_id)
+            except Exception as e:
+                logger.warning(f"Shared rate limiter unavailable, using local buckets: {e}")
+                decision = self._check_local(user_id)
+        elif self._shared is not None:
+            decision = await self._check_host(user_id)
+        else:
+            decision = self._check_local(user_id)
+
+        if decision.allowed:
+            self.allowed += 1
+        else:
+            self.rejected += 1
+        return decision
+
+    def _bucket(self, key: str, burst: float, now: float) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(burst, now)
+            self._buckets[key] = bucket
+        return bucket
+
+    def _global_bucket(self, now: float):
+        rate = self.global_rate * self.local_share
+        burst = max(1.0, self.global_burst * self.local_share)
+        bucket = self._bucket(GLOBAL_KEY, burst, now)
+        return bucket, bucket.refill(now, rate, burst), rate
+
+    def _check_local(self, user_id: str) -> RateLimitDecision:
+        now = time.monotonic()
+        if now >= self._next_eviction:
+            self._evict_idle(now)
+
+        global_bucket, global_tokens, global_rate = self._global_bucket(now)
+        user_bucket = self._bucket(user_id, self.user_burst, now)
+        user_tokens = user_bucket.refill(now, self.user_rate, self.user_burst)
+
+        if global_tokens >= 1 and user_tokens >= 1:
+            global_bucket.tokens -= 1
+            user_bucket.tokens -= 1
+            return RateLimitDecision(True, limit=self.per_user_limit, remaining=int(user_bucket.tokens))
+
+        retry_after = 0.0
+        if global_tokens < 1:
+            retry_after = (1 - global_tokens) / global_rate
+        if user_tokens < 1:
+            retry_after = max(retry_after, (1 - user_tokens) / self.user_rate)
+        return RateLimitDecision(False, retry_after=retry_after, limit=self.per_user_limit, remaining=0)
+
+    async def _check_host(self, user_id: str) -> RateLimitDecision:
+        global_bucket, global_tokens, global_rate = self._global_bucket(time.monotonic())
+        if global_tokens < 1:
+            return RateLimitDecision(
+                False, retry_after=(1 - global_tokens) / global_rate, limit=self.per_user_limit, remaining=0
+            )
+        try:
+            allowed, user_tokens, retry_after = await asyncio.to_thread(
+                self._shared.take_token, "ratelimit", user_id, self.user_rate, self.user_burst
+            )
+        except sqlite3.OperationalError as e:
+            logger.warning(f"Shared rate limit buckets busy, using local buckets: {e}")
+            return self._check_local(user_id)
+        if not allowed:
+            return RateLimitDecision(False, retry_after=retry_after, limit=self.per_user_limit, remaining=0)
+        # Other requests may have spent global tokens while this one waited
+        # on the shared bucket; the small overdraft is repaid by the refill.
+        global_bucket.tokens -= 1
+        return RateLimitDecision(True, limit=self.per_user_limit, remaining=int(user_tokens))
+
+    async def _check_shared(self, user_id: str) -> RateLimitDecision:
+        allowed, retry_after, remaining = await self._script(
+            keys=[f"{self.key_prefix}{GLOBAL_KEY}", f"{self.key_prefix}user:{user_id}"],
+            args=[time.time(), self.global_rate, self.global_burst, self.user_rate, self.user_burst],
+        )
+        allowed = int(allowed) == 1
+        return RateLimitDecision(
+            allowed,
+            retry_after=float(retry_after),
+            limit=self.per_user_limit,
+            remaining=max(0, int(remaining)),
+        )
+
+    def _evict_idle(self, now: float):
+        # A bucket that would be full again carries no state worth keeping.
+        idle = [
+            key for key, bucket in self._buckets.items()
+            if key != GLOBAL_KEY and bucket.refill(now, self.user_rate, self.user_burst) >= self.user_burst
+        ]
+        for key in idle:
+            del self._buckets[key]
+        self.evicted += len(idle)
+        self._next_eviction = now + self.idle_eviction_interval
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "backend": "redis" if self._redis is not None else "shared" if self._shared is not None else "memory",
+            "buckets": len(self._buckets),
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+            "evicted": self.evicted,
+        }
+
+    async def close(self):
+        if self._redis is not None:
+            await self._redis.close()
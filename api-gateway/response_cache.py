@@ -0,0 +1,142 @@
+import time
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Iterable, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class CacheEntry:
+    __slots__ = ("body", "status_code", "media_type", "etag", "expires_at", "tags", "encoded")
+
+    def __init__(self, body: bytes, status_code: int, media_type: str, etag: str, expires_at: float, tags: Tuple[str, ...]):
+        self.body = body
+        self.status_code = status_code
+        self.media_type = media_type
+        self.etag = etag
+        self.expires_at = expires_at
+        self.tags = tags
+        self.encoded: Dict[str, bytes] = {}
+
+
+def compute_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+class ResponseCache:
+    # Short-lived LRU of upstream GET responses keyed by
+    # (permission scope, path, query). Entries carry tags so write-through
+    # routes can drop exactly the listings they affect.
+
+    def __init__(self, ttl_seconds: float = 5.0, max_entries: int = 10000, enabled: bool = True):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._tags: Dict[str, Set[str]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(scope: str, path: str, query: Iterable[Tuple[str, str]] = ()) -> str:
+        query_string = "&".join(f"{k}={v}" for k, v in sorted(query))
+        return f"{scope}|{path}?{query_string}"
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        if not self.enabled:
+            return None
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry.expires_at <= time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def set(self, key: str, body: bytes, status_code: int = 200, media_type: str = "application/json",
+            tags: Iterable[str] = (), ttl_seconds: Optional[float] = None) -> CacheEntry:
+        entry = CacheEntry(
+            body=body,
+            status_code=status_code,
+            media_type=media_type,
+            etag=compute_etag(body),
+            expires_at=time.monotonic() + (self.ttl_seconds if ttl_seconds is None else ttl_seconds),
+            tags=tuple(tags),
+        )
+        if not self.enabled:
+            return entry
+
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = entry
+        for tag in entry.tags:
+            self._tags.setdefault(tag, set()).add(key)
+
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+        return entry
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry.tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def invalidate(self, *tags: str) -> int:
+        removed = 0
+        for tag in tags:
+            for key in list(self._tags.get(tag, ())):
+                self._remove(key)
+                removed += 1
+        self.invalidations += removed
+        return removed
+
+    def invalidate_prefix(self, prefix: str) -> int:
+        return self.invalidate(*[tag for tag in self._tags if tag.startswith(prefix)])
+
+    def clear(self):
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+        self._tags.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "not_modified": self.not_modified,
+            "invalidations": self.invalidations,
+            "evictions": self.evictions,
+        }
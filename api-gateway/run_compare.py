@@ -0,0 +1,98 @@
+import io
+import math
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow as pa
+except ImportError:  # pragma: no cover - pyarrow is only needed for Arrow output
+    pa = None
+
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+INFO_COLUMNS = ("run_id", "run_name", "experiment_id", "status", "start_time", "end_time")
+
+
+def comparison_frame(runs: List[Dict[str, Any]], metric_keys: Optional[Iterable[str]] = None,
+                     param_keys: Optional[Iterable[str]] = None) -> pd.DataFrame:
+    # One row per run; params become string columns "params.<key>" and the
+    # latest value of each metric a float column "metrics.<key>".
+    metric_filter = set(metric_keys) if metric_keys else None
+    param_filter = set(param_keys) if param_keys else None
+    info_rows, param_rows, metric_rows = [], [], []
+    for run in runs:
+        info = run.get("info", {})
+        data = run.get("data", {})
+        info_rows.append({column: info.get(column) for column in INFO_COLUMNS})
+        param_rows.append({
+            p["key"]: p.get("value") for p in data.get("params", [])
+            if param_filter is None or p["key"] in param_filter
+        })
+        metric_rows.append({
+            m["key"]: m.get("value") for m in data.get("metrics", [])
+            if metric_filter is None or m["key"] in metric_filter
+        })
+
+    info = pd.DataFrame(info_rows, columns=list(INFO_COLUMNS))
+    params = pd.DataFrame(param_rows).add_prefix("params.").astype(object)
+    metrics = pd.DataFrame(metric_rows, dtype=np.float64).add_prefix("metrics.")
+    params = params.reindex(sorted(params.columns), axis=1)
+    metrics = metrics.reindex(sorted(metrics.columns), axis=1)
+    return pd.concat([info, params, metrics], axis=1)
+
+
+def differing_columns(frame: pd.DataFrame) -> List[str]:
+    # A column differs when it has more than one distinct value across the
+    # runs, counting "missing" as a value of its own.
+    data = frame.drop(columns=list(INFO_COLUMNS))
+    if data.empty or len(frame) < 2:
+        return list(data.columns)
+    counts = data.nunique(dropna=False)
+    return list(counts.index[counts.to_numpy() > 1])
+
+
+def _json_value(value):
+    if value is None:
+        return None
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if isinstance(value, np.generic):
+        return _json_value(value.item())
+    return value
+
+
+def comparison_json(frame: pd.DataFrame, include_identical: bool = False) -> Dict[str, Any]:
+    differing = differing_columns(frame)
+    columns = list(INFO_COLUMNS) + differing
+    result: Dict[str, Any] = {
+        "runs": len(frame),
+        "columns": {
+            column: [_json_value(v) for v in frame[column].tolist()] for column in columns
+        },
+    }
+    identical = [c for c in frame.columns if c not in INFO_COLUMNS and c not in set(differing)]
+    if include_identical:
+        result["identical"] = {column: _json_value(frame[column].iloc[0]) for column in identical}
+    else:
+        result["identical_columns"] = len(identical)
+    return result
+
+
+def comparison_arrow(frame: pd.DataFrame, include_identical: bool = False) -> bytes:
+    if pa is None:
+        raise RuntimeError("pyarrow is not installed")
+    if not include_identical:
+        frame = frame[list(INFO_COLUMNS) + differing_columns(frame)]
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+def arrow_available() -> bool:
+    return pa is not None
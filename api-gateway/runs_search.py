@@ -0,0 +1,100 @@
+import json
+import base64
+import hashlib
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_RESULTS = 1000
+MAX_RESULTS_LIMIT = 50000
+SEARCH_FIELDS = ("filter", "order_by", "run_view_type")
+
+FetchPage = Callable[[List[str], Dict[str, Any], int, Optional[str]], Awaitable[Dict[str, Any]]]
+
+
+class InvalidSearchParameter(ValueError):
+    pass
+
+
+class InvalidPageToken(InvalidSearchParameter):
+    pass
+
+
+def parse_max_results(value: Any) -> int:
+    if value is None or value == "":
+        return DEFAULT_MAX_RESULTS
+    try:
+        max_results = int(value)
+    except (TypeError, ValueError):
+        raise InvalidSearchParameter("max_results must be an integer")
+    if max_results < 1:
+        raise InvalidSearchParameter("max_results must be positive")
+    return min(max_results, MAX_RESULTS_LIMIT)
+
+
+def chunked(ids: Sequence[str], size: int) -> List[List[str]]:
+    return [list(ids[i:i + size]) for i in range(0, len(ids), size)]
+
+
+def search_digest(chunks: List[List[str]], query: Dict[str, Any]) -> str:
+    # Ties a page token to the experiment chunks and query it was issued
+    # for, so a token is rejected once permissions or parameters change.
+    material = json.dumps([chunks, [query.get(f) for f in SEARCH_FIELDS]], sort_keys=True, default=str)
+    return hashlib.sha1(material.encode()).hexdigest()[:16]
+
+
+def encode_page_token(chunk: int, upstream_token: Optional[str], digest: str) -> str:
+    payload = json.dumps({"c": chunk, "t": upstream_token, "d": digest}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_page_token(token: str, digest: str):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token.encode()))
+        chunk, upstream_token, token_digest = int(payload["c"]), payload["t"], payload["d"]
+    except (ValueError, KeyError, TypeError):
+        raise InvalidPageToken("Malformed page token")
+    if token_digest != digest:
+        raise InvalidPageToken("Page token no longer matches this search")
+    return chunk, upstream_token
+
+
+async def search_runs(
+    fetch_page: FetchPage,
+    experiment_ids: Sequence[str],
+    query: Dict[str, Any],
+    chunk_size: int = 500,
+    max_results: Any = None,
+    page_token: Optional[str] = None,
+) -> Dict[str, Any]:
+    # Serves one page of runs across an allow-list split into chunks of
+    # chunk_size experiments. Chunks are walked in order and only as far as
+    # needed to fill the page; the returned token records the chunk and the
+    # upstream page token to resume from. order_by applies within a chunk.
+    max_results = parse_max_results(max_results)
+    chunks = chunked(sorted(set(experiment_ids)), chunk_size)
+    if not chunks:
+        return {"runs": []}
+
+    digest = search_digest(chunks, query)
+    chunk_index, upstream_token = (0, None)
+    if page_token:
+        chunk_index, upstream_token = decode_page_token(page_token, digest)
+        if not 0 <= chunk_index < len(chunks):
+            raise InvalidPageToken("Page token out of range")
+
+    runs: List[Dict[str, Any]] = []
+    while chunk_index < len(chunks):
+        page = await fetch_page(chunks[chunk_index], query, max_results - len(runs), upstream_token)
+        runs.extend(page.get("runs", []))
+        upstream_token = page.get("next_page_token") or None
+        if upstream_token is None:
+            chunk_index += 1
+        if len(runs) >= max_results:
+            break
+
+    result: Dict[str, Any] = {"runs": runs}
+    if chunk_index < len(chunks):
+        result["next_page_token"] = encode_page_token(chunk_index, upstream_token, digest)
+    return result
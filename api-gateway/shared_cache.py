@@ -0,0 +1,201 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import Optional, Any, Dict
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SHARED_CACHE_PATH = "/dev/shm/mlops-gateway/shared-cache.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+) WITHOUT ROWID;
+"""
+
+
+class SharedCache:
+    # Key/value store shared by all gateway workers on a host. It is a WAL
+    # SQLite file, by default on /dev/shm so reads and writes stay in
+    # memory, and any number of processes can open it concurrently.
+    # Reads go through their own connection with no busy timeout: in WAL
+    # mode they do not wait for writers, and in the rare case the file is
+    # locked they fail at once and count as a miss instead of stalling the
+    # event loop. Cache writes likewise give up at once when another worker
+    # holds the write lock. Only take_token waits, and it runs in a thread.
+    #
+    # The directory and file are private to the gateway's user, since
+    # cached entries identify users; SQLite gives the WAL and shared-memory
+    # files the database file's permissions.
+
+    def __init__(self, path: str = DEFAULT_SHARED_CACHE_PATH, purge_interval: float = 60.0):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+        os.close(os.open(path, os.O_CREAT | os.O_RDWR, 0o600))
+        os.chmod(path, 0o600)
+
+        self.path = path
+        self.purge_interval = purge_interval
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=1.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.executescript(_SCHEMA)
+        # The schema may wait for another worker's startup; nothing after it does.
+        self._conn.execute("PRAGMA busy_timeout=0")
+        self._read_lock = threading.Lock()
+        self._reader = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=0)
+        self._bucket_lock = threading.Lock()
+        self._buckets = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=1.0)
+        self._next_purge = time.time() + purge_interval
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        return self.get_with_expiry(namespace, key)[0]
+
+    def get_with_expiry(self, namespace: str, key: str):
+        try:
+            with self._read_lock:
+                row = self._reader.execute(
+                    "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?",
+                    (namespace, key),
+                ).fetchone()
+        except sqlite3.OperationalError as e:
+            logger.warning(f"Shared cache read failed: {e}")
+            return None, 0.0
+        if row is None or row[1] <= time.time():
+            return None, 0.0
+        return json.loads(row[0]), row[1]
+
+    def set(self, namespace: str, key: str, value: Any, ttl: float):
+        now = time.time()
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                    (namespace, key, json.dumps(value), now + ttl),
+                )
+                if now >= self._next_purge:
+                    self._conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+                    self._next_purge = now + self.purge_interval
+        except sqlite3.OperationalError as e:
+            # A busy database only costs other workers a cache miss.
+            logger.warning(f"Shared cache write failed: {e}")
+
+    def take_token(self, namespace: str, key: str, rate: float, burst: float):
+        # Token bucket shared by every worker: refill and consume happen in
+        # one write transaction, so two workers cannot both spend the last
+        # token. Blocks on the write lock, so call it off the event loop.
+        # Returns (allowed, tokens left, seconds until the next token).
+        with self._bucket_lock:
+            self._buckets.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                row = self._buckets.execute(
+                    "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?",
+                    (namespace, key),
+                ).fetchone()
+                tokens, updated_at = burst, now
+                # Rows expire once the bucket would have refilled, so an
+                # expired row is a full bucket.
+                if row is not None and row[1] > now:
+                    state = json.loads(row[0])
+                    tokens, updated_at = state["tokens"], state["ts"]
+                tokens = min(burst, tokens + max(0.0, now - updated_at) * rate)
+                allowed = tokens >= 1
+                if allowed:
+                    tokens -= 1
+                self._buckets.execute(
+                    "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                    (namespace, key, json.dumps({"tokens": tokens, "ts": now}), now + (burst - tokens) / rate + 1),
+                )
+                self._buckets.execute("COMMIT")
+            except BaseException:
+                self._buckets.execute("ROLLBACK")
+                raise
+        return allowed, tokens, 0.0 if allowed else (1 - tokens) / rate
+
+    def delete(self, namespace: str, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def clear(self, namespace: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE namespace = ?", (namespace,))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+        with self._read_lock:
+            self._reader.close()
+        with self._bucket_lock:
+            self._buckets.close()
+
+
+class TieredCache:
+    # Per-process dict in front of an optional SharedCache. Hits in the
+    # local tier cost a dict lookup; entries found in the shared tier are
+    # promoted with the expiry they were stored with.
+
+    def __init__(self, namespace: str, max_entries: int = 50000, shared: Optional[SharedCache] = None):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.shared = shared
+        self._local: Dict[str, Any] = {}
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        item = self._local.get(key)
+        if item is not None:
+            value, expires_at = item
+            if expires_at > now:
+                self.hits += 1
+                return value
+            del self._local[key]
+
+        if self.shared is not None:
+            value, expires_at = self.shared.get_with_expiry(self.namespace, key)
+            if value is not None:
+                self.hits += 1
+                self.shared_hits += 1
+                self._store_local(key, value, expires_at)
+                return value
+
+        self.misses += 1
+        return None
+
+    def set(self, key: str, value: Any, ttl: float):
+        if ttl <= 0:
+            return
+        self._store_local(key, value, time.time() + ttl)
+        if self.shared is not None:
+            self.shared.set(self.namespace, key, value, ttl)
+
+    def _store_local(self, key: str, value: Any, expires_at: float):
+        if key not in self._local and len(self._local) >= self.max_entries:
+            del self._local[next(iter(self._local))]
+        self._local[key] = (value, expires_at)
+
+    def delete(self, key: str):
+        self._local.pop(key, None)
+        if self.shared is not None:
+            self.shared.delete(self.namespace, key)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._local),
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "shared": self.shared is not None,
+        }
@@ -0,0 +1,33 @@
+import asyncio
+
+from access_log import ACCESS, AUTH, AccessLogger, AccessLogMiddleware, redact_query
+
+
+def test_credentials_redacted_from_query():
+    assert redact_query(b"") == ""
+    assert redact_query(b"run_id=abc&max_results=10") == "run_id=abc&max_results=10"
+    assert redact_query(b"code=0.AXoA-secret&state=xyz&session_state=1") == (
+        "code=%5BREDACTED%5D&state=%5BREDACTED%5D&session_state=1"
+    )
+    assert "secret" not in redact_query(b"Refresh_Token=secret&redirect_uri=https%3A%2F%2Fgw%2Fcb")
+
+
+def test_access_and_auth_records_omit_oauth_code():
+    access_logger = AccessLogger(sink=object())
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 401, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    async def send(message):
+        pass
+
+    scope = {
+        "type": "http", "method": "GET", "path": "/oauth/callback", "headers": [],
+        "query_string": b"code=secret-code&state=abc",
+    }
+    asyncio.run(AccessLogMiddleware(app, lambda: access_logger)(scope, None, send))
+
+    records = list(access_logger._buffer)
+    assert [r["kind"] for r in records] == [AUTH, ACCESS]
+    assert all("secret-code" not in r["query"] for r in records)
@@ -0,0 +1,56 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from admission import BATCH, INTERACTIVE, NORMAL, AdmissionController, Overloaded, PriorityClassifier
+
+
+def request(path="/mlflow/runs/get", user_agent="", priority=None, user=None):
+    headers = [(b"user-agent", user_agent.encode())]
+    if priority is not None:
+        headers.append((b"x-request-priority", priority.encode()))
+    return {"type": "http", "path": path, "headers": headers, "user": user}
+
+
+def caller(roles=(), groups=()):
+    return SimpleNamespace(roles=list(roles), groups=list(groups))
+
+
+def test_class_derived_from_route_and_client():
+    classifier = PriorityClassifier()
+    assert classifier.classify(request(path="/mlflow/batch")) == BATCH
+    assert classifier.classify(request(user_agent="python-requests/2.31")) == BATCH
+    assert classifier.classify(request(user_agent="Mozilla/5.0")) == INTERACTIVE
+    assert classifier.classify(request()) == NORMAL
+
+
+def test_header_may_only_lower_the_class():
+    classifier = PriorityClassifier(elevate_roles=["ops"])
+    assert classifier.classify(request(user_agent="Mozilla/5.0", priority="batch")) == BATCH
+    assert classifier.classify(request(user_agent="curl/8.0", priority="interactive", user=caller())) == BATCH
+    assert classifier.classify(request(priority="urgent")) == NORMAL
+
+
+def test_elevate_roles_and_groups_may_raise_the_class():
+    classifier = PriorityClassifier(elevate_roles=["ops"])
+    assert classifier.classify(request(user_agent="curl/8.0", priority="interactive", user=caller(roles=["ops"]))) == INTERACTIVE
+    assert classifier.classify(request(user_agent="curl/8.0", priority="normal", user=caller(groups=["ops"]))) == NORMAL
+    assert not PriorityClassifier().may_elevate(caller(roles=["ops"]))
+
+
+def test_full_queue_displaces_lower_priority_waiter():
+    async def scenario():
+        controller = AdmissionController("mlflow", max_concurrency=1, max_queue=1)
+        await controller.acquire()
+        batch = asyncio.create_task(controller.acquire(BATCH, timeout=5.0))
+        await asyncio.sleep(0)
+        interactive = asyncio.create_task(controller.acquire(INTERACTIVE, timeout=5.0))
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded):
+            await batch
+        controller.release()
+        await interactive
+        return controller.shed["displaced"]
+
+    assert asyncio.run(scenario()) == 1
@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+import main
+from main import UserInfo, artifact_experiment_id
+from permissions import PermissionStore
+
+ALICE = UserInfo(user_id="alice", email="alice@example.com", name="Alice", groups=[], roles=[])
+ESCAPES = [
+    "1/../5/run/artifacts/model.pkl",
+    "1/%2E%2E/5/run/artifacts/model.pkl",
+    "1/%2e./5/run/artifacts/model.pkl",
+    "1/./run/artifacts/model.pkl",
+    "1//run/artifacts/model.pkl",
+    "../5/run/artifacts/model.pkl",
+]
+
+
+@pytest.fixture(autouse=True)
+def grants(monkeypatch):
+    store = PermissionStore()
+    store.set("1", "alice", ["read", "write"])
+    monkeypatch.setattr(main, "permission_store", store)
+
+
+def status_of(call):
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(call)
+    return error.value.status_code
+
+
+def test_experiment_is_first_segment():
+    assert artifact_experiment_id("1/run/artifacts/model.pkl") == "1"
+
+
+@pytest.mark.parametrize("path", ESCAPES)
+def test_dot_segments_rejected(path):
+    with pytest.raises(HTTPException) as error:
+        artifact_experiment_id(path)
+    assert error.value.status_code == 400
+
+
+@pytest.mark.parametrize("path", ESCAPES[:2])
+def test_download_cannot_escape_experiment(path):
+    assert status_of(main.proxy_mlflow_artifacts(path, None, ALICE)) == 400
+    assert status_of(main.proxy_mlflow_artifacts("5/run/artifacts/model.pkl", None, ALICE)) == 403
+
+
+@pytest.mark.parametrize("path", ESCAPES[:2])
+def test_uploads_cannot_escape_experiment(path):
+    assert status_of(main.proxy_mlflow_artifact_upload(path, None, ALICE)) == 400
+    assert status_of(main.proxy_mlflow_multipart_upload("create", path, None, ALICE)) == 400
+    assert status_of(main.proxy_mlflow_artifact_upload("5/run/artifacts/model.pkl", None, ALICE)) == 403
+    assert status_of(main.proxy_mlflow_multipart_upload("create", "5/run/artifacts/model.pkl", None, ALICE)) == 403
@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+import main
+from main import BatchSubRequest, UserInfo, authorize_batch_request
+from permissions import PermissionStore
+
+ALICE = UserInfo(user_id="alice", email="alice@example.com", name="Alice", groups=[], roles=[])
+RUN_EXPERIMENTS = {"run-in-1": "1", "run-in-5": "5"}
+
+
+@pytest.fixture(autouse=True)
+def grants(monkeypatch):
+    store = PermissionStore()
+    store.set("1", "alice", ["read", "write"])
+    monkeypatch.setattr(main, "permission_store", store)
+
+    async def resolve_run_experiment(user, run_id):
+        return RUN_EXPERIMENTS.get(run_id)
+
+    monkeypatch.setattr(main, "resolve_run_experiment", resolve_run_experiment)
+
+
+def authorize(method, path, **fields):
+    if method == "GET":
+        sub_request = BatchSubRequest(method=method, path=path, params=fields)
+    else:
+        sub_request = BatchSubRequest(method=method, path=path, body=fields)
+    return asyncio.run(authorize_batch_request(sub_request, ALICE))
+
+
+def test_run_checked_against_its_own_experiment():
+    assert authorize("GET", "api/2.0/mlflow/runs/get", run_id="run-in-1")
+    assert not authorize("GET", "api/2.0/mlflow/runs/get", run_id="run-in-5")
+    assert not authorize("GET", "api/2.0/mlflow/runs/get", run_id="unknown")
+
+
+def test_named_experiment_does_not_cover_another_run():
+    assert not authorize("GET", "api/2.0/mlflow/runs/get", run_id="run-in-5", experiment_id="1")
+    assert not authorize("POST", "api/2.0/mlflow/runs/delete", run_id="run-in-5", experiment_id="1")
+    assert not authorize("POST", "api/2.0/mlflow/runs/delete", run_uuid="run-in-5", experiment_ids=["1"])
+    assert authorize("POST", "api/2.0/mlflow/runs/delete", run_id="run-in-1", experiment_id="1")
+
+
+def test_experiment_ids_must_be_a_list():
+    assert authorize("POST", "api/2.0/mlflow/runs/search", experiment_ids=["1"])
+    assert not authorize("POST", "api/2.0/mlflow/runs/search", experiment_ids=["1", "5"])
+    with pytest.raises(HTTPException) as error:
+        authorize("POST", "api/2.0/mlflow/runs/search", experiment_ids="15")
+    assert error.value.status_code == 400
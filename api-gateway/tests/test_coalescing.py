@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+from coalescing import SingleFlight
+
+
+def test_concurrent_calls_share_one_upstream_call():
+    async def scenario():
+        flight = SingleFlight()
+        calls = 0
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "result"
+
+        results = await asyncio.gather(*(flight.do("key", fetch) for _ in range(10)))
+        return flight, calls, results
+
+    flight, calls, results = asyncio.run(scenario())
+    assert calls == 1
+    assert results == ["result"] * 10
+    assert flight.stats()["coalesced"] == 9
+    assert flight.in_flight() == 0
+
+
+def test_errors_reach_every_waiter_and_are_not_cached():
+    async def scenario():
+        flight = SingleFlight()
+        attempts = 0
+
+        async def fail():
+            nonlocal attempts
+            attempts += 1
+            await asyncio.sleep(0.01)
+            raise RuntimeError("upstream down")
+
+        results = await asyncio.gather(flight.do("key", fail), flight.do("key", fail), return_exceptions=True)
+        with pytest.raises(RuntimeError):
+            await flight.do("key", fail)
+        return attempts, results
+
+    attempts, results = asyncio.run(scenario())
+    assert attempts == 2
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_call():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def fetch():
+            await asyncio.sleep(0.02)
+            return "done"
+
+        first = asyncio.ensure_future(flight.do("key", fetch))
+        second = asyncio.ensure_future(flight.do("key", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(scenario()) == "done"
+
+
+def test_disabled_runs_every_call():
+    async def scenario():
+        flight = SingleFlight(enabled=False)
+        calls = 0
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0)
+
+        await asyncio.gather(*(flight.do("key", fetch) for _ in range(3)))
+        return calls
+
+    assert asyncio.run(scenario()) == 3
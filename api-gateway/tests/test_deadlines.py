@@ -0,0 +1,63 @@
+import asyncio
+import time
+
+import pytest
+
+from deadlines import DeadlineExceeded, DeadlinePolicy, current_deadline, expired, parse_timeout, remaining
+from hedging import Hedger
+
+
+def test_parse_timeout_units():
+    assert parse_timeout("2.5") == 2.5
+    assert parse_timeout("3s") == 3.0
+    assert parse_timeout("250ms") == 0.25
+    assert parse_timeout("soon") is None
+    assert parse_timeout(None) is None
+
+
+def test_remaining_raises_once_deadline_passes(monkeypatch):
+    monkeypatch.setattr(time, "monotonic", lambda: 100.0)
+    assert remaining(7.0) == 7.0
+
+    token = current_deadline.set(102.0)
+    try:
+        assert remaining(7.0) == 2.0
+        assert not expired()
+        current_deadline.set(100.0)
+        assert expired()
+        with pytest.raises(DeadlineExceeded):
+            remaining(7.0)
+    finally:
+        current_deadline.reset(token)
+
+
+def test_budget_prefers_request_then_route_then_default():
+    policy = DeadlinePolicy(default_timeout=30.0, max_timeout=60.0, routes={"/api/v1/batch": 90.0})
+
+    assert policy.budget("/api/v1/runs", None) == 30.0
+    assert policy.budget("/api/v1/batch", None) == 90.0
+    assert policy.budget("/api/v1/runs", 5.0) == 5.0
+    assert policy.budget("/api/v1/runs", 500.0) == 60.0
+
+
+def test_hedger_sends_second_copy_after_p95():
+    hedger = Hedger(enabled=True, min_delay=0.01, max_delay=0.01, max_hedge_ratio=1.0, min_samples=1)
+    hedger.record("mlflow", 0.01)
+    calls = []
+
+    async def fetch():
+        calls.append(len(calls))
+        if len(calls) == 1:
+            await asyncio.sleep(1.0)
+            return "slow"
+        return "fast"
+
+    assert asyncio.run(hedger.run("mlflow", fetch)) == "fast"
+    assert hedger.hedged == 1
+    assert hedger.hedge_wins == 1
+
+
+def test_hedger_waits_for_samples():
+    hedger = Hedger(enabled=True, min_samples=20)
+    hedger.record("mlflow", 0.5)
+    assert hedger.delay("mlflow") is None
@@ -0,0 +1,73 @@
+import numpy as np
+
+from downsampling import MINMAX, downsample, history_arrays, lttb, minmax
+
+
+def reference_lttb(x, y, threshold):
+    # Straightforward per-point LTTB to check the vectorized version against.
+    n = len(x)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    selected = [0]
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            nxt = range(edges[i + 1], edges[i + 2])
+            cx = sum(x[j] for j in nxt) / len(nxt)
+            cy = sum(y[j] for j in nxt) / len(nxt)
+        else:
+            cx, cy = x[n - 1], y[n - 1]
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((x[a] - cx) * (y[j] - y[a]) - (x[a] - x[j]) * (cy - y[a]))
+            if area > best_area:
+                best, best_area = j, area
+        selected.append(best)
+        a = best
+    selected.append(n - 1)
+    return selected
+
+
+def test_lttb_matches_reference():
+    rng = np.random.default_rng(7)
+    x = np.arange(1000, dtype=np.float64)
+    y = np.cumsum(rng.normal(size=1000))
+    for threshold in (3, 10, 97, 500):
+        assert lttb(x, y, threshold).tolist() == reference_lttb(x, y, threshold)
+
+
+def test_small_series_returned_whole():
+    x = np.arange(5, dtype=np.float64)
+    assert lttb(x, x, 10).tolist() == [0, 1, 2, 3, 4]
+    assert minmax(x, 10).tolist() == [0, 1, 2, 3, 4]
+
+
+def test_minmax_keeps_spikes():
+    y = np.zeros(1000)
+    y[123] = 50.0
+    y[877] = -50.0
+    kept = minmax(y, 20)
+    assert 123 in kept and 877 in kept
+    assert len(kept) <= 20
+    assert (np.diff(kept) > 0).all()
+
+
+def test_downsample_skips_nan():
+    x = np.arange(100, dtype=np.float64)
+    y = np.sin(x / 5)
+    y[[10, 50]] = np.nan
+    for method in ("lttb", MINMAX):
+        kept = downsample(x, y, 20, method)
+        assert 10 not in kept and 50 not in kept
+        assert np.isfinite(y[kept]).all()
+
+
+def test_history_arrays_sorted_by_step_then_timestamp():
+    steps, timestamps, values = history_arrays([
+        {"step": 2, "timestamp": 5, "value": 0.2},
+        {"step": 1, "timestamp": 9, "value": 0.9},
+        {"step": 1, "timestamp": 3, "value": 0.3},
+    ])
+    assert steps.tolist() == [1, 1, 2]
+    assert timestamps.tolist() == [3, 9, 5]
+    assert values.tolist() == [0.3, 0.9, 0.2]
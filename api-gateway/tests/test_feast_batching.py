@@ -0,0 +1,69 @@
+import asyncio
+
+from feast_batching import OnlineFeatureBatcher, feature_set_key, split_online_features_response
+
+
+class FakeFeast:
+    def __init__(self):
+        self.payloads = []
+
+    async def __call__(self, payload, context):
+        self.payloads.append(payload)
+        await asyncio.sleep(0)
+        ids = payload["entities"]["driver_id"]
+        return {"metadata": {"feature_names": ["rating"]}, "results": [{"values": [i * 10 for i in ids]}]}
+
+
+def test_concurrent_lookups_are_merged_and_split_back():
+    async def scenario():
+        feast = FakeFeast()
+        batcher = OnlineFeatureBatcher(feast, window_ms=5)
+        results = await asyncio.gather(
+            batcher.submit({"features": ["rating"], "entities": {"driver_id": [1, 2]}}, "scope", None),
+            batcher.submit({"features": ["rating"], "entities": {"driver_id": [3]}}, "scope", None),
+        )
+        return feast, results
+
+    feast, results = asyncio.run(scenario())
+    assert len(feast.payloads) == 1
+    assert feast.payloads[0]["entities"] == {"driver_id": [1, 2, 3]}
+    assert [r["results"][0]["values"] for r in results] == [[10, 20], [30]]
+
+
+def test_unhashable_payload_is_sent_unbatched():
+    payload = {"features": [["rating"]], "entities": {"driver_id": [1]}}
+    assert feature_set_key(payload) is None
+
+    async def scenario():
+        feast = FakeFeast()
+        batcher = OnlineFeatureBatcher(feast, window_ms=5)
+        result = await batcher.submit(payload, "scope", None)
+        return feast, result, batcher.stats()
+
+    feast, result, stats = asyncio.run(scenario())
+    assert feast.payloads == [payload]
+    assert result["results"][0]["values"] == [10]
+    assert stats["pending_batches"] == 0
+
+
+def test_close_sends_pending_batches():
+    async def scenario():
+        feast = FakeFeast()
+        batcher = OnlineFeatureBatcher(feast, window_ms=10000)
+        pending = asyncio.ensure_future(
+            batcher.submit({"features": ["rating"], "entities": {"driver_id": [4]}}, "scope", None)
+        )
+        await asyncio.sleep(0)
+        await batcher.close()
+        return await pending, batcher.stats()
+
+    result, stats = asyncio.run(scenario())
+    assert result["results"][0]["values"] == [40]
+    assert stats["sending_batches"] == 0
+
+
+def test_split_response_keeps_scalar_fields():
+    response = {"results": [{"values": [1, 2, 3], "statuses": ["PRESENT"] * 3, "field": "x"}]}
+    first, second = split_online_features_response(response, [1, 2])
+    assert first["results"][0] == {"values": [1], "statuses": ["PRESENT"], "field": "x"}
+    assert second["results"][0]["values"] == [2, 3]
@@ -0,0 +1,71 @@
+import asyncio
+import time
+
+from feature_cache import FeatureCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeFeast:
+    def __init__(self):
+        self.payloads = []
+        self.version = 0
+
+    async def fetch(self, payload):
+        self.payloads.append(payload)
+        self.version += 1
+        features = payload["features"]
+        ids = payload["entities"]["driver_id"]
+        return {
+            "metadata": {"feature_names": ["driver_id"] + [f.split(":")[1] for f in features]},
+            "results": [{"values": ids}] + [
+                {"values": [f"{f}@{self.version}" for _ in ids], "statuses": ["PRESENT"] * len(ids)}
+                for f in features
+            ],
+        }
+
+
+def lookup(cache, feast, features, ids=(1,)):
+    payload = {"features": [f"driver:{f}" for f in features], "entities": {"driver_id": list(ids)}}
+    response = asyncio.run(cache.get_online_features(payload, "scope", feast.fetch))
+    return [column["values"] for column in response["results"][1:]]
+
+
+def test_overlapping_lookups_share_entries(monkeypatch):
+    monkeypatch.setattr(time, "monotonic", Clock())
+    cache, feast = FeatureCache(ttl_seconds=10), FakeFeast()
+
+    assert lookup(cache, feast, ["a", "b"], ids=(1, 2)) == [["driver:a@1"] * 2, ["driver:b@1"] * 2]
+    assert lookup(cache, feast, ["b"], ids=(2,)) == [["driver:b@1"]]
+    assert lookup(cache, feast, ["a"], ids=(2, 3)) == [["driver:a@1", "driver:a@2"]]
+    assert feast.payloads[-1]["entities"] == {"driver_id": [3]}
+    assert len(feast.payloads) == 2
+
+
+def test_merged_features_keep_their_expiry(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, "monotonic", clock)
+    cache, feast = FeatureCache(ttl_seconds=10), FakeFeast()
+
+    lookup(cache, feast, ["a"])
+    clock.now += 9
+    lookup(cache, feast, ["b"])
+    clock.now += 9
+    assert lookup(cache, feast, ["a"]) == [["driver:a@3"]]
+    assert len(feast.payloads) == 3
+
+
+def test_byte_budget_evicts_least_recent(monkeypatch):
+    monkeypatch.setattr(time, "monotonic", Clock())
+    cache, feast = FeatureCache(ttl_seconds=10, max_bytes=200), FakeFeast()
+
+    for driver in range(5):
+        lookup(cache, feast, ["a"], ids=(driver,))
+    assert cache.evictions > 0
+    assert cache.bytes <= 200
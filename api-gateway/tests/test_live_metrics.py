@@ -0,0 +1,96 @@
+import asyncio
+
+from live_metrics import LiveMetricsHub, RunMetricsPoll, event_stream
+
+
+class FakeRun:
+    def __init__(self):
+        self.status = "RUNNING"
+        self.history = {"loss": [{"key": "loss", "value": 1.0, "step": 0, "timestamp": 10}]}
+        self.history_calls = []
+
+    def log(self, key, value, step):
+        self.history.setdefault(key, []).append({"key": key, "value": value, "step": step, "timestamp": 10 + step})
+
+    async def fetch_run(self, run_id):
+        metrics = [steps[-1] for steps in self.history.values()]
+        return {"info": {"run_id": run_id, "status": self.status}, "data": {"metrics": metrics}}
+
+    async def fetch_history(self, run_id, key, start_step, end_step):
+        self.history_calls.append((key, start_step, end_step))
+        return [m for m in self.history[key] if (start_step is None or m["step"] >= start_step) and m["step"] <= end_step]
+
+
+def test_run_poll_publishes_only_new_steps():
+    async def scenario():
+        run = FakeRun()
+        poll = RunMetricsPoll("r1", run.fetch_run, run.fetch_history)
+        first = await poll()
+        run.log("loss", 0.8, 1)
+        run.log("loss", 0.6, 2)
+        run.log("acc", 0.5, 2)
+        second = await poll()
+        run.status = "FINISHED"
+        third = await poll()
+        return run, poll, first, second, third
+
+    run, poll, first, second, third = asyncio.run(scenario())
+    assert first == []
+    assert run.history_calls == [("loss", 0, 2), ("acc", None, 2)]
+    loss = next(data for event, data in second if data["key"] == "loss")
+    assert [m["step"] for m in loss["history"]] == [1, 2]
+    assert third == [("status", {"run_id": "r1", "status": "FINISHED"})]
+    assert poll.done
+
+
+def test_stream_shares_one_poller_and_stops_it():
+    async def scenario():
+        run = FakeRun()
+        hub = LiveMetricsHub(poll_interval=0.01)
+        polls = []
+
+        def make_poll():
+            polls.append(RunMetricsPoll("r1", run.fetch_run, run.fetch_history))
+            return polls[-1]
+
+        streams = [event_stream(hub, ("run", "r1"), make_poll, "alice", "1", lambda user, e: True)
+                   for _ in range(2)]
+        snapshots = [await stream.__anext__() for stream in streams]
+        watching = hub.stats()
+        for stream in streams:
+            await stream.aclose()
+        await asyncio.sleep(0)
+        return polls, snapshots, watching, hub.stats()
+
+    polls, snapshots, watching, after = asyncio.run(scenario())
+    assert len(polls) == 1
+    assert all(b"event: snapshot" in s for s in snapshots)
+    assert watching["pollers"] == 1 and watching["subscribers"] == 2
+    assert after["pollers"] == 0
+
+
+def test_unstarted_stream_leaves_no_poller():
+    async def scenario():
+        hub = LiveMetricsHub()
+        stream = event_stream(hub, ("run", "r1"), lambda: None, "alice", "1", lambda user, e: True)
+        await stream.aclose()
+        return hub.stats()
+
+    assert asyncio.run(scenario())["pollers"] == 0
+
+
+def test_stream_ends_when_access_revoked():
+    async def scenario():
+        run = FakeRun()
+        hub = LiveMetricsHub(poll_interval=0.01)
+        allowed = {"value": True}
+        stream = event_stream(hub, ("run", "r1"), lambda: RunMetricsPoll("r1", run.fetch_run, run.fetch_history),
+                              "alice", "1", lambda user, e: allowed["value"])
+        await stream.__anext__()
+        allowed["value"] = False
+        run.log("loss", 0.5, 1)
+        event = await stream.__anext__()
+        await stream.aclose()
+        return event
+
+    assert asyncio.run(scenario()).startswith(b"event: error")
@@ -0,0 +1,43 @@
+from prometheus_client.core import CounterMetricFamily
+
+import metrics
+from metrics import HitRatioCollector, StatsPublisher
+
+
+def counter_value(counter, label):
+    return counter.labels(label)._value.get()
+
+
+def test_publisher_advances_counters_by_change(monkeypatch):
+    stats = {"hits": 3, "misses": 1, "entries": 7}
+    monkeypatch.setattr(metrics, "_stats_providers", {"response_cache": lambda: dict(stats)})
+    publisher = StatsPublisher()
+
+    publisher.publish()
+    publisher.publish()
+    assert counter_value(publisher.hits, "response_cache") == 3
+    assert publisher.entries.labels("response_cache")._value.get() == 7
+
+    stats["hits"] = 5
+    publisher.publish()
+    assert counter_value(publisher.hits, "response_cache") == 5
+
+    # A reload starts the stats from zero again; nothing is subtracted.
+    stats["hits"] = 2
+    publisher.publish()
+    assert counter_value(publisher.hits, "response_cache") == 7
+
+
+def test_hit_ratio_is_derived_from_aggregated_counters():
+    class Source:
+        def collect(self):
+            hits = CounterMetricFamily("gateway_cache_hits", "Cache hits", labels=["cache"])
+            hits.add_metric(["token_cache"], 9)
+            misses = CounterMetricFamily("gateway_cache_misses", "Cache misses", labels=["cache"])
+            misses.add_metric(["token_cache"], 3)
+            return [hits, misses]
+
+    [ratio] = list(HitRatioCollector(Source()).collect())
+    assert ratio.name == "gateway_cache_hit_ratio"
+    assert ratio.samples[0].labels == {"cache": "token_cache"}
+    assert ratio.samples[0].value == 0.75
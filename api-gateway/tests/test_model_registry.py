@@ -0,0 +1,93 @@
+import asyncio
+import time
+
+from model_registry import ModelRegistryCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def model(name, *stages):
+    return {"name": name, "latest_versions": [
+        {"name": name, "version": str(i + 1), "current_stage": stage} for i, stage in enumerate(stages)
+    ]}
+
+
+def loaded_cache(models, **kwargs):
+    cache = ModelRegistryCache(**kwargs)
+
+    async def fetch_all():
+        return models
+
+    cache.fetch_all = fetch_all
+    asyncio.run(cache._refresh())
+    return cache
+
+
+def test_answers_only_while_fresh(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, "monotonic", clock)
+    cache = loaded_cache([model("churn", "Staging", "Production")], max_staleness=60.0)
+    cache.set_visible("alice", ["churn"])
+
+    assert cache.get("churn", "alice")["name"] == "churn"
+    assert [v["version"] for v in cache.latest_versions("churn", "alice", ["production"])] == ["2"]
+
+    clock.now += 60.0
+    assert not cache.fresh()
+    assert cache.get("churn", "alice") is None
+    assert cache.hits == 2 and cache.misses == 1
+
+
+def test_each_scope_sees_only_its_models(monkeypatch):
+    monkeypatch.setattr(time, "monotonic", Clock())
+    cache = loaded_cache([model("churn"), model("fraud")])
+    cache.set_visible("alice", ["churn"])
+
+    assert [m["name"] for m in cache.all_models("alice")] == ["churn"]
+    assert cache.get("fraud", "alice") is None
+    assert cache.all_models("bob") is None
+    assert cache.get("churn", "bob") is None
+
+
+def test_visible_name_missing_from_snapshot_falls_back(monkeypatch):
+    monkeypatch.setattr(time, "monotonic", Clock())
+    cache = loaded_cache([model("churn")])
+    cache.set_visible("alice", ["churn", "created-elsewhere"])
+    assert cache.all_models("alice") is None
+
+
+def test_writes_through_the_gateway_apply_immediately(monkeypatch):
+    monkeypatch.setattr(time, "monotonic", Clock())
+    cache = loaded_cache([model("churn")])
+    cache.set_visible("alice", ["churn"])
+
+    cache.update_model(model("fraud", "None"))
+    cache.add_visible("alice", "fraud")
+    assert [m["name"] for m in cache.all_models("alice")] == ["churn", "fraud"]
+
+    cache.remove_model("churn")
+    assert cache.get("churn", "alice") is None
+
+
+def test_failed_refresh_keeps_snapshot_and_scopes_are_bounded(monkeypatch):
+    monkeypatch.setattr(time, "monotonic", Clock())
+    cache = loaded_cache([model("churn")], max_scopes=2)
+
+    async def broken():
+        raise RuntimeError("mlflow down")
+
+    cache.fetch_all = broken
+    asyncio.run(cache._refresh())
+    assert cache.refresh_errors == 1
+    assert cache.stats()["entries"] == 1
+
+    for scope in ("a", "b", "c"):
+        cache.set_visible(scope, ["churn"])
+    assert cache.visible_names("a") is None
+    assert cache.stats()["scopes"] == 2
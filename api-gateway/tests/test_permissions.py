@@ -0,0 +1,46 @@
+from permissions import PRINCIPAL_GROUP, PermissionStore
+
+
+def test_effective_permissions_union_user_and_groups():
+    store = PermissionStore()
+    store.set("1", "alice", ["read"])
+    store.set("1", "data-science", ["write"], PRINCIPAL_GROUP)
+
+    assert store.effective_permissions("1", "alice", ["data-science"]) == {"read", "write"}
+    assert store.effective_permissions("1", "bob", ["data-science"]) == {"write"}
+    assert store.effective_permissions("1", "bob", ["other"]) is None
+    assert store.effective_permissions("2", "alice") is None
+
+
+def test_visible_and_denied_experiments():
+    store = PermissionStore()
+    store.set_many([
+        ("1", "alice", ["read"], "user"),
+        ("2", "alice", [], "user"),
+        ("3", "ml", ["admin"], PRINCIPAL_GROUP),
+    ])
+
+    assert store.visible_experiments("alice", ["ml"]) == {"1", "3"}
+    assert store.denied_experiments("alice", ["ml"]) == {"2"}
+
+
+def test_delete_removes_grant_from_both_indexes():
+    store = PermissionStore()
+    store.set("1", "alice", ["read"])
+
+    assert store.delete("1", "alice")
+    assert not store.delete("1", "alice")
+    assert store.get("1", "alice") is None
+    assert store.for_experiment("1") == []
+    assert not store.has_user_grants("alice")
+
+
+def test_refresh_picks_up_writes_from_another_connection(tmp_path):
+    path = str(tmp_path / "permissions.db")
+    reader = PermissionStore(path, refresh_interval=0)
+    writer = PermissionStore(path)
+    writer.set("7", "alice", ["read"])
+
+    assert reader.get("7", "alice") is None
+    assert reader.refresh_if_changed()
+    assert reader.get("7", "alice") == {"read"}
@@ -0,0 +1,91 @@
+import asyncio
+import time
+
+from rate_limit import RateLimiter
+from shared_cache import SharedCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def check(limiter, user_id):
+    return asyncio.run(limiter.check(user_id))
+
+
+def test_per_user_burst_then_refill(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, "monotonic", clock)
+    limiter = RateLimiter(requests_per_minute=6000, burst_size=100, per_user_limit=60, per_user_burst=3)
+
+    assert [check(limiter, "alice").allowed for _ in range(4)] == [True, True, True, False]
+    rejected = check(limiter, "alice")
+    assert rejected.headers()["Retry-After"] == "1"
+    assert check(limiter, "bob").allowed
+
+    clock.now += 1.0
+    assert check(limiter, "alice").allowed
+    assert not check(limiter, "alice").allowed
+
+
+def test_global_bucket_limits_all_users(monkeypatch):
+    monkeypatch.setattr(time, "monotonic", Clock())
+    limiter = RateLimiter(requests_per_minute=60, burst_size=2, per_user_limit=600, per_user_burst=10)
+
+    assert check(limiter, "a").allowed
+    assert check(limiter, "b").allowed
+    assert not check(limiter, "c").allowed
+
+
+def test_rejected_request_spends_no_tokens(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, "monotonic", clock)
+    limiter = RateLimiter(requests_per_minute=60, burst_size=1, per_user_limit=60, per_user_burst=10)
+
+    assert check(limiter, "a").allowed
+    assert not check(limiter, "a").allowed
+    clock.now += 1.0
+    decision = check(limiter, "a")
+    assert decision.allowed
+    assert decision.remaining == 9
+
+
+def test_workers_split_only_the_global_limit(monkeypatch):
+    monkeypatch.setattr(time, "monotonic", Clock())
+    limiter = RateLimiter(requests_per_minute=60000, burst_size=400, per_user_limit=60, per_user_burst=8, workers=4)
+
+    allowed = sum(check(limiter, "alice").allowed for _ in range(20))
+    assert allowed == 8
+
+
+def test_idle_buckets_are_evicted(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, "monotonic", clock)
+    limiter = RateLimiter(per_user_limit=60, per_user_burst=2, idle_eviction_interval=10)
+
+    check(limiter, "alice")
+    clock.now += 11
+    check(limiter, "bob")
+    assert limiter.stats()["evicted"] == 1
+
+
+def test_disabled_allows_everything():
+    limiter = RateLimiter(per_user_limit=1, per_user_burst=1, enabled=False)
+    assert all(check(limiter, "alice").allowed for _ in range(5))
+
+
+def test_shared_per_user_bucket_spans_workers(tmp_path):
+    path = str(tmp_path / "shared.db")
+    workers = [
+        RateLimiter(requests_per_minute=60000, burst_size=400, per_user_limit=60, per_user_burst=5,
+                    workers=2, shared=SharedCache(path))
+        for _ in range(2)
+    ]
+
+    allowed = [check(workers[i % 2], "alice").allowed for i in range(8)]
+    assert allowed == [True] * 5 + [False] * 3
+    assert workers[0].stats()["backend"] == "shared"
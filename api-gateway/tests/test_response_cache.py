@@ -0,0 +1,66 @@
+import time
+
+from response_cache import ResponseCache, compute_etag, etag_matches
+
+
+def test_hit_miss_and_expiry(monkeypatch):
+    cache = ResponseCache(ttl_seconds=5)
+    key = ResponseCache.make_key("scope", "experiments/search", [("b", "2"), ("a", "1")])
+    assert key == "scope|experiments/search?a=1&b=2"
+
+    assert cache.get(key) is None
+    entry = cache.set(key, b'{"experiments": []}')
+    assert cache.get(key) is entry
+    assert entry.etag == compute_etag(b'{"experiments": []}')
+
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 6)
+    assert cache.get(key) is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+
+def test_scopes_do_not_share_entries():
+    cache = ResponseCache()
+    cache.set(ResponseCache.make_key("scope-a", "models"), b"a")
+    assert cache.get(ResponseCache.make_key("scope-b", "models")) is None
+
+
+def test_invalidate_by_tag_and_prefix():
+    cache = ResponseCache()
+    cache.set("k1", b"1", tags=["runs:1"])
+    cache.set("k2", b"2", tags=["runs:2"])
+    cache.set("k3", b"3", tags=["models"])
+
+    assert cache.invalidate("runs:1") == 1
+    assert cache.get("k1") is None
+    assert cache.invalidate_prefix("runs:") == 1
+    assert cache.get("k2") is None
+    assert cache.get("k3") is not None
+
+
+def test_lru_eviction():
+    cache = ResponseCache(max_entries=2)
+    cache.set("a", b"a")
+    cache.set("b", b"b")
+    cache.get("a")
+    cache.set("c", b"c")
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_disabled_cache_stores_nothing():
+    cache = ResponseCache(enabled=False)
+    cache.set("a", b"a")
+    assert cache.get("a") is None
+
+
+def test_etag_matches():
+    etag = compute_etag(b"body")
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"other"', etag)
+    assert not etag_matches(None, etag)
@@ -0,0 +1,55 @@
+import io
+
+import pytest
+
+from run_compare import comparison_arrow, comparison_frame, comparison_json, differing_columns
+
+
+def run(run_id, params, metrics):
+    return {
+        "info": {"run_id": run_id, "experiment_id": "1", "status": "FINISHED"},
+        "data": {
+            "params": [{"key": k, "value": v} for k, v in params.items()],
+            "metrics": [{"key": k, "value": v, "step": 0, "timestamp": 0} for k, v in metrics.items()],
+        },
+    }
+
+
+RUNS = [
+    run("a", {"lr": "0.1", "seed": "1"}, {"loss": 0.5, "acc": 0.9}),
+    run("b", {"lr": "0.2", "seed": "1"}, {"loss": 0.4, "acc": 0.9}),
+    run("c", {"lr": "0.3", "seed": "1"}, {"acc": 0.9}),
+]
+
+
+def test_frame_has_one_row_per_run_and_prefixed_columns():
+    frame = comparison_frame(RUNS)
+    assert frame["run_id"].tolist() == ["a", "b", "c"]
+    assert [c for c in frame.columns if "." in c] == ["params.lr", "params.seed", "metrics.acc", "metrics.loss"]
+
+    filtered = comparison_frame(RUNS, metric_keys=["loss"], param_keys=["lr"])
+    assert [c for c in filtered.columns if "." in c] == ["params.lr", "metrics.loss"]
+
+
+def test_missing_value_counts_as_different():
+    assert differing_columns(comparison_frame(RUNS)) == ["params.lr", "metrics.loss"]
+
+
+def test_json_drops_identical_columns_and_nan():
+    result = comparison_json(comparison_frame(RUNS))
+    assert result["runs"] == 3
+    assert result["identical_columns"] == 2
+    assert result["columns"]["metrics.loss"] == [0.5, 0.4, None]
+    assert "params.seed" not in result["columns"]
+
+    full = comparison_json(comparison_frame(RUNS), include_identical=True)
+    assert full["identical"] == {"params.seed": "1", "metrics.acc": 0.9}
+
+
+def test_arrow_stream_round_trips():
+    pa = pytest.importorskip("pyarrow")
+    body = comparison_arrow(comparison_frame(RUNS))
+    table = pa.ipc.open_stream(io.BytesIO(body)).read_all()
+    assert table.column("run_id").to_pylist() == ["a", "b", "c"]
+    assert "params.seed" not in table.column_names
+    assert table.column("metrics.loss").to_pylist() == [0.5, 0.4, None]
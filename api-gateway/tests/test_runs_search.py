@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from runs_search import (
+    DEFAULT_MAX_RESULTS, MAX_RESULTS_LIMIT, InvalidPageToken, InvalidSearchParameter, parse_max_results, search_runs,
+)
+
+
+class FakeUpstream:
+    # Each experiment holds two runs; MLflow pages at `page_size`.
+    def __init__(self, page_size=3):
+        self.page_size = page_size
+        self.calls = []
+
+    async def fetch_page(self, experiment_ids, query, max_results, page_token):
+        self.calls.append((tuple(experiment_ids), max_results, page_token))
+        runs = [f"{e}-{i}" for e in experiment_ids for i in range(2)]
+        start = int(page_token or 0)
+        size = min(max_results, self.page_size)
+        page = {"runs": runs[start:start + size]}
+        if start + size < len(runs):
+            page["next_page_token"] = str(start + size)
+        return page
+
+
+def search(upstream, ids, **kwargs):
+    return asyncio.run(search_runs(upstream.fetch_page, ids, {"filter": ""}, **kwargs))
+
+
+def test_parse_max_results():
+    assert parse_max_results(None) == DEFAULT_MAX_RESULTS
+    assert parse_max_results("25") == 25
+    assert parse_max_results(10 ** 9) == MAX_RESULTS_LIMIT
+    for bad in ("ten", "0", [5]):
+        with pytest.raises(InvalidSearchParameter):
+            parse_max_results(bad)
+
+
+def test_pages_walk_chunks_in_order():
+    upstream = FakeUpstream()
+    ids = ["1", "2", "3", "4", "5"]
+    seen = []
+    token = None
+    while True:
+        page = search(upstream, ids, chunk_size=2, max_results=4, page_token=token)
+        seen.extend(page["runs"])
+        token = page.get("next_page_token")
+        if token is None:
+            break
+
+    assert seen == [f"{e}-{i}" for e in ids for i in range(2)]
+    assert {call[0] for call in upstream.calls} == {("1", "2"), ("3", "4"), ("5",)}
+
+
+def test_page_token_rejected_when_search_changes():
+    upstream = FakeUpstream()
+    page = search(upstream, ["1", "2", "3"], chunk_size=1, max_results=2)
+    token = page["next_page_token"]
+
+    with pytest.raises(InvalidPageToken):
+        search(upstream, ["1", "2"], chunk_size=1, max_results=2, page_token=token)
+    with pytest.raises(InvalidPageToken):
+        search(upstream, ["1", "2", "3"], chunk_size=1, page_token="not-a-token")
+
+
+def test_no_visible_experiments_skips_upstream():
+    upstream = FakeUpstream()
+    assert search(upstream, []) == {"runs": []}
+    assert upstream.calls == []
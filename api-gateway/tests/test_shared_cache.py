@@ -0,0 +1,85 @@
+import sqlite3
+import time
+
+from shared_cache import SharedCache, TieredCache
+
+
+def test_values_are_shared_between_connections(tmp_path):
+    path = str(tmp_path / "shared.db")
+    first, second = SharedCache(path), SharedCache(path)
+
+    first.set("token", "abc", {"user_id": "alice"}, ttl=60)
+    assert second.get("token", "abc") == {"user_id": "alice"}
+    first.delete("token", "abc")
+    assert second.get("token", "abc") is None
+
+
+def test_expired_values_are_misses(tmp_path):
+    cache = SharedCache(str(tmp_path / "shared.db"))
+    cache.set("token", "abc", 1, ttl=-1)
+    assert cache.get_with_expiry("token", "abc") == (None, 0.0)
+
+
+def test_locked_database_reads_as_a_miss(tmp_path):
+    path = str(tmp_path / "shared.db")
+    cache = SharedCache(path)
+    cache.set("token", "abc", 1, ttl=60)
+
+    class LockedConnection:
+        def execute(self, *args):
+            raise sqlite3.OperationalError("database is locked")
+
+        def close(self):
+            pass
+
+    cache._reader = LockedConnection()
+    assert cache.get("token", "abc") is None
+
+
+def test_take_token_refills_over_time(tmp_path, monkeypatch):
+    cache = SharedCache(str(tmp_path / "shared.db"))
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now)
+
+    results = [cache.take_token("ratelimit", "alice", 1.0, 2)[0] for _ in range(3)]
+    assert results == [True, True, False]
+    allowed, _, retry_after = cache.take_token("ratelimit", "alice", 1.0, 2)
+    assert not allowed and retry_after == 1.0
+
+    monkeypatch.setattr(time, "time", lambda: now + 1.0)
+    assert cache.take_token("ratelimit", "alice", 1.0, 2)[0]
+
+
+def test_tiered_cache_promotes_shared_hits(tmp_path):
+    path = str(tmp_path / "shared.db")
+    writer = TieredCache("session", shared=SharedCache(path))
+    reader = TieredCache("session", shared=SharedCache(path))
+
+    writer.set("alice", {"token": "t"}, ttl=60)
+    assert reader.get("alice") == {"token": "t"}
+    assert reader.get("alice") == {"token": "t"}
+    assert reader.stats()["shared_hits"] == 1
+
+
+def test_cache_files_are_private(tmp_path):
+    path = tmp_path / "gateway" / "shared.db"
+    cache = SharedCache(str(path))
+    cache.set("token", "abc", 1, ttl=60)
+
+    assert path.parent.stat().st_mode & 0o777 == 0o700
+    for name in ("shared.db", "shared.db-wal", "shared.db-shm"):
+        assert (path.parent / name).stat().st_mode & 0o777 == 0o600
+
+
+def test_busy_write_gives_up_at_once(tmp_path):
+    path = str(tmp_path / "shared.db")
+    cache = SharedCache(path)
+    holder = sqlite3.connect(path, isolation_level=None)
+    holder.execute("BEGIN IMMEDIATE")
+    try:
+        start = time.monotonic()
+        cache.set("token", "abc", 1, ttl=60)
+        assert time.monotonic() - start < 0.5
+    finally:
+        holder.execute("ROLLBACK")
+    assert cache.get("token", "abc") is None
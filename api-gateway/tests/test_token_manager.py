@@ -0,0 +1,119 @@
+import asyncio
+import time
+from urllib.parse import parse_qs
+
+import httpx
+import pytest
+
+from token_manager import JWT_BEARER_GRANT, TokenExchangeError, TokenManager
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeIdP:
+    def __init__(self, expires_in=3600, delay=0.0):
+        self.expires_in = expires_in
+        self.delay = delay
+        self.requests = []
+        self.reject_refresh = False
+
+    async def __call__(self, request):
+        form = {k: v[0] for k, v in parse_qs(request.content.decode()).items()}
+        self.requests.append(form)
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if form["grant_type"] == "refresh_token" and self.reject_refresh:
+            return httpx.Response(400, json={"error": "invalid_grant", "error_description": "Refresh token expired"})
+        n = len(self.requests)
+        return httpx.Response(200, json={
+            "access_token": f"token-{n}", "refresh_token": f"refresh-{n}", "expires_in": self.expires_in,
+        })
+
+    def grants(self):
+        return [form["grant_type"] for form in self.requests]
+
+
+def manager(idp, **kwargs):
+    tokens = TokenManager(token_url="https://idp/token", client_id="gateway", client_secret="s", **kwargs)
+    tokens._client = httpx.AsyncClient(transport=httpx.MockTransport(idp))
+    return tokens
+
+
+def test_on_behalf_of_cached_until_refresh_margin(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, "monotonic", clock)
+    idp = FakeIdP(expires_in=3600)
+    tokens = manager(idp, refresh_margin=300.0)
+
+    async def scenario():
+        first = await tokens.on_behalf_of("alice", "user-jwt", "api://mlflow/.default")
+        clock.now += 3299.0
+        cached = await tokens.on_behalf_of("alice", "user-jwt", "api://mlflow/.default")
+        clock.now += 1.0
+        renewed = await tokens.on_behalf_of("alice", "user-jwt", "api://mlflow/.default")
+        return first, cached, renewed
+
+    assert asyncio.run(scenario()) == ("token-1", "token-1", "token-2")
+    assert idp.grants() == [JWT_BEARER_GRANT, "refresh_token"]
+    assert idp.requests[1]["refresh_token"] == "refresh-1"
+    assert tokens.stats()["hits"] == 1
+
+
+def test_concurrent_misses_share_one_exchange():
+    idp = FakeIdP(delay=0.01)
+    tokens = manager(idp)
+
+    async def scenario():
+        return await asyncio.gather(*(tokens.on_behalf_of("alice", "user-jwt", "scope") for _ in range(10)))
+
+    assert set(asyncio.run(scenario())) == {"token-1"}
+    assert len(idp.requests) == 1
+
+
+def test_rejected_refresh_falls_back_to_exchange():
+    idp = FakeIdP()
+    idp.reject_refresh = True
+    tokens = manager(idp)
+    tokens.remember_refresh_token("alice", "stale")
+
+    assert asyncio.run(tokens.on_behalf_of("alice", "user-jwt", "scope")) == "token-2"
+    assert idp.grants() == ["refresh_token", JWT_BEARER_GRANT]
+
+    with pytest.raises(TokenExchangeError) as error:
+        asyncio.run(manager(FakeIdP()).on_behalf_of("bob", None, "scope"))
+    assert error.value.status_code == 401
+
+
+def test_short_lived_tokens_renewed_halfway(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, "monotonic", clock)
+    idp = FakeIdP(expires_in=120)
+    tokens = manager(idp, refresh_margin=300.0)
+
+    async def scenario():
+        await tokens.app_token("scope")
+        clock.now += 59.0
+        cached = await tokens.app_token("scope")
+        clock.now += 1.0
+        return cached, await tokens.app_token("scope")
+
+    assert asyncio.run(scenario()) == ("token-1", "token-2")
+    assert idp.grants() == ["client_credentials", "client_credentials"]
+
+
+def test_idp_error_surfaces_status_and_code():
+    def handler(request):
+        return httpx.Response(400, json={"error": "invalid_scope", "error_description": "Unknown scope"})
+
+    tokens = TokenManager(token_url="https://idp/token")
+    tokens._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    with pytest.raises(TokenExchangeError) as error:
+        asyncio.run(tokens.app_token("nope"))
+    assert (error.value.status_code, error.value.error, str(error.value)) == (400, "invalid_scope", "Unknown scope")
+    assert tokens.stats()["errors"] == 1
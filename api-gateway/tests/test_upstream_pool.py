@@ -0,0 +1,95 @@
+import asyncio
+import time
+
+import httpx
+
+from upstream_pool import UpstreamPool
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def fail(pool, endpoint, times):
+    for _ in range(times):
+        with pool.track(endpoint) as record:
+            record(503)
+
+
+def succeed(pool, endpoint):
+    with pool.track(endpoint) as record:
+        record(200)
+
+
+def healthy_client():
+    return httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200)))
+
+
+def test_consecutive_failures_eject_with_doubling_backoff(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, "monotonic", clock)
+    pool = UpstreamPool("mlflow", ["http://a", "http://b"], eject_after=3, eject_seconds=10.0)
+    a, b = pool.endpoints
+
+    fail(pool, a, 2)
+    succeed(pool, a)
+    fail(pool, a, 2)
+    assert a.available(clock.now)
+
+    fail(pool, a, 1)
+    assert a.ejected_until == clock.now + 10.0
+    assert all(pool.pick() is b for _ in range(10))
+
+    clock.now = a.ejected_until
+    fail(pool, a, 3)
+    assert a.ejected_until == clock.now + 20.0
+
+
+def test_probe_ends_ejection_but_keeps_backoff(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, "monotonic", clock)
+    pool = UpstreamPool("mlflow", ["http://a", "http://b"], eject_after=1, eject_seconds=10.0)
+    a = pool.endpoints[0]
+
+    fail(pool, a, 1)
+    clock.now += 1.0
+    asyncio.run(pool.probe(healthy_client()))
+    assert a.available(clock.now)
+    assert a.ejections == 1
+
+    fail(pool, a, 1)
+    assert a.ejected_until == clock.now + 20.0
+
+
+def test_backoff_resets_after_clean_period(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, "monotonic", clock)
+    pool = UpstreamPool("mlflow", ["http://a", "http://b"], eject_after=1, eject_seconds=10.0, recover_seconds=60.0)
+    a = pool.endpoints[0]
+
+    fail(pool, a, 1)
+    clock.now = a.ejected_until + 30.0
+    succeed(pool, a)
+    assert a.ejections == 1
+
+    clock.now += 30.0
+    succeed(pool, a)
+    assert a.ejections == 0
+    fail(pool, a, 1)
+    assert a.ejected_until == clock.now + 10.0
+
+
+def test_ejection_ratio_keeps_pool_serving(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, "monotonic", clock)
+    pool = UpstreamPool("mlflow", ["http://a", "http://b"], eject_after=1, max_ejection_ratio=0.5)
+    a, b = pool.endpoints
+
+    fail(pool, a, 1)
+    fail(pool, b, 1)
+    assert not a.available(clock.now)
+    assert b.available(clock.now)
@@ -0,0 +1,206 @@
+import time
+import logging
+from collections import OrderedDict
+from contextlib import nullcontext
+from typing import Any, Callable, Dict, Hashable, Optional
+
+import httpx
+
+from coalescing import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+JWT_BEARER_GRANT = "urn:ietf:params:oauth:grant-type:jwt-bearer"
+DEFAULT_EXPIRES_IN = 3600
+
+
+class TokenExchangeError(Exception):
+    def __init__(self, message: str, status_code: Optional[int] = None, error: Optional[str] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.error = error
+
+
+class CachedToken:
+    __slots__ = ("access_token", "refresh_token", "refresh_at")
+
+    def __init__(self, access_token: str, refresh_token: Optional[str], refresh_at: float):
+        self.access_token = access_token
+        self.refresh_token = refresh_token
+        self.refresh_at = refresh_at
+
+
+class TokenManager:
+    # Talks to the identity provider's token endpoint over one pooled client
+    # and keeps the tokens it gets back. On-behalf-of and app tokens are
+    # cached per (user, scope) until refresh_margin before they expire;
+    # concurrent misses for the same key share one IdP round trip. A cached
+    # refresh token (from an earlier exchange or the user's sign-in) is
+    # preferred over a new on-behalf-of exchange, since it keeps working
+    # after the user's own token has expired.
+
+    def __init__(
+        self,
+        token_url: str = "",
+        client_id: str = "",
+        client_secret: str = "",
+        refresh_margin: float = 300.0,
+        max_entries: int = 10000,
+        timeout: float = 10.0,
+        max_connections: int = 20,
+        observe: Optional[Callable[[], Any]] = None,
+    ):
+        self.token_url = token_url
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.refresh_margin = refresh_margin
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.observe = observe
+        self._client: Optional[httpx.AsyncClient] = None
+        self._tokens: "OrderedDict[Hashable, CachedToken]" = OrderedDict()
+        self._refresh_tokens: "OrderedDict[str, str]" = OrderedDict()
+        self._flight = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+        self.idp_calls = 0
+        self.refreshes = 0
+        self.errors = 0
+
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections)
+            )
+        return self._client
+
+    async def _post(self, data: Dict[str, str]) -> Dict[str, Any]:
+        form = {"client_id": self.client_id, "client_secret": self.client_secret, **data}
+        self.idp_calls += 1
+        try:
+            with self.observe() if self.observe is not None else nullcontext():
+                response = await self.client().post(self.token_url, data=form)
+        except httpx.RequestError as e:
+            self.errors += 1
+            raise TokenExchangeError(f"Identity provider unreachable: {e}")
+        if response.status_code != 200:
+            self.errors += 1
+            try:
+                body = response.json()
+            except ValueError:
+                body = {}
+            raise TokenExchangeError(
+                body.get("error_description", f"Token endpoint returned {response.status_code}"),
+                status_code=response.status_code,
+                error=body.get("error")
+            )
+        return response.json()
+
+    async def exchange_code(self, code: str, redirect_uri: str) -> Dict[str, Any]:
+        # Authorization codes are single use, so there is nothing to cache;
+        # the caller hands the refresh token back via remember_refresh_token.
+        return await self._post({
+            "grant_type": "authorization_code",
+            "code": code,
+            "redirect_uri": redirect_uri,
+        })
+
+    def remember_refresh_token(self, user_id: str, refresh_token: str):
+        self._refresh_tokens[user_id] = refresh_token
+        self._refresh_tokens.move_to_end(user_id)
+        while len(self._refresh_tokens) > self.max_entries:
+            self._refresh_tokens.popitem(last=False)
+
+    def _fresh(self, key: Hashable) -> Optional[str]:
+        entry = self._tokens.get(key)
+        if entry is None or time.monotonic() >= entry.refresh_at:
+            self.misses += 1
+            return None
+        self._tokens.move_to_end(key)
+        self.hits += 1
+        return entry.access_token
+
+    def _store(self, key: Hashable, tokens: Dict[str, Any], previous_refresh: Optional[str] = None) -> str:
+        expires_in = float(tokens.get("expires_in", DEFAULT_EXPIRES_IN))
+        # Short-lived tokens are renewed halfway through rather than never
+        # being served from the cache at all.
+        margin = min(self.refresh_margin, expires_in / 2)
+        refresh_token = tokens.get("refresh_token") or previous_refresh
+        self._tokens[key] = CachedToken(tokens["access_token"], refresh_token, time.monotonic() + expires_in - margin)
+        self._tokens.move_to_end(key)
+        while len(self._tokens) > self.max_entries:
+            self._tokens.popitem(last=False)
+        user_id = key[0]
+        if user_id is not None and tokens.get("refresh_token"):
+            # Refresh tokens rotate; keep the newest for this user's other scopes.
+            self.remember_refresh_token(user_id, tokens["refresh_token"])
+        return tokens["access_token"]
+
+    async def _refresh(self, key: Hashable, refresh_token: str) -> Optional[str]:
+        try:
+            tokens = await self._post({
+                "grant_type": "refresh_token",
+                "refresh_token": refresh_token,
+                "scope": key[1],
+            })
+        except TokenExchangeError as e:
+            logger.info(f"Refresh token for {key[1]} rejected, falling back: {e}")
+            return None
+        self.refreshes += 1
+        return self._store(key, tokens, refresh_token)
+
+    async def _acquire_on_behalf_of(self, key: Hashable, assertion: Optional[str]) -> str:
+        user_id, scope = key
+        entry = self._tokens.get(key)
+        refresh_token = entry.refresh_token if entry is not None else None
+        refresh_token = refresh_token or self._refresh_tokens.get(user_id)
+        if refresh_token:
+            token = await self._refresh(key, refresh_token)
+            if token is not None:
+                return token
+        if not assertion:
+            raise TokenExchangeError("No user token or refresh token to exchange", status_code=401)
+        tokens = await self._post({
+            "grant_type": JWT_BEARER_GRANT,
+            "assertion": assertion,
+            "scope": scope,
+            "requested_token_use": "on_behalf_of",
+        })
+        return self._store(key, tokens)
+
+    async def on_behalf_of(self, user_id: str, assertion: Optional[str], scope: str) -> str:
+        key = (user_id, scope)
+        token = self._fresh(key)
+        if token is not None:
+            return token
+        return await self._flight.do(key, lambda: self._acquire_on_behalf_of(key, assertion))
+
+    async def app_token(self, scope: str) -> str:
+        key = (None, scope)
+        token = self._fresh(key)
+        if token is not None:
+            return token
+
+        async def acquire():
+            tokens = await self._post({"grant_type": "client_credentials", "scope": scope})
+            return self._store(key, tokens)
+
+        return await self._flight.do(key, acquire)
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._tokens),
+            "refresh_tokens": len(self._refresh_tokens),
+            "hits": self.hits,
+            "misses": self.misses,
+            "idp_calls": self.idp_calls,
+            "refreshes": self.refreshes,
+            "errors": self.errors,
+            "in_flight": self._flight.in_flight(),
+        }
@@ -0,0 +1,206 @@
+import time
+import random
+import asyncio
+import logging
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+LEAST_OUTSTANDING = "least_outstanding"
+EWMA = "ewma"
+FAILURE_STATUSES = frozenset((502, 503, 504))
+
+
+class Endpoint:
+    __slots__ = (
+        "url", "outstanding", "ewma", "consecutive_failures", "ejections", "ejected_until",
+        "serving_since", "healthy", "requests", "failures",
+    )
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self.outstanding = 0
+        self.ewma = 0.0
+        self.consecutive_failures = 0
+        self.ejections = 0
+        self.ejected_until = 0.0
+        self.serving_since = 0.0
+        self.healthy = True
+        self.requests = 0
+        self.failures = 0
+
+    def available(self, now: float) -> bool:
+        return self.healthy and self.ejected_until <= now
+
+    def stats(self, now: float) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "available": self.available(now),
+            "healthy": self.healthy,
+            "ejected_for_seconds": max(0.0, round(self.ejected_until - now, 3)),
+            "outstanding": self.outstanding,
+            "ewma_ms": round(1000 * self.ewma, 3),
+            "requests": self.requests,
+            "failures": self.failures,
+            "ejections": self.ejections,
+        }
+
+
+class UpstreamPool:
+    # Replicas of one upstream service. Each call picks an endpoint with
+    # power-of-two-choices over either outstanding requests or EWMA latency
+    # weighted by outstanding requests. Consecutive connection errors or
+    # 502/503/504s eject an endpoint for a backoff period (never more than
+    # max_ejection_ratio of the pool), and a background probe marks
+    # endpoints unhealthy or brings them back early. The backoff only
+    # resets once real requests have gone recover_seconds without a
+    # failure: a passing health check ends an ejection but says nothing
+    # about whether the endpoint can serve traffic. If nothing is
+    # available, every endpoint is considered rather than failing outright.
+
+    def __init__(
+        self,
+        name: str,
+        urls: Iterable[str],
+        strategy: str = LEAST_OUTSTANDING,
+        ewma_decay: float = 0.3,
+        eject_after: int = 5,
+        eject_seconds: float = 10.0,
+        max_eject_seconds: float = 300.0,
+        max_ejection_ratio: float = 0.5,
+        recover_seconds: float = 60.0,
+        health_path: str = "/health",
+        probe_interval: float = 10.0,
+        probe_timeout: float = 2.0,
+    ):
+        self.name = name
+        self.endpoints: List[Endpoint] = [Endpoint(url) for url in urls]
+        if not self.endpoints:
+            raise ValueError(f"Upstream pool {name} has no endpoints")
+        self.strategy = strategy
+        self.ewma_decay = ewma_decay
+        self.eject_after = eject_after
+        self.eject_seconds = eject_seconds
+        self.max_eject_seconds = max_eject_seconds
+        self.max_ejection_ratio = max_ejection_ratio
+        self.recover_seconds = recover_seconds
+        self.health_path = health_path
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self._probe_task: Optional[asyncio.Task] = None
+
+    def _score(self, endpoint: Endpoint) -> float:
+        if self.strategy == EWMA:
+            return endpoint.ewma * (endpoint.outstanding + 1)
+        return endpoint.outstanding
+
+    def pick(self, exclude: Iterable[Endpoint] = ()) -> Endpoint:
+        now = time.monotonic()
+        excluded = set(id(e) for e in exclude)
+        candidates = [e for e in self.endpoints if id(e) not in excluded and e.available(now)]
+        if not candidates:
+            candidates = [e for e in self.endpoints if id(e) not in excluded] or self.endpoints
+        if len(candidates) == 1:
+            return candidates[0]
+        first, second = random.sample(candidates, 2)
+        return first if self._score(first) <= self._score(second) else second
+
+    @contextmanager
+    def track(self, endpoint: Endpoint):
+        # Yields a callable taking the response status; an exception from the
+        # body counts as a failure.
+        outcome = {"status": None}
+        endpoint.outstanding += 1
+        endpoint.requests += 1
+        start = time.perf_counter()
+        try:
+            yield lambda status: outcome.update(status=status)
+        except (httpx.TransportError, asyncio.TimeoutError):
+            self._record(endpoint, time.perf_counter() - start, False)
+            raise
+        else:
+            self._record(endpoint, time.perf_counter() - start, outcome["status"] not in FAILURE_STATUSES)
+        finally:
+            endpoint.outstanding -= 1
+
+    def _record(self, endpoint: Endpoint, elapsed: float, ok: bool):
+        if endpoint.ewma == 0.0:
+            endpoint.ewma = elapsed
+        else:
+            endpoint.ewma += self.ewma_decay * (elapsed - endpoint.ewma)
+
+        now = time.monotonic()
+        if ok:
+            endpoint.consecutive_failures = 0
+            if endpoint.ejections and now - endpoint.serving_since >= self.recover_seconds:
+                endpoint.ejections = 0
+            return
+        endpoint.serving_since = max(endpoint.serving_since, now)
+        endpoint.failures += 1
+        endpoint.consecutive_failures += 1
+        if endpoint.consecutive_failures >= self.eject_after:
+            self._eject(endpoint)
+
+    def _eject(self, endpoint: Endpoint):
+        now = time.monotonic()
+        ejected = sum(1 for e in self.endpoints if e.ejected_until > now)
+        if ejected + 1 > self.max_ejection_ratio * len(self.endpoints):
+            return
+        duration = min(self.eject_seconds * (2 ** endpoint.ejections), self.max_eject_seconds)
+        endpoint.ejections += 1
+        endpoint.ejected_until = now + duration
+        endpoint.serving_since = endpoint.ejected_until
+        endpoint.consecutive_failures = 0
+        logger.warning(f"Ejecting {self.name} endpoint {endpoint.url} for {duration:.0f}s")
+
+    async def probe(self, client: httpx.AsyncClient):
+        async def check(endpoint: Endpoint):
+            try:
+                response = await client.get(f"{endpoint.url}{self.health_path}", timeout=self.probe_timeout)
+                healthy = response.status_code < 500
+            except httpx.HTTPError:
+                healthy = False
+            if healthy and not endpoint.healthy:
+                logger.info(f"{self.name} endpoint {endpoint.url} is healthy again")
+            now = time.monotonic()
+            if healthy and endpoint.ejected_until > now:
+                # Back in rotation early, but the backoff stands until real
+                # traffic has proven the endpoint.
+                endpoint.ejected_until = 0.0
+                endpoint.serving_since = now
+            if not healthy and endpoint.healthy:
+                logger.warning(f"{self.name} endpoint {endpoint.url} failed its health check")
+            endpoint.healthy = healthy
+
+        await asyncio.gather(*(check(e) for e in self.endpoints))
+
+    def start_probes(self, client_factory):
+        if self.probe_interval > 0 and self._probe_task is None:
+            self._probe_task = asyncio.create_task(self._probe_loop(client_factory))
+
+    async def _probe_loop(self, client_factory):
+        while True:
+            await asyncio.sleep(self.probe_interval)
+            try:
+                await self.probe(client_factory())
+            except Exception as e:
+                logger.warning(f"Health probe for {self.name} failed: {e}")
+
+    async def close(self):
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            try:
+                await self._probe_task
+            except asyncio.CancelledError:
+                pass
+            self._probe_task = None
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "strategy": self.strategy,
+            "endpoints": [e.stats(now) for e in self.endpoints],
+        }
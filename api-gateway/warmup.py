@@ -0,0 +1,57 @@
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+WarmupStep = Tuple[str, Callable[[], Awaitable[Any]], bool]
+
+
+class Readiness:
+    # Runs warm-up steps after startup and tracks whether the gateway may
+    # receive traffic. Optional steps give up at the deadline; required
+    # steps keep retrying, and the gateway stays unready until they pass.
+
+    def __init__(self):
+        self.steps: Dict[str, Dict[str, Any]] = {}
+        self.ready = False
+        self.started_at = None
+        self.completed_at = None
+
+    async def run(self, steps: List[WarmupStep], timeout: float = 30.0, retry_interval: float = 1.0):
+        self.started_at = time.time()
+        for name, _, required in steps:
+            self.steps[name] = {"status": "pending", "required": required, "error": None, "duration_ms": None}
+
+        deadline = time.monotonic() + timeout
+        results = await asyncio.gather(
+            *(self._run_step(name, fn, required, deadline, retry_interval) for name, fn, required in steps)
+        )
+        self.ready = all(ok or not required for ok, (_, _, required) in zip(results, steps))
+        self.completed_at = time.time()
+        logger.info(
+            f"Warm-up finished in {self.completed_at - self.started_at:.2f}s "
+            f"({'ready' if self.ready else 'not ready'})"
+        )
+
+    async def _run_step(self, name: str, fn, required: bool, deadline: float, retry_interval: float) -> bool:
+        state = self.steps[name]
+        while True:
+            start = time.perf_counter()
+            try:
+                await fn()
+                state.update(status="ok", error=None, duration_ms=round(1000 * (time.perf_counter() - start), 2))
+                return True
+            except Exception as e:
+                state.update(status="failed", error=str(e))
+                logger.warning(f"Warm-up step {name} failed: {e}")
+            if not required and time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(retry_interval)
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "status": "ready" if self.ready else "warming_up",
+            "steps": self.steps,
+        }